@@ -1,26 +1,72 @@
+import asyncio
 import base64
+import json
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Any
 
 import redis.asyncio as aioredis
-from fastapi import APIRouter, Depends, File, HTTPException, Path, Request, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from cat_server.api.schemas import (
+    CatProcessingStatusResponse,
     CatRecommendationsResponse,
     ImageUploadResponse,
+    ProcessCatResponse,
     SessionCreateResponse,
 )
+from cat_server.core.config import settings
 from cat_server.core.dependencies import (
+    get_blob_store,
     get_db_session,
+    get_event_hub,
+    get_haircut_catalog,
     get_image_processing_service,
+    get_job_queue,
     get_redis,
     get_user_session_service,
 )
 from cat_server.domain.dto import ImageData, ProcessingException
 from cat_server.infrastructure import HaircutsRepository
-from cat_server.infrastructure.repositories import CatsRepository
-from cat_server.services.image_processing_service import ImageProcessingService
+from cat_server.infrastructure.blob_store import BlobStore
+from cat_server.infrastructure.repositories import (
+    CatsRepository,
+    RecommendationsRepository,
+)
+from cat_server.services.haircut_catalog import (
+    HaircutCatalog,
+    catalog_entry,
+    choose_rendition,
+    image_path,
+    read_image,
+)
+from cat_server.services.image_processing_service import (
+    OVERLOAD_ERRORS,
+    ImageProcessingService,
+)
+from cat_server.services.image_sniffing import (
+    SNIFF_BYTES,
+    ImageHeader,
+    detect_format,
+    sniff_image_header,
+)
+from cat_server.services.processing_jobs import ProcessingJobQueue
+from cat_server.services.session_events import SessionEventHub
 from cat_server.services.user_session_service import UserSessionService
 
 router = APIRouter()
@@ -45,7 +91,53 @@ async def create_session(
     return SessionCreateResponse(session_id=session_id)
 
 
-@router.post("/{session_id}/{cat_id}/images", response_model=ImageUploadResponse)
+async def _read_upload(file: UploadFile) -> tuple[bytes, ImageHeader | None]:
+    # Размер тела запроса ограничивает BodySizeLimitMiddleware
+    # (core/middleware.py): к вызову обработчика файл уже принят целиком.
+    # Формат проверяется по первым килобайтам, затем файл читается одним
+    # вызовом — без промежуточного буфера и второй копии загрузки
+    max_size = settings.MAX_FILE_SIZE
+    if file.size is not None and file.size > max_size:
+        raise _file_too_large(max_size)
+
+    header = _sniff_or_reject(await file.read(SNIFF_BYTES))
+    await file.seek(0)
+    data = await file.read()
+    if len(data) > max_size:
+        raise _file_too_large(max_size)
+    return data, header
+
+
+def _file_too_large(max_size: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File exceeds {max_size} bytes")
+
+
+def _sniff_or_reject(head: bytes) -> ImageHeader | None:
+    if detect_format(head) is None:
+        raise HTTPException(
+            status_code=415, detail="Unsupported image format (JPEG, PNG, GIF, WebP)"
+        )
+    return sniff_image_header(head)
+
+
+async def _haircut_for_cat(
+    cat_id: int, db_session: AsyncSession, haircut_catalog: HaircutCatalog | None
+) -> Any:
+    if haircut_catalog is None:
+        # Только чтение: публиковать изменения каталога не нужно
+        return await HaircutsRepository(db_session, redis=None).get_by_cat_id(cat_id)
+    # Из БД — только рекомендация, стрижка — из каталога в памяти
+    recommendation = await RecommendationsRepository(db_session).get_by_cat_id(cat_id)
+    if recommendation is None:
+        return None
+    return await haircut_catalog.get(recommendation.haircut_id)
+
+
+@router.post(
+    "/{session_id}/{cat_id}/images",
+    response_model=ImageUploadResponse,
+    responses={202: {"model": ProcessCatResponse}},
+)
 async def upload_images(
     session_id: str,  # session_id передаётся в URL
     cat_id: Annotated[
@@ -57,22 +149,31 @@ async def upload_images(
         get_image_processing_service
     ),
     db_session: AsyncSession = Depends(get_db_session),
+    job_queue: ProcessingJobQueue = Depends(get_job_queue),
+    haircut_catalog: HaircutCatalog | None = Depends(get_haircut_catalog),
+    async_mode: bool = Query(
+        False, description="Поставить обработку в очередь и сразу вернуть job_id"
+    ),
 ):
     """Функция для загрузки изображений кота в сервис нейросети и получения результатов"""
     start_time = datetime.now()
 
     # Заполнение данных изображений
-    image_bytes = await file.read()
+    try:
+        image_bytes, header = await _read_upload(file)
+    finally:
+        await file.close()
     content_type = file.content_type or "unknown"
     format = content_type.split("/")[-1].upper() if "/" in content_type else "unknown"
     image_data = ImageData(
         file_name=file.filename or "unnamed.jpg",  # pyright: ignore[reportArgumentType]
         data=image_bytes,
         size=len(image_bytes),
-        format=format,
+        # Формат по сигнатуре файла надёжнее заявленного Content-Type
+        format=header.format if header is not None else format,
+        resolution=header.resolution if header is not None else None,
         uploaded_at=datetime.now(),
     )
-    await file.close()
 
     image_is_valid = await image_processing_service.validate_image(image_data)
     if not image_is_valid.is_valid:
@@ -92,8 +193,7 @@ async def upload_images(
         if cat is None:
             raise HTTPException(status_code=404, detail="Cat not found")
         await user_session_service.link_cat_to_session(session_id, cat_id)
-        haircut_repo = HaircutsRepository(db_session)
-        haircut = await haircut_repo.get_by_cat_id(cat_id)
+        haircut = await _haircut_for_cat(cat_id, db_session, haircut_catalog)
         return ImageUploadResponse(
             cat_id=cat_id,
             session_id=session_id,
@@ -101,8 +201,23 @@ async def upload_images(
             upload_timestamp=datetime.now().timestamp() - start_time.timestamp(),
         )
 
+    if async_mode:
+        # Нейросеть и запись в БД выполнит воркер, статус — по job_id
+        job_id = await job_queue.enqueue(session_id, image_data)
+        return JSONResponse(
+            status_code=202,
+            content=ProcessCatResponse(job_id=job_id, status="pending").model_dump(),
+        )
+
     try:
         result = await image_processing_service.process_images(image_data=image_data)
+        if result.error is not None and result.error.error_id in OVERLOAD_ERRORS:
+            # Перегрузка нейросети временная — клиент может повторить запрос
+            raise HTTPException(
+                status_code=503,
+                detail=result.error.message,
+                headers={"Retry-After": "1"},
+            )
         if result.status == "error":
             raise HTTPException(
                 status_code=400,
@@ -131,12 +246,92 @@ async def upload_images(
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
+@router.get("/{session_id}/jobs/{job_id}", response_model=CatProcessingStatusResponse)
+async def get_job_status(
+    session_id: str,
+    job_id: str,
+    job_queue: ProcessingJobQueue = Depends(get_job_queue),
+):
+    job = await job_queue.get_status(job_id)
+    if job is None or job.get("session_id") != session_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return CatProcessingStatusResponse(
+        cat_id=int(job["cat_id"]) if job.get("cat_id") else None,
+        job_id=job_id,
+        status=job["status"],
+        error_message=job.get("error_message"),
+        updated_at=datetime.fromisoformat(job["updated_at"]),
+    )
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get("/{session_id}/events")
+async def session_events(
+    session_id: str,
+    job_id: str | None = Query(
+        None, description="Сразу прислать текущий статус этой задачи"
+    ),
+    user_session_service: UserSessionService = Depends(get_user_session_service),
+    job_queue: ProcessingJobQueue = Depends(get_job_queue),
+    event_hub: SessionEventHub = Depends(get_event_hub),
+):
+    """Server-Sent Events: статус задач и готовность рекомендации без опроса"""
+    try:
+        await user_session_service.get_session(session_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    async def stream():
+        async with event_hub.subscribe(session_id) as queue:
+            # Подписка уже оформлена: статус, изменившийся до подключения,
+            # не потеряется — отдаём его снимком
+            if job_id is not None:
+                job = await job_queue.get_status(job_id)
+                if job is not None and job.get("session_id") == session_id:
+                    yield _sse(
+                        {
+                            "type": "job_status",
+                            "job_id": job_id,
+                            "status": job["status"],
+                            "cat_id": int(job["cat_id"]) if job.get("cat_id") else None,
+                            "error_message": job.get("error_message"),
+                        }
+                    )
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # Комментарий SSE держит соединение живым через прокси
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/{session_id}/{cat_id}/recommendations", response_model=CatRecommendationsResponse
 )
 async def get_cat_recommendations(
+    request: Request,
     session_id: str,
     cat_id: int,
+    inline_image: bool = Query(
+        False, description="Вернуть изображение стрижки в base64 (старые клиенты)"
+    ),
+    image_width: int | None = Query(
+        None, ge=1, le=4096, description="Ширина изображения для image_url"
+    ),
     user_session_service: UserSessionService = Depends(get_user_session_service),
     image_processing_service: ImageProcessingService = Depends(
         get_image_processing_service
@@ -153,15 +348,103 @@ async def get_cat_recommendations(
     if session_data.cat_id != cat_id:
         raise HTTPException(status_code=403, detail="Cat ID does not match the session")
 
-    rec_result = await image_processing_service.get_processing_result(cat_id)
+    rec_result = await image_processing_service.get_processing_result(
+        cat_id, include_image=inline_image
+    )
     if rec_result is None:
         raise HTTPException(
             status_code=404,
             detail=f"Recommendations for cat_id={cat_id} not found",
         )
 
+    # Изображение отдаётся отдельным кешируемым запросом по ссылке
+    image_url = request.scope.get("root_path", "") + request.app.url_path_for(
+        "get_haircut_image", haircut_id=str(rec_result["haircut_id"])
+    )
+    if image_width is not None:
+        image_url += f"?width={image_width}"
     return CatRecommendationsResponse(
         cat_id=rec_result["cat_id"],
-        image=base64.b64encode(rec_result["image"]).decode("utf-8"),
+        image_url=image_url,
+        image=base64.b64encode(rec_result["image"]).decode("utf-8")
+        if inline_image and rec_result["image"] is not None
+        else None,
         recommendation=rec_result["recommendation"],
     )
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+@router.get("/haircuts/{haircut_id}/image", name="get_haircut_image")
+async def get_haircut_image(
+    request: Request,
+    haircut_id: int,
+    width: int | None = Query(
+        None,
+        ge=1,
+        le=4096,
+        description="Нужная ширина: отдаётся самая маленькая копия не уже неё",
+    ),
+    db_session: AsyncSession = Depends(get_db_session),
+    haircut_catalog: HaircutCatalog | None = Depends(get_haircut_catalog),
+    blob_store: BlobStore | None = Depends(get_blob_store),
+):
+    """Изображение стрижки (оригинал или копия по ширине) с ETag и HTTP-кешированием"""
+    if haircut_catalog is not None:
+        haircut = await haircut_catalog.get(haircut_id)
+    else:
+        repo = HaircutsRepository(db_session, redis=None)  # только чтение
+        row = await repo.get_by_id(haircut_id)
+        haircut = (
+            catalog_entry(row, await repo.get_renditions([haircut_id]))
+            if row is not None
+            else None
+        )
+
+    if haircut is None or haircut.image_etag is None:
+        raise HTTPException(status_code=404, detail="Haircut image not found")
+
+    headers = {
+        "Cache-Control": f"public, max-age={settings.HAIRCUT_IMAGE_MAX_AGE}",
+    }
+    rendition = None
+    rendition_path = None
+    if width is not None:
+        # Формат копии зависит от Accept (WebP или JPEG)
+        headers["Vary"] = "Accept"
+        rendition = choose_rendition(haircut, width, request.headers.get("accept", ""))
+        if rendition is not None and blob_store is not None:
+            rendition_path = blob_store.local_path(rendition.image_hash)
+        if rendition_path is None:
+            # Копий нет (стрижка не перенесена) — отдаём оригинал
+            rendition = None
+    etag = rendition.etag if rendition is not None else haircut.image_etag
+    headers["ETag"] = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if rendition is not None and rendition_path is not None:
+        return FileResponse(
+            rendition_path, media_type=rendition.content_type, headers=headers
+        )
+
+    # Файл из хранилища отдаётся сервером с диска, минуя память приложения
+    path = image_path(haircut, blob_store)
+    if path is not None:
+        return FileResponse(
+            path, media_type=haircut.image_content_type, headers=headers
+        )
+    image = await read_image(haircut, blob_store)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Haircut image not found")
+    return Response(
+        content=image, media_type=haircut.image_content_type, headers=headers
+    )
@@ -31,12 +31,14 @@ class ImageUploadResponse(BaseModel):
 
 
 class ProcessCatResponse(BaseModel):
-    cat_id: int
-    status: str  # "processing", "completed", "error"
+    cat_id: Optional[int] = None  # появляется после обработки задачи
+    job_id: Optional[str] = None
+    status: str  # "pending", "processing", "completed", "error"
 
 
 class CatProcessingStatusResponse(BaseModel):
-    cat_id: int
+    cat_id: Optional[int] = None
+    job_id: Optional[str] = None
     status: str  # "pending", "processing", "completed", "error"
     error_message: Optional[str] = None
     updated_at: datetime
@@ -44,7 +46,9 @@ class CatProcessingStatusResponse(BaseModel):
 
 class CatRecommendationsResponse(BaseModel):
     cat_id: int
-    image: str
+    image_url: str
+    # base64 изображения — только при ?inline_image=true (старые клиенты)
+    image: Optional[str] = None
     recommendation: "HaircutRecommendation"
 
 
@@ -1,3 +1,5 @@
+from typing import List, Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,9 +12,96 @@ class Settings(BaseSettings):
     NEURAL_API_URL: str = "http://localhost:8050"
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Реплики сервиса нейросети; пустой список — только NEURAL_API_URL
+    NEURAL_API_URLS: List[str] = []
+    NEURAL_BALANCING: Literal["least_outstanding", "consistent_hash"] = (
+        "least_outstanding"
+    )
+    # Circuit breaker: реплика исключается после N сбоев подряд на время reset
+    NEURAL_BREAKER_FAILURES: int = 5
+    NEURAL_BREAKER_RESET_SECONDS: float = 30.0
+    # Хедж: повтор на другой реплике, если ответ дольше её p95
+    NEURAL_HEDGE_ENABLED: bool = False
+    NEURAL_HEDGE_MIN_DELAY_MS: int = 20
     NEURAL_API_TIMEOUT: int = 60
+    # Адаптивный (AIMD) лимит одновременных запросов к нейросети
+    NEURAL_CONCURRENCY_LIMIT_ENABLED: bool = True
+    NEURAL_CONCURRENCY_INITIAL_LIMIT: int = 20
+    NEURAL_CONCURRENCY_MIN_LIMIT: int = 2
+    NEURAL_CONCURRENCY_MAX_LIMIT: int = 200
+    # Задержка выше baseline * tolerance считается признаком перегрузки
+    NEURAL_CONCURRENCY_LATENCY_TOLERANCE: float = 2.0
+    # Транспорт до нейросети: local (в процессе API), http, uds (Unix-сокет).
+    # Сравнение задержек: python -m cat_server.scripts.benchmarks.neural_transports
+    NEURAL_TRANSPORT: Literal["local", "http", "uds"] = "http"
+    NEURAL_UDS_PATH: str = "/tmp/cat-neural.sock"
+    # Пул HTTP-соединений к сервису нейросети
+    NEURAL_POOL_LIMIT: int = 100
+    NEURAL_POOL_LIMIT_PER_HOST: int = 50
+    NEURAL_KEEPALIVE_TIMEOUT: int = 30
+    NEURAL_DNS_CACHE_TTL: int = 300
+    # Компактный ответ нейросети (msgpack/JSON без изображения)
+    NEURAL_COMPACT_RESPONSE: bool = True
+    # Приведение изображения к входу модели на стороне API перед отправкой:
+    # off | jpeg | png | raw (несжатый RGB); размер — imageSize моделей
+    API_IMAGE_NORMALIZATION: Literal["off", "jpeg", "png", "raw"] = "off"
+    API_IMAGE_NORMALIZATION_SIZE: int = 224
+    # Процессы Pillow для валидации загрузок (0 — поток вместо пула процессов)
+    IMAGE_VALIDATION_WORKERS: int = 2
+
+    # Микробатчинг инференса в сервисе нейросети
+    NEURAL_BATCH_MAX_SIZE: int = 8
+    NEURAL_BATCH_MAX_WAIT_MS: int = 5
+    # Максимум изображений в одном запросе POST /batch
+    NEURAL_BATCH_ENDPOINT_MAX_ITEMS: int = 32
+    # Пул потоков инференса и предел ожидающих изображений (сверх него — 503)
+    NEURAL_INFERENCE_WORKERS: int = 2
+    NEURAL_INFERENCE_QUEUE_SIZE: int = 32
+    # Один проход MobileNet на обе модели Teachable Machine (если backbone общий)
+    NEURAL_SHARED_BACKBONE: bool = False
+    # Каскад фильтр + стрижка одним tf.function (опционально с XLA)
+    NEURAL_FUSED_CASCADE: bool = False
+    NEURAL_XLA: bool = False
+    # Декодирование в сервисе нейросети: tf | tf_jpeg_ratio | pil_draft
+    NEURAL_PREPROCESS_BACKEND: Literal["tf", "tf_jpeg_ratio", "pil_draft"] = "tf"
+
+    # Кеш ответов нейросети по хешу изображения (локальный LRU + Redis)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_TTL: int = 3600
+    RESULT_CACHE_NEGATIVE_TTL: int = 300
+
+    # Асинхронная обработка загрузок: Redis Stream + воркеры (cat-worker)
+    JOBS_STREAM: str = "image_jobs"
+    JOBS_GROUP: str = "image_workers"
+    # Время жизни задачи: статус, данные изображения и запись в потоке
+    JOBS_TTL: int = 3600
+    JOBS_WORKER_CONCURRENCY: int = 4
+    # Через сколько мс простоя запись упавшего воркера забирает другой
+    JOBS_CLAIM_IDLE_MS: int = 60000
+    JOBS_MAX_ATTEMPTS: int = 3
+
+    # Push-уведомления о статусе обработки (SSE)
+    SSE_HEARTBEAT_SECONDS: int = 15
+    SSE_QUEUE_SIZE: int = 16
+
+    # Логи обработки (ProcessingLogs): буфер в памяти, запись пачками
+    PROCESSING_LOG_ENABLED: bool = True
+    PROCESSING_LOG_BUFFER_SIZE: int = 10000
+    PROCESSING_LOG_BATCH_SIZE: int = 500
+    PROCESSING_LOG_FLUSH_INTERVAL: float = 2.0
 
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    # Cache-Control: max-age для GET /haircuts/{id}/image
+    HAIRCUT_IMAGE_MAX_AGE: int = 86400
+    # Изображения стрижек: local — файлы в BLOB_STORE_DIR по sha256, в БД
+    # только хеш и метаданные; database — в столбце ImageBytes, как раньше.
+    # Для local BLOB_STORE_DIR — абсолютный путь к существующему каталогу
+    # (общий том всех процессов API), иначе приложение не стартует
+    HAIRCUT_IMAGE_STORAGE: Literal["local", "database"] = "database"
+    BLOB_STORE_DIR: str = ""
+    # Запас на заголовки multipart сверх MAX_FILE_SIZE для лимита тела запроса
+    UPLOAD_BODY_OVERHEAD: int = 64 * 1024
     APP_TITLE: str = "Cat AI API"
     APP_VERSION: str = "1.0.0"
 
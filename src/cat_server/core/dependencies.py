@@ -1,14 +1,26 @@
-from typing import Annotated
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated
 
 import redis.asyncio as aioredis
-from fastapi import Depends
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from cat_server.core.config import settings
 from cat_server.core.database import AsyncSessionLocal
-from cat_server.services.neural_service import NeuralService
+from cat_server.infrastructure.blob_store import BlobStore, LocalBlobStore
+from cat_server.services.concurrency_limiter import AdaptiveConcurrencyLimiter
+from cat_server.services.haircut_catalog import HaircutCatalog
+from cat_server.services.image_processing_service import NeuralNetworkClient
+from cat_server.services.image_validation import ImageValidator
+from cat_server.services.processing_jobs import ProcessingJobQueue
+from cat_server.services.processing_logs import ProcessingLogBuffer
+from cat_server.services.result_cache import ResultCache
+from cat_server.services.session_events import SessionEventHub
 from cat_server.services.user_session_service import UserSessionService
 
+if TYPE_CHECKING:
+    from cat_server.services.neural_service import NeuralService
+
 
 async def get_redis() -> aioredis.Redis:
     redis = await aioredis.from_url(settings.REDIS_URL, decode_responses=True)
@@ -18,11 +30,85 @@ async def get_redis() -> aioredis.Redis:
 RedisDep = Annotated[aioredis.Redis, Depends(get_redis)]
 
 
-async def get_neural_service():
-    return NeuralService()
+async def get_neural_service() -> "NeuralService":
+    # Импорт здесь: модуль тянет TensorFlow, а dependencies импортируют и
+    # API с транспортом http, и процессы пула валидации изображений
+    from cat_server.services.neural_service import NeuralService
+
+    return NeuralService(
+        max_batch_size=settings.NEURAL_BATCH_MAX_SIZE,
+        max_batch_wait_ms=settings.NEURAL_BATCH_MAX_WAIT_MS,
+        inference_workers=settings.NEURAL_INFERENCE_WORKERS,
+        inference_queue_size=settings.NEURAL_INFERENCE_QUEUE_SIZE,
+        shared_backbone=settings.NEURAL_SHARED_BACKBONE,
+        fused_cascade=settings.NEURAL_FUSED_CASCADE,
+        xla=settings.NEURAL_XLA,
+        preprocess_backend=settings.NEURAL_PREPROCESS_BACKEND,
+    )
+
+
+NeuralDep = Annotated["NeuralService", Depends(get_neural_service)]
+
+
+async def create_neural_client() -> NeuralNetworkClient:
+    # Транспорт выбирается один раз при старте приложения
+    neural_service = None
+    if settings.NEURAL_TRANSPORT == "local":
+        neural_service = await get_neural_service()
+        if not await neural_service.initialize():
+            raise RuntimeError(
+                "Не удалось загрузить нейросеть для локального транспорта"
+            )
+
+    return NeuralNetworkClient(
+        base_url=settings.NEURAL_API_URL,
+        timeout=settings.NEURAL_API_TIMEOUT,
+        pool_limit=settings.NEURAL_POOL_LIMIT,
+        pool_limit_per_host=settings.NEURAL_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=settings.NEURAL_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl=settings.NEURAL_DNS_CACHE_TTL,
+        compact_response=settings.NEURAL_COMPACT_RESPONSE,
+        transport=settings.NEURAL_TRANSPORT,
+        uds_path=settings.NEURAL_UDS_PATH,
+        neural_service=neural_service,
+        endpoints=settings.NEURAL_API_URLS,
+        balancing=settings.NEURAL_BALANCING,
+        breaker_failure_threshold=settings.NEURAL_BREAKER_FAILURES,
+        breaker_reset_timeout=settings.NEURAL_BREAKER_RESET_SECONDS,
+        hedge=settings.NEURAL_HEDGE_ENABLED,
+        hedge_min_delay_ms=settings.NEURAL_HEDGE_MIN_DELAY_MS,
+        limiter=AdaptiveConcurrencyLimiter(
+            initial_limit=settings.NEURAL_CONCURRENCY_INITIAL_LIMIT,
+            min_limit=settings.NEURAL_CONCURRENCY_MIN_LIMIT,
+            max_limit=settings.NEURAL_CONCURRENCY_MAX_LIMIT,
+            latency_tolerance=settings.NEURAL_CONCURRENCY_LATENCY_TOLERANCE,
+        )
+        if settings.NEURAL_CONCURRENCY_LIMIT_ENABLED
+        else None,
+        normalization=settings.API_IMAGE_NORMALIZATION,
+        normalization_size=settings.API_IMAGE_NORMALIZATION_SIZE,
+    )
+
+
+def get_neural_client(request: Request) -> NeuralNetworkClient:
+    # Клиент с пулом соединений создаётся один раз в lifespan
+    return request.app.state.neural_client
+
+
+def create_result_cache(redis: aioredis.Redis) -> ResultCache | None:
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    return ResultCache(
+        redis=redis,
+        max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+        ttl=settings.RESULT_CACHE_TTL,
+        negative_ttl=settings.RESULT_CACHE_NEGATIVE_TTL,
+    )
 
 
-NeuralDep = Annotated[NeuralService, Depends(get_neural_service)]
+def get_result_cache(request: Request) -> ResultCache | None:
+    # Кеш живёт всё время работы приложения (создаётся в lifespan)
+    return getattr(request.app.state, "result_cache", None)
 
 
 async def get_db_session():
@@ -39,32 +125,145 @@ async def get_user_session_service(
     return UserSessionService(redis=redis, session_ttl=3600)
 
 
-def get_image_processing_service(
-    user_session: UserSessionService = Depends(get_user_session_service),
-    db_session: AsyncSession = Depends(get_db_session),
+def build_image_processing_service(
+    user_session: UserSessionService,
+    db_session: AsyncSession,
+    neural_client: NeuralNetworkClient,
+    result_cache: ResultCache | None = None,
+    image_validator: ImageValidator | None = None,
+    haircut_catalog: HaircutCatalog | None = None,
+    blob_store: BlobStore | None = None,
+    processing_logs: ProcessingLogBuffer | None = None,
 ):
+    # Сборка сервиса вне FastAPI Depends — используется и воркером задач
     from cat_server.infrastructure.repositories import (
         CatsRepository,
         HaircutsRepository,
         RecommendationsRepository,
     )
-    from cat_server.services.image_processing_service import (
-        ImageProcessingService,
-        NeuralNetworkClient,
-    )
+    from cat_server.services.image_processing_service import ImageProcessingService
 
     cats_repo = CatsRepository(db_session)
-    haircuts_repo = HaircutsRepository(db_session)
+    # Redis приложения: изменения стрижек через этот репозиторий
+    # доходят до каталогов всех процессов API
+    haircuts_repo = HaircutsRepository(db_session, redis=user_session.redis)
     recommendations_repo = RecommendationsRepository(db_session)
 
-    neural_client = NeuralNetworkClient(
-        base_url=settings.NEURAL_API_URL, timeout=settings.NEURAL_API_TIMEOUT
-    )
-
     return ImageProcessingService(
         cats_repo=cats_repo,
         haircut_repo=haircuts_repo,
         recommendations_repo=recommendations_repo,
         user_session_service=user_session,
         neural_client=neural_client,
+        result_cache=result_cache,
+        image_validator=image_validator,
+        haircut_catalog=haircut_catalog,
+        blob_store=blob_store,
+        processing_logs=processing_logs,
+    )
+
+
+def create_image_validator() -> ImageValidator:
+    # Миниатюра готовится при валидации, только если клиент её использует
+    return ImageValidator(
+        workers=settings.IMAGE_VALIDATION_WORKERS,
+        thumbnail_mode=settings.API_IMAGE_NORMALIZATION,
+        thumbnail_size=settings.API_IMAGE_NORMALIZATION_SIZE,
+    )
+
+
+def get_image_validator(request: Request) -> ImageValidator | None:
+    # Пул процессов создаётся один раз в lifespan
+    return getattr(request.app.state, "image_validator", None)
+
+
+def create_local_blob_store() -> LocalBlobStore:
+    # Относительный путь зависел бы от рабочего каталога процесса, а пустой
+    # каталог вместо смонтированного тома — отдавал бы 404 на все изображения
+    root = Path(settings.BLOB_STORE_DIR)
+    if not root.is_absolute():
+        raise RuntimeError(
+            f"BLOB_STORE_DIR должен быть абсолютным путём: {settings.BLOB_STORE_DIR!r}"
+        )
+    if not root.is_dir():
+        raise RuntimeError(f"Каталог BLOB_STORE_DIR не найден: {root}")
+    return LocalBlobStore(root)
+
+
+def create_blob_store() -> BlobStore | None:
+    if settings.HAIRCUT_IMAGE_STORAGE != "local":
+        return None
+    return create_local_blob_store()
+
+
+def get_blob_store(request: Request) -> BlobStore | None:
+    return getattr(request.app.state, "blob_store", None)
+
+
+def create_haircut_catalog(redis: aioredis.Redis) -> HaircutCatalog:
+    return HaircutCatalog(session_factory=AsyncSessionLocal, redis=redis)
+
+
+def get_haircut_catalog(request: Request) -> HaircutCatalog | None:
+    # Каталог загружается в lifespan и обновляется по Redis pub/sub
+    return getattr(request.app.state, "haircut_catalog", None)
+
+
+def create_processing_log_buffer() -> ProcessingLogBuffer | None:
+    if not settings.PROCESSING_LOG_ENABLED:
+        return None
+    return ProcessingLogBuffer(
+        session_factory=AsyncSessionLocal,
+        max_size=settings.PROCESSING_LOG_BUFFER_SIZE,
+        batch_size=settings.PROCESSING_LOG_BATCH_SIZE,
+        flush_interval=settings.PROCESSING_LOG_FLUSH_INTERVAL,
+    )
+
+
+def get_processing_log_buffer(request: Request) -> ProcessingLogBuffer | None:
+    # Буфер сбрасывается фоновой задачей и при остановке в lifespan
+    return getattr(request.app.state, "processing_logs", None)
+
+
+def get_image_processing_service(
+    user_session: UserSessionService = Depends(get_user_session_service),
+    db_session: AsyncSession = Depends(get_db_session),
+    result_cache: ResultCache | None = Depends(get_result_cache),
+    neural_client: NeuralNetworkClient = Depends(get_neural_client),
+    image_validator: ImageValidator | None = Depends(get_image_validator),
+    haircut_catalog: HaircutCatalog | None = Depends(get_haircut_catalog),
+    blob_store: BlobStore | None = Depends(get_blob_store),
+    processing_logs: ProcessingLogBuffer | None = Depends(get_processing_log_buffer),
+):
+    return build_image_processing_service(
+        user_session,
+        db_session,
+        neural_client,
+        result_cache,
+        image_validator,
+        haircut_catalog,
+        blob_store,
+        processing_logs,
+    )
+
+
+def create_job_queue(redis: aioredis.Redis) -> ProcessingJobQueue:
+    return ProcessingJobQueue(
+        redis=redis,
+        stream=settings.JOBS_STREAM,
+        group=settings.JOBS_GROUP,
+        job_ttl=settings.JOBS_TTL,
     )
+
+
+def get_job_queue(request: Request) -> ProcessingJobQueue:
+    return request.app.state.job_queue
+
+
+def create_event_hub(redis: aioredis.Redis) -> SessionEventHub:
+    return SessionEventHub(redis=redis, queue_size=settings.SSE_QUEUE_SIZE)
+
+
+def get_event_hub(request: Request) -> SessionEventHub:
+    # Одна подписка на Redis pub/sub на процесс (создаётся в lifespan)
+    return request.app.state.event_hub
@@ -1,7 +1,15 @@
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+
+class ImageThumbnail(BaseModel):
+    # Копия размера входа модели, подготовленная при валидации
+    data: bytes
+    content_type: str
+    format: str  # "JPEG", "PNG" или "RAW"
+    size: int  # сторона квадрата
 
 
 class ImageData(BaseModel):
@@ -12,6 +20,11 @@ class ImageData(BaseModel):
     resolution: Optional[str] = None
     uploaded_at: Optional[datetime] = None
     is_processed: Optional[bool] = False
+    # Заполняются при валидации, чтобы дальше не разбирать файл повторно
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: Optional[int] = None  # EXIF Orientation, 1..8
+    thumbnail: Optional["ImageThumbnail"] = Field(default=None, exclude=True)
 
 
 class SessionData(BaseModel):
@@ -79,7 +92,7 @@ class NeuralNetworkRequest(BaseModel):
 
 class NeuralNetworkResponse(BaseModel):
     analysis_result: "AnalysisResult"
-    processed_image: "ImageData"
+    processed_image: Optional["ImageData"] = None  # в компактном ответе не передаётся
     processing_time_ms: int
     processing_metadata: Dict[str, Any]
 
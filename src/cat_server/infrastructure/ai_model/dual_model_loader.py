@@ -1,16 +1,48 @@
+import io
 import json
 import logging
 import os
+import time
+from importlib import resources
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Literal, Tuple, Union
 
 import numpy as np
 import tensorflow as tf
+from PIL import Image as PILImage
+
+from cat_server.infrastructure.ai_model.shared_backbone import SharedBackbone
 
 logger = logging.getLogger(__name__)
 
 base_directory = Path(__file__).resolve().parent.parent
 
+# Сырые байты изображения или уже подготовленный тензор [batch, size, size, 3]
+ImageInput = Union[bytes, np.ndarray]
+
+# tf — полное декодирование tf.image.decode_image (как раньше);
+# tf_jpeg_ratio — JPEG декодируется в 2/4/8 раз меньше (DCT-scaling в libjpeg);
+# pil_draft — Pillow draft(): тот же приём через Pillow; не-JPEG — как в tf
+PreprocessBackend = Literal["tf", "tf_jpeg_ratio", "pil_draft"]
+
+JPEG_RATIOS = (8, 4, 2)
+
+# Допустимое расхождение общего backbone с двумя моделями: округление float32
+SHARED_BACKBONE_TOLERANCE = 1e-4
+
+
+def _sample_image() -> bytes | None:
+    # Фото кота из каталога стрижек (данные пакета) для проверки при загрузке
+    try:
+        images_dir = resources.files("cat_server.scripts.haircuts") / "haircut_images"
+        path = min(
+            (p for p in images_dir.iterdir() if p.name.lower().endswith(".jpg")),
+            key=lambda p: p.name,
+        )
+        return path.read_bytes()
+    except (ModuleNotFoundError, FileNotFoundError, ValueError):
+        return None
+
 
 class DualModelLoader:
     # Загрузчик двух моделей: фильтр кота и основная модель стрижек
@@ -19,13 +51,30 @@ class DualModelLoader:
         self,
         main_model_dir: str = str(base_directory / "models" / "main_model"),
         cat_filter_model_dir: str = str(base_directory / "models" / "cat_filter"),
+        shared_backbone: bool = False,
+        fused_cascade: bool = False,
+        xla: bool = False,
+        preprocess_backend: PreprocessBackend = "tf",
     ):
         self.main_model_dir = main_model_dir
         self.cat_filter_model_dir = cat_filter_model_dir
         self.main_model = None
         self.cat_filter_model = None
+        self.use_shared_backbone = shared_backbone
+        self.shared_backbone: SharedBackbone | None = None
+        self.use_fused_cascade = fused_cascade
+        self.use_xla = xla
+        self.fused_cascade: Any = None
         self.main_metadata: Dict[str, Any] = {}
         self.cat_filter_metadata: Dict[str, Any] = {}
+        self.preprocess_backend = preprocess_backend
+        self.preprocess_count = 0
+        self.preprocess_total_ms = 0.0
+
+    @property
+    def image_size(self) -> int:
+        # Сторона квадратного входа моделей (imageSize из metadata.json)
+        return int(self.main_metadata.get("imageSize", 224))
 
     def load_models(self) -> bool:
         try:
@@ -52,6 +101,12 @@ class DualModelLoader:
             # Загружаем метаданные
             self._load_metadata()
 
+            if self.use_shared_backbone:
+                self._init_shared_backbone()
+
+            if self.use_fused_cascade:
+                self._init_fused_cascade()
+
             return True
 
         except Exception as e:
@@ -77,42 +132,244 @@ class DualModelLoader:
                 f"📊 Классы основной модели: {self.main_metadata.get('labels', [])}"
             )
 
+    def _init_shared_backbone(self) -> None:
+        shared = SharedBackbone.from_models(
+            self.cat_filter_model,
+            self.main_model,
+            image_size=self.image_size,
+        )
+        if shared is None:
+            logger.info("Общий backbone не обнаружен, используются две модели")
+            return
+        if not self._shared_backbone_matches(shared):
+            logger.warning(
+                "⚠️ Общий backbone расходится с моделями, используются две модели"
+            )
+            return
+
+        self.shared_backbone = shared
+        logger.info("✅ Общий backbone MobileNet: один проход на изображение")
+
+    def _shared_backbone_matches(self, shared: SharedBackbone) -> bool:
+        # Головы SharedBackbone собраны по предположению (relu между слоями,
+        # softmax на выходе, порядок переменных), поэтому один раз при загрузке
+        # сверяем их с serving_default на фото из каталога
+        sample = _sample_image()
+        if sample is None:
+            logger.warning("⚠️ Нет образца изображения для проверки общего backbone")
+            return False
+        try:
+            batch = self.preprocess_image(sample)
+            features = shared.features(batch)
+            delta = max(
+                np.abs(
+                    shared.cat_filter_scores(features)
+                    - self._run_signature(self.cat_filter_model, batch)
+                ).max(),
+                np.abs(
+                    shared.main_scores(features)
+                    - self._run_signature(self.main_model, batch)
+                ).max(),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Проверка общего backbone не удалась: {e}")
+            return False
+        logger.info(f"Общий backbone: расхождение с моделями {delta:.2e}")
+        return bool(delta <= SHARED_BACKBONE_TOLERANCE)
+
+    def _cat_label_index(self) -> int:
+        # Индекс класса "cat" в выходе фильтра, та же логика что в _cat_confidence
+        filter_labels = self.cat_filter_metadata.get("labels", ["cat", "not_cat"])
+        for i, label in enumerate(filter_labels):
+            if label.lower() == "cat":
+                return i
+        return 0
+
+    def _build_fused_cascade(self, jit_compile: bool) -> Any:
+        cat_index = self._cat_label_index()
+        num_classes = len(self.main_metadata.get("labels", [])) or None
+        shared = self.shared_backbone
+        filter_fn = self.cat_filter_model.signatures["serving_default"]  # pyright: ignore[reportOptionalMemberAccess]
+        main_fn = self.main_model.signatures["serving_default"]  # pyright: ignore[reportOptionalMemberAccess]
+
+        def first_output(outputs: Dict[str, tf.Tensor]) -> tf.Tensor:
+            return outputs[list(outputs.keys())[0]]
+
+        size = self.image_size
+
+        @tf.function(
+            input_signature=[
+                tf.TensorSpec([None, size, size, 3], tf.float32),
+                tf.TensorSpec([], tf.float32),
+            ],
+            jit_compile=jit_compile,
+        )
+        def cascade(images: tf.Tensor, threshold: tf.Tensor) -> Dict[str, tf.Tensor]:
+            if shared is not None:
+                # Общий backbone: обе головы считаются за один проход
+                filter_scores, hairstyle_scores = shared.tf_scores(images)
+                cat_confidence = filter_scores[:, cat_index]
+                is_cat = cat_confidence >= threshold
+            else:
+                filter_scores = first_output(filter_fn(images))
+                cat_confidence = filter_scores[:, cat_index]
+                is_cat = cat_confidence >= threshold
+                # Основная модель не запускается, если в батче нет ни одного кота
+                hairstyle_scores = tf.cond(
+                    tf.reduce_any(is_cat),
+                    lambda: first_output(main_fn(images)),
+                    lambda: tf.zeros(
+                        [tf.shape(images)[0], num_classes or 1], tf.float32
+                    ),
+                )
+            return {
+                "cat_confidence": cat_confidence,
+                "is_cat": is_cat,
+                "hairstyle_scores": hairstyle_scores,
+            }
+
+        # Трассировка при загрузке, чтобы первый запрос не платил за компиляцию
+        cascade(tf.zeros([1, size, size, 3], tf.float32), tf.constant(0.8))
+        return cascade
+
+    def _init_fused_cascade(self) -> None:
+        # Если XLA не компилирует граф, пробуем без XLA, затем — Python-каскад
+        for jit_compile in [True, False] if self.use_xla else [False]:
+            try:
+                self.fused_cascade = self._build_fused_cascade(jit_compile)
+                logger.info(f"✅ Слитый граф каскада собран (XLA: {jit_compile})")
+                return
+            except Exception as e:
+                logger.warning(
+                    f"⚠️ Не удалось собрать слитый граф (XLA: {jit_compile}): {e}"
+                )
+        self.fused_cascade = None
+
     def preprocess_image(self, image_data: bytes) -> np.ndarray:
         # Предобработка изображения
+        started = time.perf_counter()
         try:
-            image = tf.image.decode_image(image_data, channels=3)
-            image = tf.image.resize(image, [224, 224])
+            image = self._decode(image_data)
+            image = tf.image.resize(image, [self.image_size, self.image_size])
             image = tf.cast(image, tf.float32) / 255.0
             image = tf.expand_dims(image, axis=0)
             return image.numpy()
         except Exception as e:
             logger.error(f"❌ Ошибка предобработки изображения: {e}")
             raise
+        finally:
+            self.preprocess_count += 1
+            self.preprocess_total_ms += (time.perf_counter() - started) * 1000
+
+    def _decode(self, image_data: bytes) -> Any:
+        # Декодирование до uint8 [h, w, 3]. Уменьшенное декодирование только
+        # для JPEG и не ниже image_size, поэтому после resize результат близок
+        # к полному; PNG/GIF/WebP tf декодирует быстрее Pillow
+        if image_data[:3] != b"\xff\xd8\xff" or self.preprocess_backend == "tf":
+            return tf.image.decode_image(image_data, channels=3)
+
+        if self.preprocess_backend == "pil_draft":
+            with PILImage.open(io.BytesIO(image_data)) as img:
+                img.draft("RGB", (self.image_size, self.image_size))
+                return np.asarray(img.convert("RGB"))
+
+        height, width = tf.image.extract_jpeg_shape(image_data)[:2].numpy()
+        ratio = next(
+            (r for r in JPEG_RATIOS if min(height, width) // r >= self.image_size),
+            1,
+        )
+        return tf.io.decode_jpeg(image_data, channels=3, ratio=ratio)
+
+    def preprocess_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.preprocess_backend,
+            "images": self.preprocess_count,
+            "mean_ms": round(self.preprocess_total_ms / self.preprocess_count, 2)
+            if self.preprocess_count
+            else 0.0,
+        }
+
+    def _ensure_preprocessed(self, image_data: ImageInput) -> np.ndarray:
+        # Повторно не декодируем то, что уже прошло предобработку
+        if isinstance(image_data, np.ndarray):
+            return image_data
+        return self.preprocess_image(image_data)
+
+    @staticmethod
+    def _run_signature(model: Any, batch: np.ndarray) -> np.ndarray:
+        # Один вызов serving_default на весь батч, возвращает матрицу [batch, classes]
+        predictions = model.signatures["serving_default"](tf.constant(batch))
+        output_key = list(predictions.keys())[0]
+        return predictions[output_key].numpy()
+
+    def _extract_features(self, batch: np.ndarray) -> np.ndarray:
+        # В режиме общего backbone MobileNet выполняется один раз на батч,
+        # иначе "признаками" служит сам входной тензор
+        if self.shared_backbone is not None:
+            return self.shared_backbone.features(batch)
+        return batch
+
+    def _cat_filter_scores(self, features: np.ndarray) -> np.ndarray:
+        if self.shared_backbone is not None:
+            return self.shared_backbone.cat_filter_scores(features)
+        return self._run_signature(self.cat_filter_model, features)
+
+    def _main_scores(self, features: np.ndarray) -> np.ndarray:
+        if self.shared_backbone is not None:
+            return self.shared_backbone.main_scores(features)
+        return self._run_signature(self.main_model, features)
+
+    def _cat_confidence(self, scores: np.ndarray) -> float:
+        # Уверенность класса "cat" по строке выхода модели-фильтра
+        filter_labels = self.cat_filter_metadata.get("labels", ["cat", "not_cat"])
+        for i, label in enumerate(filter_labels):
+            if i < len(scores) and label.lower() == "cat":
+                return float(scores[i])
+        return float(scores[0])
+
+    @staticmethod
+    def _not_a_cat(
+        cat_confidence: float, confidence_threshold: float
+    ) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": "not_a_cat",
+            "message": "На изображении не обнаружен кот. Пожалуйста, загрузите фото кота.",
+            "cat_confidence": cat_confidence,
+            "required_confidence": confidence_threshold,
+        }
+
+    def _format_hairstyle(self, scores: np.ndarray) -> Dict[str, Any]:
+        labels = self.main_metadata.get(
+            "labels", [f"Class_{i}" for i in range(len(scores))]
+        )
+
+        results = []
+        for i, score in enumerate(scores):
+            results.append(
+                {
+                    "class_name": labels[i] if i < len(labels) else f"Class_{i}",
+                    "confidence": float(score),
+                    "percentage": f"{float(score) * 100:.2f}%",
+                }
+            )
+
+        results.sort(key=lambda x: x["confidence"], reverse=True)
+
+        return {
+            "success": True,
+            "predictions": results,
+            "top_prediction": results[0] if results else None,
+        }
 
     def is_cat_image(
-        self, image_data: bytes, confidence_threshold: float = 0.8
+        self, image_data: ImageInput, confidence_threshold: float = 0.8
     ) -> Tuple[bool, float]:
         # Определяет, является ли изображение котом с помощью модели-фильтра
         try:
-            processed_image = self.preprocess_image(image_data)
-            input_tensor = tf.constant(processed_image)
-
-            predictions = self.cat_filter_model.signatures["serving_default"](  # pyright: ignore[reportOptionalMemberAccess, reportAttributeAccessIssue]
-                input_tensor
-            )
-            output_key = list(predictions.keys())[0]
-            scores = predictions[output_key].numpy()[0]
-
-            filter_labels = self.cat_filter_metadata.get("labels", ["cat", "not_cat"])
-
-            cat_confidence = 0.0
-            for i, label in enumerate(filter_labels):
-                if i < len(scores):
-                    if label.lower() == "cat":
-                        cat_confidence = float(scores[i])
-                        break
-            else:
-                cat_confidence = float(scores[0])
+            features = self._extract_features(self._ensure_preprocessed(image_data))
+            scores = self._cat_filter_scores(features)[0]
+            cat_confidence = self._cat_confidence(scores)
 
             is_cat = cat_confidence >= confidence_threshold
             logger.info(
@@ -125,75 +382,137 @@ class DualModelLoader:
             logger.error(f"❌ Ошибка определения кота: {e}")
             return False, 0.0
 
-    def predict_hairstyle(self, image_data: bytes) -> Dict[str, Any]:
+    def predict_hairstyle(self, image_data: ImageInput) -> Dict[str, Any]:
         # Предсказание стрижки
         if self.main_model is None:
             if not self.load_models():
                 raise Exception("Модели не загружены")
 
         try:
-            processed_image = self.preprocess_image(image_data)
-            input_tensor = tf.constant(processed_image)
+            features = self._extract_features(self._ensure_preprocessed(image_data))
+            scores = self._main_scores(features)[0]
+            return self._format_hairstyle(scores)
 
-            predictions = self.main_model.signatures["serving_default"](input_tensor)  # pyright: ignore[reportOptionalMemberAccess, reportAttributeAccessIssue]
-            output_key = list(predictions.keys())[0]
-            scores = predictions[output_key].numpy()[0]
+        except Exception as e:
+            logger.error(f"❌ Ошибка предсказания стрижки: {e}")
+            return {"success": False, "error": str(e)}
 
-            labels = self.main_metadata.get(
-                "labels", [f"Class_{i}" for i in range(len(scores))]
+    def _cascade(
+        self, batch: np.ndarray, require_cat: bool, confidence_threshold: float
+    ) -> Tuple[np.ndarray | None, List[int], np.ndarray]:
+        # Каскад фильтр -> стрижка над батчем. Возвращает уверенность "cat"
+        # по каждой строке (None без проверки), индексы строк, прошедших
+        # фильтр, и scores стрижек только для этих строк
+        if self.fused_cascade is not None:
+            outputs = self.fused_cascade(
+                tf.constant(batch, dtype=tf.float32),
+                tf.constant(confidence_threshold if require_cat else -1.0),
+            )
+            cat_confidences = outputs["cat_confidence"].numpy()
+            accepted = [int(i) for i in np.flatnonzero(outputs["is_cat"].numpy())]
+            main_scores = outputs["hairstyle_scores"].numpy()[accepted]
+            return (cat_confidences if require_cat else None), accepted, main_scores
+
+        features = self._extract_features(batch)
+
+        cat_confidences = None
+        accepted = list(range(len(batch)))
+        if require_cat:
+            filter_scores = self._cat_filter_scores(features)
+            cat_confidences = np.array(
+                [self._cat_confidence(row) for row in filter_scores]
             )
+            accepted = [
+                row for row in accepted if cat_confidences[row] >= confidence_threshold
+            ]
 
-            results = []
-            for i, score in enumerate(scores):
-                results.append(
-                    {
-                        "class_name": labels[i] if i < len(labels) else f"Class_{i}",
-                        "confidence": float(score),
-                        "percentage": f"{float(score) * 100:.2f}%",
-                    }
-                )
+        # Основная модель получает только изображения, прошедшие фильтр
+        main_scores = self._main_scores(features[accepted]) if accepted else None
+        return cat_confidences, accepted, main_scores  # pyright: ignore[reportReturnType]
 
-            results.sort(key=lambda x: x["confidence"], reverse=True)
+    def predict(
+        self, image_data: ImageInput, require_cat: bool = True
+    ) -> Dict[str, Any]:
+        # Комбинированное предсказание с проверкой кота
+        if self.main_model is None or self.cat_filter_model is None:
+            if not self.load_models():
+                raise Exception("Модели не загружены")
 
-            return {
-                "success": True,
-                "predictions": results,
-                "top_prediction": results[0] if results else None,
-            }
+        try:
+            # Декодируем и масштабируем один раз, тензор получают обе модели
+            processed_image = self._ensure_preprocessed(image_data)
+            cat_confidences, accepted, main_scores = self._cascade(
+                processed_image, require_cat, 0.8
+            )
+
+            if not accepted:
+                return self._not_a_cat(float(cat_confidences[0]), 0.8)  # pyright: ignore[reportOptionalSubscript]
+
+            # Если это кот или проверка отключена - делаем предсказание стрижки
+            hairstyle_result = self._format_hairstyle(main_scores[0])
+            hairstyle_result["is_cat"] = True if require_cat else None
+            if require_cat:
+                hairstyle_result["cat_confidence"] = float(cat_confidences[0])  # pyright: ignore[reportOptionalSubscript]
+
+            return hairstyle_result
 
         except Exception as e:
-            logger.error(f"❌ Ошибка предсказания стрижки: {e}")
+            logger.error(f"❌ Ошибка комбинированного предсказания: {e}")
             return {"success": False, "error": str(e)}
 
-    def predict(self, image_data: bytes, require_cat: bool = True) -> Dict[str, Any]:
-        # Комбинированное предсказание с проверкой кота
+    def predict_batch(
+        self,
+        images: List[ImageInput],
+        require_cat: bool = True,
+        confidence_threshold: float = 0.8,
+    ) -> List[Dict[str, Any]]:
+        # Пакетное предсказание: каждая модель вызывается один раз на весь батч.
+        # Формат результата для каждого изображения совпадает с predict()
         if self.main_model is None or self.cat_filter_model is None:
             if not self.load_models():
                 raise Exception("Модели не загружены")
 
+        results: List[Dict[str, Any]] = [{} for _ in images]
+
+        # Ошибка декодирования одного изображения не должна ронять весь батч
+        tensors = []
+        indices = []
+        for i, image_data in enumerate(images):
+            try:
+                tensors.append(self._ensure_preprocessed(image_data)[0])
+                indices.append(i)
+            except Exception as e:
+                results[i] = {"success": False, "error": str(e)}
+
+        if not tensors:
+            return results
+
         try:
-            # Проверяем, является ли изображение котом
-            is_cat, cat_confidence = self.is_cat_image(image_data)
-            if require_cat:
-                if not is_cat:
-                    return {
-                        "success": False,
-                        "error": "not_a_cat",
-                        "message": "На изображении не обнаружен кот. Пожалуйста, загрузите фото кота.",
-                        "cat_confidence": cat_confidence,
-                        "required_confidence": 0.8,
-                    }
+            cat_confidences, accepted, main_scores = self._cascade(
+                np.stack(tensors), require_cat, confidence_threshold
+            )
 
-            # Если это кот или проверка отключена - делаем предсказание стрижки
-            hairstyle_result = self.predict_hairstyle(image_data)
+            if cat_confidences is not None:
+                for row, i in enumerate(indices):
+                    results[i] = self._not_a_cat(
+                        float(cat_confidences[row]), confidence_threshold
+                    )
 
-            if hairstyle_result["success"]:
+            for row, scores in zip(accepted, main_scores if accepted else []):
+                i = indices[row]
+                hairstyle_result = self._format_hairstyle(scores)
                 hairstyle_result["is_cat"] = True if require_cat else None
-                if require_cat:
-                    hairstyle_result["cat_confidence"] = cat_confidence
+                if cat_confidences is not None:
+                    hairstyle_result["cat_confidence"] = float(cat_confidences[row])
+                results[i] = hairstyle_result
 
-            return hairstyle_result
+            logger.info(
+                f"Пакетное предсказание: {len(images)} изображений, котов: {len(accepted)}"
+            )
+            return results
 
         except Exception as e:
-            logger.error(f"❌ Ошибка комбинированного предсказания: {e}")
-            return {"success": False, "error": str(e)}
+            logger.error(f"❌ Ошибка пакетного предсказания: {e}")
+            for i in indices:
+                results[i] = {"success": False, "error": str(e)}
+            return results
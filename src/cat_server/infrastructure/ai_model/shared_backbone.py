@@ -0,0 +1,167 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+logger = logging.getLogger(__name__)
+
+# Teachable Machine использует MobileNetV2, обрезанный на out_relu + global pooling.
+# Ширина (alpha) в экспорте не записана, поэтому подбираем её по формам весов
+MOBILENET_ALPHAS = (0.35, 0.5, 0.75, 1.0, 1.3, 1.4)
+
+# Слой классификатора: (kernel, bias | None)
+DenseLayer = Tuple[np.ndarray, Optional[np.ndarray]]
+
+
+def _weight_key(name: str) -> str:
+    # "model/Conv1/kernel:0" -> "Conv1/kernel"; в Keras 2 у depthwise-свёрток
+    # вес называется depthwise_kernel, в Keras 3 — kernel
+    name = name.split(":")[0]
+    parts = name.split("/")[-2:]
+    if parts[-1] == "depthwise_kernel":
+        parts[-1] = "kernel"
+    return "/".join(parts)
+
+
+def _variables_by_key(model: Any) -> Dict[str, np.ndarray]:
+    return {_weight_key(v.name): v.numpy() for v in model.variables}
+
+
+def _build_head(variables: List[np.ndarray], input_dim: int) -> List[DenseLayer] | None:
+    # Голова — цепочка полносвязных слоёв поверх эмбеддинга backbone
+    layers: List[DenseLayer] = []
+    dim = input_dim
+    pending_kernel = None
+    for value in variables:
+        if value.ndim == 2 and value.shape[0] == dim:
+            if pending_kernel is not None:
+                layers.append((pending_kernel, None))
+            pending_kernel = value
+            dim = value.shape[1]
+        elif value.ndim == 1 and pending_kernel is not None and value.shape[0] == dim:
+            layers.append((pending_kernel, value))
+            pending_kernel = None
+        else:
+            return None
+    if pending_kernel is not None:
+        layers.append((pending_kernel, None))
+    return layers or None
+
+
+def _apply_head(layers: List[DenseLayer], features: Any) -> tf.Tensor:
+    # TF-операции: голова работает и в eager-режиме, и внутри tf.function
+    x = tf.convert_to_tensor(features, dtype=tf.float32)
+    for index, (kernel, bias) in enumerate(layers):
+        x = tf.matmul(x, kernel)
+        if bias is not None:
+            x = x + bias
+        if index < len(layers) - 1:
+            x = tf.nn.relu(x)
+    return tf.nn.softmax(x)
+
+
+class SharedBackbone:
+    # Общий MobileNet для фильтра кота и модели стрижек: backbone
+    # выполняется один раз, эмбеддинг получают обе классификационные головы
+
+    def __init__(
+        self,
+        backbone: Any,
+        cat_filter_head: List[DenseLayer],
+        main_head: List[DenseLayer],
+    ):
+        self.backbone = backbone
+        self.cat_filter_head = cat_filter_head
+        self.main_head = main_head
+
+    @classmethod
+    def from_models(
+        cls, cat_filter_model: Any, main_model: Any, image_size: int = 224
+    ) -> Optional["SharedBackbone"]:
+        # Возвращает None, если backbone у моделей различаются или
+        # архитектуру не удалось распознать — тогда работаем двумя моделями
+        try:
+            filter_vars = _variables_by_key(cat_filter_model)
+            main_vars = _variables_by_key(main_model)
+
+            backbone = cls._match_mobilenet(filter_vars, image_size)
+            if backbone is None:
+                logger.info("Backbone не распознан как MobileNetV2")
+                return None
+
+            backbone_keys = {_weight_key(w.path) for w in backbone.weights}
+            for key in backbone_keys:
+                if key not in main_vars or not np.array_equal(
+                    filter_vars[key], main_vars[key]
+                ):
+                    logger.info(f"Backbone моделей различается: {key}")
+                    return None
+
+            feature_dim = int(backbone.output_shape[-1])
+            filter_head = _build_head(
+                [
+                    v.numpy()
+                    for v in cat_filter_model.variables
+                    if _weight_key(v.name) not in backbone_keys
+                ],
+                feature_dim,
+            )
+            main_head = _build_head(
+                [
+                    v.numpy()
+                    for v in main_model.variables
+                    if _weight_key(v.name) not in backbone_keys
+                ],
+                feature_dim,
+            )
+            if filter_head is None or main_head is None:
+                logger.info("Не удалось выделить классификационные головы")
+                return None
+
+            return cls(backbone, filter_head, main_head)
+
+        except Exception as e:
+            logger.warning(f"⚠️ Общий backbone недоступен: {e}")
+            return None
+
+    @staticmethod
+    def _match_mobilenet(
+        variables: Dict[str, np.ndarray], image_size: int
+    ) -> Any | None:
+        for alpha in MOBILENET_ALPHAS:
+            backbone = tf.keras.applications.MobileNetV2(
+                input_shape=(image_size, image_size, 3),
+                alpha=alpha,
+                include_top=False,
+                weights=None,
+                pooling="avg",
+            )
+            values = []
+            for weight in backbone.weights:
+                value = variables.get(_weight_key(weight.path))
+                if value is None or value.shape != tuple(weight.shape):
+                    break
+                values.append(value)
+            else:
+                backbone.set_weights(values)
+                logger.info(f"Backbone распознан: MobileNetV2 alpha={alpha}")
+                return backbone
+        return None
+
+    def features(self, batch: np.ndarray) -> np.ndarray:
+        return self.backbone(batch, training=False).numpy()
+
+    def cat_filter_scores(self, features: np.ndarray) -> np.ndarray:
+        return _apply_head(self.cat_filter_head, features).numpy()
+
+    def main_scores(self, features: np.ndarray) -> np.ndarray:
+        return _apply_head(self.main_head, features).numpy()
+
+    def tf_scores(self, images: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+        # Графовый вариант для слитого каскада: (scores фильтра, scores стрижек)
+        features = self.backbone(images, training=False)
+        return (
+            _apply_head(self.cat_filter_head, features),
+            _apply_head(self.main_head, features),
+        )
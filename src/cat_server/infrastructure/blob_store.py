@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from cat_server.services.image_sniffing import detect_format
+
+
+def blob_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def image_etag(key: str) -> str:
+    # Сильный ETag из ключа блоба (sha256): тот же, что и до переноса в хранилище
+    return f'"{key[:32]}"'
+
+
+def image_content_type(data: bytes) -> str:
+    image_format = detect_format(data[:16])
+    return (
+        f"image/{image_format.lower()}" if image_format else "application/octet-stream"
+    )
+
+
+class BlobStore(ABC):
+    # Хранилище изображений каталога по содержимому: ключ — sha256 байтов,
+    # в БД остаются только хеш и метаданные
+
+    @abstractmethod
+    async def put(self, data: bytes) -> str:
+        pass
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        pass
+
+    def local_path(self, key: str) -> Path | None:
+        # Путь к файлу для отдачи без чтения в память (FileResponse);
+        # None — хранилище не локальное или файла нет
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    # Каталог на диске: root/ab/cd/abcd...; одинаковые изображения хранятся
+    # один раз, запись атомарна (временный файл + rename)
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        if len(key) != 64 or not all(c in "0123456789abcdef" for c in key):
+            raise ValueError(f"Некорректный ключ блоба: {key!r}")
+        return self.root / key[:2] / key[2:4] / key
+
+    async def put(self, data: bytes) -> str:
+        key = blob_hash(data)
+        await asyncio.to_thread(self._write, self._path(key), data)
+        return key
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    async def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).is_file)
+
+    def local_path(self, key: str) -> Path | None:
+        path = self._path(key)
+        return path if path.is_file() else None
@@ -8,6 +8,7 @@ from sqlalchemy import (
     Integer,
     LargeBinary,
     String,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -42,16 +43,46 @@ class Haircuts(Base):
     id = Column("HaircutID", Integer, primary_key=True, autoincrement=True)
     name = Column("Name", String, unique=True)
     description = Column("Description", String)
-    image_bytes = Column("ImageBytes", LargeBinary)
+    # Старые строки хранят изображение в БД; новые — в BlobStore по хешу
+    image_bytes = Column("ImageBytes", LargeBinary, nullable=True)
+    image_hash = Column("ImageHash", String(64), nullable=True)
+    image_content_type = Column("ImageContentType", String, nullable=True)
+    image_size = Column("ImageSize", Integer, nullable=True)
 
     recommendations = relationship("Recommendations", back_populates="haircuts")
+    renditions = relationship(
+        "HaircutRenditions", back_populates="haircuts", cascade="all, delete-orphan"
+    )
+
+
+class HaircutRenditions(Base):
+    # Уменьшенные копии изображения стрижки (WebP/JPEG) в BlobStore
+    __tablename__ = "HaircutRenditions"
+    __table_args__ = (UniqueConstraint("HaircutID", "Name", "Format"),)
+
+    id = Column("RenditionID", Integer, primary_key=True, autoincrement=True)
+    haircut_id = Column(
+        "HaircutID",
+        Integer,
+        ForeignKey("Haircuts.HaircutID", ondelete="CASCADE"),
+        nullable=False,
+    )
+    name = Column("Name", String, nullable=False)  # "thumb", "mobile", "full"
+    format = Column("Format", String, nullable=False)  # "WEBP", "JPEG"
+    width = Column("Width", Integer, nullable=False)
+    height = Column("Height", Integer, nullable=False)
+    image_hash = Column("ImageHash", String(64), nullable=False)
+    image_size = Column("ImageSize", Integer, nullable=False)
+
+    haircuts = relationship("Haircuts", back_populates="renditions")
 
 
 class ProcessingLogs(Base):
     __tablename__ = "ProcessingLogs"
 
     id = Column("LogID", Integer, primary_key=True, autoincrement=True)
-    cat_id = Column("CatID", Integer, ForeignKey("Cats.CatID"), nullable=False)
+    # Без кота — загрузки, завершившиеся ошибкой до создания записи Cats
+    cat_id = Column("CatID", Integer, ForeignKey("Cats.CatID"), nullable=True)
     processing_time = Column("ProcessingTime", Float)  # Float - секунды
     status = Column("Status", String)  # "success", "error", "processing"
     error_message = Column("ErrorMessage", String)
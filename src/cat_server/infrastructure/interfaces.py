@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from cat_server.infrastructure.entities import (
     Cats,
+    HaircutRenditions,
     Haircuts,
     ProcessingLogs,
     Recommendations,
@@ -31,6 +32,12 @@ class IRecommendationsRepository(ABC):
     ) -> Recommendations:
         pass
 
+    @abstractmethod
+    async def create_with_cat(
+        self, haircut: int | str, confidence: float
+    ) -> Tuple[int, int]:
+        pass
+
     @abstractmethod
     async def get_by_id(self, recommendation_id: int) -> Optional[Recommendations]:
         pass
@@ -79,6 +86,12 @@ class IHaircutsRepository(ABC):
     async def get_by_haircut_name(self, name: str) -> Optional[Haircuts]:
         pass
 
+    @abstractmethod
+    async def get_renditions(
+        self, haircut_ids: Sequence[int] | None = None
+    ) -> List[HaircutRenditions]:
+        pass
+
     @abstractmethod
     async def delete(self, haircut_id: int) -> bool:
         pass
@@ -96,6 +109,10 @@ class IProcessingLogsRepository(ABC):
     ) -> ProcessingLogs:
         pass
 
+    @abstractmethod
+    async def create_many(self, logs: Sequence[Dict[str, Any]]) -> int:
+        pass
+
     @abstractmethod
     async def get_by_id(self, log_id: int) -> Optional[ProcessingLogs]:
         pass
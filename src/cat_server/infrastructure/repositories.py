@@ -1,12 +1,16 @@
 import logging
 from datetime import datetime
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select
+import redis.asyncio as aioredis
+from sqlalchemy import Float, Integer, delete, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from cat_server.infrastructure.blob_store import BlobStore, image_content_type
 from cat_server.infrastructure.interfaces import (
     Cats,
+    HaircutRenditions,
     Haircuts,
     ICatsRepository,
     IHaircutsRepository,
@@ -16,9 +20,15 @@ from cat_server.infrastructure.interfaces import (
     Recommendations,
 )
 
+if TYPE_CHECKING:
+    from cat_server.services.haircut_renditions import RenditionImage
+
 # Настройка логгера
 logger = logging.getLogger(__name__)
 
+# Канал Redis: таблица Haircuts изменилась, каталог в памяти нужно перечитать
+HAIRCUTS_CHANGED_CHANNEL = "haircuts:changed"
+
 
 class CatsRepository(ICatsRepository):
     def __init__(self, session: AsyncSession):
@@ -75,6 +85,43 @@ class RecommendationsRepository(IRecommendationsRepository):
         await self.session.refresh(recommendation)
         return recommendation
 
+    async def create_with_cat(
+        self, haircut: int | str, confidence: float
+    ) -> Tuple[int, int]:
+        # Новый кот и его рекомендация — один запрос в одной транзакции:
+        # WITH new_cat AS (INSERT INTO "Cats" ... RETURNING "CatID")
+        # INSERT INTO "Recommendations" SELECT ... RETURNING
+        # Без refresh: нужные id приходят в RETURNING. Если стрижки нет,
+        # не остаётся и кота без рекомендации
+        if isinstance(haircut, str):
+            haircut_id = (
+                select(Haircuts.id).where(Haircuts.name == haircut).scalar_subquery()
+            )
+        else:
+            haircut_id = literal(haircut, Integer)
+        new_cat = (
+            insert(Cats)
+            .values(created_at=datetime.now())
+            .returning(Cats.id.label("cat_id"))
+            .cte("new_cat")
+        )
+        stmt = (
+            insert(Recommendations)
+            .from_select(
+                ["cat_id", "haircut_id", "confidence"],
+                select(new_cat.c.cat_id, haircut_id, literal(confidence, Float)),
+            )
+            .returning(Recommendations.cat_id, Recommendations.id)
+        )
+        try:
+            result = await self.session.execute(stmt)
+            cat_id, recommendation_id = result.one()
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return cat_id, recommendation_id
+
     async def get_by_id(self, recommendation_id: int) -> Optional[Recommendations]:
         print(f"Получение рекомендации по ID: {recommendation_id}")
         recommendation = await self.session.get(Recommendations, recommendation_id)
@@ -147,6 +194,18 @@ class ProcessingLogsRepository(IProcessingLogsRepository):
         print(f"Лог обработки создан: ID={log.id}, cat_id={log.cat_id}")
         return log
 
+    async def create_many(self, logs: Sequence[Dict[str, Any]]) -> int:
+        # Пачка записей одним executemany и одним commit (ProcessingLogBuffer)
+        if not logs:
+            return 0
+        try:
+            await self.session.execute(insert(ProcessingLogs), list(logs))
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        return len(logs)
+
     async def get_by_id(self, log_id: int) -> Optional[ProcessingLogs]:
         print(f"Получение лога обработки по ID: {log_id}")
         log = await self.session.get(ProcessingLogs, log_id)
@@ -181,26 +240,55 @@ class ProcessingLogsRepository(IProcessingLogsRepository):
 
 
 class HaircutsRepository(IHaircutsRepository):
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        redis: aioredis.Redis | None,
+        blob_store: BlobStore | None = None,
+    ):
         self.session = session
+        # redis обязателен: create/delete публикуют изменение каталога.
+        # None — только для чтения или если вызывающий публикует сам
+        self.redis = redis
+        # Без blob_store изображение пишется в ImageBytes, как раньше
+        self.blob_store = blob_store
         print("HaircutsRepository инициализирован")
 
+    async def _publish_change(self) -> None:
+        if self.redis is None:
+            return
+        # Сбой публикации не откатывает уже закоммиченную запись
+        try:
+            await self.redis.publish(HAIRCUTS_CHANGED_CHANNEL, "changed")
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось опубликовать изменение стрижек: {e}")
+
     async def create(
         self,
         name: str,
         description: str,
         image_bytes: bytes,
     ) -> Haircuts:
-        haircut = Haircuts(
-            name=name,
-            description=description,
-            image_bytes=image_bytes,
-        )
+        if self.blob_store is not None:
+            haircut = Haircuts(
+                name=name,
+                description=description,
+                image_hash=await self.blob_store.put(image_bytes),
+                image_content_type=image_content_type(image_bytes),
+                image_size=len(image_bytes),
+            )
+        else:
+            haircut = Haircuts(
+                name=name,
+                description=description,
+                image_bytes=image_bytes,
+            )
         print(f"Создание стрижки с ID/рекомендацией: {haircut.id}")
         self.session.add(haircut)
         await self.session.commit()
         await self.session.refresh(haircut)
         print(f"Стрижка создана: ID={haircut.id}")
+        await self._publish_change()
         return haircut
 
     async def get_by_id(self, haircut_id: int) -> Optional[Haircuts]:
@@ -280,6 +368,118 @@ class HaircutsRepository(IHaircutsRepository):
         result = await self.session.execute(stmt)
         return result.scalar()
 
+    async def add_renditions(
+        self, haircut_id: int, renditions: Sequence["RenditionImage"]
+    ) -> List[HaircutRenditions]:
+        # Копии пишутся в то же хранилище, что и оригинал; строки заменяют
+        # прежние копии стрижки с тем же именем и форматом
+        if self.blob_store is None:
+            raise ValueError("Для копий изображения нужен blob_store")
+        existing = await self.get_renditions([haircut_id])
+        for row in existing:
+            await self.session.delete(row)
+        await self.session.flush()
+
+        rows = []
+        for rendition in renditions:
+            rows.append(
+                HaircutRenditions(
+                    haircut_id=haircut_id,
+                    name=rendition.name,
+                    format=rendition.format,
+                    width=rendition.width,
+                    height=rendition.height,
+                    image_hash=await self.blob_store.put(rendition.data),
+                    image_size=len(rendition.data),
+                )
+            )
+        self.session.add_all(rows)
+        await self.session.commit()
+        print(f"Копии изображения стрижки {haircut_id} сохранены: {len(rows)} шт.")
+        await self._publish_change()
+        return rows
+
+    async def get_catalog_index(self) -> Dict[str, Tuple[str | None, str | None]]:
+        # Имя -> (ImageHash, Description) без чтения ImageBytes
+        result = await self.session.execute(
+            select(Haircuts.name, Haircuts.image_hash, Haircuts.description)
+        )
+        return {
+            name: (image_hash, description) for name, image_hash, description in result
+        }
+
+    async def bulk_upsert(
+        self,
+        haircuts: Sequence[Dict[str, Any]],
+        renditions: Dict[str, Sequence[Dict[str, Any]]],
+        batch_size: int = 500,
+    ) -> Dict[str, int]:
+        # Одна транзакция: INSERT ... ON CONFLICT (Name) DO UPDATE пачками,
+        # затем замена копий изображений обновлённых стрижек.
+        # Повторный запуск с теми же данными ничего не ломает
+        ids: Dict[str, int] = {}
+        try:
+            for start in range(0, len(haircuts), batch_size):
+                stmt = pg_insert(Haircuts).values(
+                    list(haircuts[start : start + batch_size])
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Haircuts.name],
+                    # excluded индексируется именами столбцов таблицы
+                    set_={
+                        column: stmt.excluded[column.name]
+                        for column in (
+                            Haircuts.__table__.c.Description,
+                            Haircuts.__table__.c.ImageBytes,
+                            Haircuts.__table__.c.ImageHash,
+                            Haircuts.__table__.c.ImageContentType,
+                            Haircuts.__table__.c.ImageSize,
+                        )
+                    },
+                ).returning(Haircuts.id, Haircuts.name)
+                result = await self.session.execute(stmt)
+                ids.update({name: haircut_id for haircut_id, name in result})
+
+            updated_ids = [ids[name] for name in renditions if name in ids]
+            if updated_ids:
+                await self.session.execute(
+                    delete(HaircutRenditions).where(
+                        HaircutRenditions.haircut_id.in_(updated_ids)
+                    )
+                )
+            rendition_rows = [
+                {**row, "haircut_id": ids[name]}
+                for name, rows in renditions.items()
+                if name in ids
+                for row in rows
+            ]
+            for start in range(0, len(rendition_rows), batch_size):
+                await self.session.execute(
+                    insert(HaircutRenditions).values(
+                        rendition_rows[start : start + batch_size]
+                    )
+                )
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+
+        print(
+            f"Стрижки загружены: {len(ids)}, копий изображений: {len(rendition_rows)}"
+        )
+        if ids:
+            await self._publish_change()
+        return ids
+
+    async def get_renditions(
+        self, haircut_ids: Sequence[int] | None = None
+    ) -> List[HaircutRenditions]:
+        stmt = select(HaircutRenditions)
+        if haircut_ids is not None:
+            stmt = stmt.where(HaircutRenditions.haircut_id.in_(haircut_ids))
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
     async def delete(self, haircut_id: int) -> bool:
         print(f"Удаление стрижки по ID: {haircut_id}")
         haircut = await self.session.get(Haircuts, haircut_id)
@@ -289,4 +489,5 @@ class HaircutsRepository(IHaircutsRepository):
         await self.session.delete(haircut)
         await self.session.commit()
         print(f"Стрижка с ID {haircut_id} удалена")
+        await self._publish_change()
         return True
@@ -9,6 +9,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from cat_server.api.endpoints import router
 from cat_server.core.config import settings
 from cat_server.core.database import check_database_connection
+from cat_server.core.dependencies import (
+    create_blob_store,
+    create_event_hub,
+    create_haircut_catalog,
+    create_image_validator,
+    create_job_queue,
+    create_neural_client,
+    create_processing_log_buffer,
+    create_result_cache,
+)
+from cat_server.core.middleware import BodySizeLimitMiddleware
 
 
 @asynccontextmanager
@@ -18,20 +29,43 @@ async def lifespan(app: FastAPI):
     # Инициализация Redis
     redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
     app.state.redis = redis_client  # ← сохраняем в состоянии приложения
+    app.state.result_cache = create_result_cache(redis_client)
+    app.state.job_queue = create_job_queue(redis_client)
+    app.state.event_hub = create_event_hub(redis_client)
+    app.state.image_validator = create_image_validator()
+    app.state.blob_store = create_blob_store()
+    app.state.haircut_catalog = create_haircut_catalog(redis_client)
+    app.state.processing_logs = create_processing_log_buffer()
     try:
+        app.state.neural_client = await create_neural_client()
         await check_database_connection()
         print("✅ Database connection OK")
+        await app.state.haircut_catalog.start()
     except Exception as e:
+        if hasattr(app.state, "neural_client"):
+            await app.state.neural_client.close()
         await redis_client.aclose()
+        app.state.image_validator.close()
         print(f"❌ Startup failed: {e}")
         raise
 
+    app.state.event_hub.start()
+    app.state.image_validator.start()
+    if app.state.processing_logs is not None:
+        app.state.processing_logs.start()
     print("✅ API is ready at http://localhost:8000")
     print("📚 Docs at http://localhost:8000/docs")
     yield
 
     # Очистка
+    if app.state.processing_logs is not None:
+        # До закрытия остального: логи последних запросов записываются в БД
+        await app.state.processing_logs.stop()
+    await app.state.haircut_catalog.stop()
+    await app.state.event_hub.stop()
+    await app.state.neural_client.close()
     await app.state.redis.aclose()
+    app.state.image_validator.close()
     print("🛑 Shutting down Cat Grooming API...")
 
 
@@ -42,6 +76,14 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Слишком большие загрузки отклоняются до разбора multipart.
+# Добавляется до CORS: последний добавленный middleware — внешний, и ответ
+# 413 тоже получает CORS-заголовки, иначе браузер его не прочитает
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=settings.MAX_FILE_SIZE + settings.UPLOAD_BODY_OVERHEAD,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -72,6 +114,31 @@ async def health_check():
     }
 
 
+@app.get("/stats")
+async def stats():
+    # Счётчики кеша результатов и пула соединений к нейросети
+    result_cache = getattr(app.state, "result_cache", None)
+    neural_client = getattr(app.state, "neural_client", None)
+    event_hub = getattr(app.state, "event_hub", None)
+    image_validator = getattr(app.state, "image_validator", None)
+    haircut_catalog = getattr(app.state, "haircut_catalog", None)
+    processing_logs = getattr(app.state, "processing_logs", None)
+    return {
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "neural_client": neural_client.stats() if neural_client is not None else None,
+        "session_events": event_hub.stats() if event_hub is not None else None,
+        "image_validation": image_validator.stats()
+        if image_validator is not None
+        else None,
+        "haircut_catalog": haircut_catalog.stats()
+        if haircut_catalog is not None
+        else None,
+        "processing_logs": processing_logs.stats()
+        if processing_logs is not None
+        else None,
+    }
+
+
 def run_server():
     """Запуск сервера через uvicorn (для uv run cat-hair-server)"""
     uvicorn.run(
@@ -2,10 +2,23 @@ import base64
 import logging
 from contextlib import asynccontextmanager
 from datetime import datetime
-
-from fastapi import FastAPI, File, HTTPException, UploadFile
-
+from typing import List
+
+from fastapi import (
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+)
+
+from cat_server.core.config import settings
 from cat_server.core.dependencies import get_neural_service
+from cat_server.services import neural_codec
+from cat_server.services.image_normalization import RAW_RGB_ENCODING, decode_raw_rgb
+from cat_server.services.inference_executor import InferenceQueueFullError
 
 neural_service = None
 
@@ -25,6 +38,8 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    if neural_service is not None:
+        await neural_service.shutdown()
     print(" Неросеть ушла спать")
 
 
@@ -32,33 +47,77 @@ app = FastAPI(title="Real Neural Network API", version="1.0.0", lifespan=lifespa
 logger = logging.getLogger(__name__)
 
 
+# Формы входа: encoded — файл изображения, raw_rgb — RGB uint8 размера модели
+INPUT_ENCODINGS = ("encoded", RAW_RGB_ENCODING)
+
+
+def _check_encoding(encoding: str) -> None:
+    if encoding not in INPUT_ENCODINGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестная кодировка {encoding!r}, "
+            f"ожидается одна из: {', '.join(INPUT_ENCODINGS)}",
+        )
+
+
+def _decode_input(data: bytes, encoding: str):
+    # Несжатый RGB от API уже размера модели — без повторного декодирования
+    if encoding == RAW_RGB_ENCODING:
+        return decode_raw_rgb(data, neural_service.model_loader.image_size)  # pyright: ignore[reportOptionalMemberAccess]
+    return data
+
+
+def _respond(payload: dict, response_format: neural_codec.ResponseFormat):
+    # Полный формат отдаётся как раньше, компактные — msgpack или JSON без картинки
+    if response_format == "full":
+        return payload
+    content, media_type = neural_codec.encode(payload, response_format)
+    return Response(content=content, media_type=media_type)
+
+
 @app.post("/", summary="Обработка изображений нейросетью")
 async def process_images(
+    request: Request,
     image: UploadFile = File(..., description="Изображение кота"),
+    encoding: str = Form(
+        "encoded", description="encoded — файл изображения, raw_rgb — RGB uint8"
+    ),
 ):
     # Проверяем что нейросеть загружена
     if not neural_service.is_loaded:  # pyright: ignore[reportOptionalMemberAccess]
         raise HTTPException(status_code=500, detail="Нейросеть не загружена")
+    _check_encoding(encoding)
 
+    response_format = neural_codec.negotiate_format(request.headers.get("accept"))
+
+    # Некорректный вход — ошибка клиента (400): ответ 500 API засчитал бы
+    # как отказ реплики в circuit breaker
+    image_data = await image.read()
     try:
-        # Читаем изображение
-        image_data = await image.read()
+        model_input = _decode_input(image_data, encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    try:
         # Обрабатываем через нейросеть
         start_time = datetime.now()
-        result = await neural_service.process_image(image_data)  # pyright: ignore[reportOptionalMemberAccess]
+        result = await neural_service.process_image(model_input)  # pyright: ignore[reportOptionalMemberAccess]
         processing_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
 
         # Если на изображении не кот - сообщаем об этом
         if not result["success"] and result.get("error") == "not_a_cat":
-            return {
+            not_a_cat = {
                 "success": False,
-                "message": " Это не кот! Пожалуйста, загрузите фото кота для анализа стрижки.",
                 "is_cat": False,
                 "cat_confidence": result.get("cat_confidence", 0),
                 "processing_time_ms": processing_time_ms,
                 "analysis_timestamp": datetime.now().isoformat(),
             }
+            if response_format == "full":
+                not_a_cat["message"] = (
+                    " Это не кот! Пожалуйста, загрузите фото кота для анализа стрижки."
+                )
+            return _respond(not_a_cat, response_format)
 
         if not result["success"]:
             raise HTTPException(
@@ -68,45 +127,177 @@ async def process_images(
         # Если это кот, то форматируем рекомендацию стрижки
         top_prediction = result["top_prediction"]
 
-        # Создаем обработанное изображение (можно вернуть оригинал или обработать)
-        encoded_image = base64.b64encode(image_data).decode("utf-8")
-
-        processed_image = {
-            "filename": image.filename,
-            "data": encoded_image,
-            "format": "JPEG",
-            "resolution": "224x224",  # Размер который использует модель
-        }
-
         response_data = {
             "success": True,
             "is_cat": True,
-            "message": f"Рекомендуемая стрижка: {top_prediction['class_name']} (уверенность: {top_prediction['percentage']})",
+            "cat_confidence": result.get("cat_confidence"),
             "analysis_result": {
                 "confidence": top_prediction["confidence"],
                 "analysis_timestamp": datetime.now().isoformat(),
                 "predicted_class": top_prediction["class_name"],
             },
-            "processed_image": processed_image,
             "processing_time_ms": processing_time_ms,
             "processing_metadata": {
                 "stub": False,
                 "source": "real_neural_network",
                 "predictions": result["predictions"],
                 "top_prediction": top_prediction,
+                "batch_size": result.get("batch_size", 1),
             },
         }
 
+        if response_format == "full" and encoding != RAW_RGB_ENCODING:
+            # Старые клиенты ожидают исходное изображение обратно в base64
+            response_data["message"] = (
+                f"Рекомендуемая стрижка: {top_prediction['class_name']} (уверенность: {top_prediction['percentage']})"
+            )
+            response_data["processed_image"] = {
+                "filename": image.filename,
+                "data": base64.b64encode(image_data).decode("utf-8"),
+                "format": "JPEG",
+                "resolution": "224x224",  # Размер который использует модель
+            }
+
         print(
             f"✅ Успешная обработка: {top_prediction['class_name']} ({top_prediction['confidence']:.2%})"
         )
-        return response_data
+        return _respond(response_data, response_format)
 
+    except InferenceQueueFullError as e:
+        # Быстрый отказ вместо бесконечной очереди
+        logger.warning(f"⚠️ Нейросеть перегружена: {e}")
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"❌ Ошибка обработки изображения: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _batch_item(index: int, filename: str | None, result: dict) -> dict:
+    # Результат одного изображения батча — в формате компактного ответа POST /
+    item = {"index": index, "filename": filename}
+    if not result.get("success") and result.get("error") == "not_a_cat":
+        item.update(
+            {
+                "success": False,
+                "is_cat": False,
+                "cat_confidence": result.get("cat_confidence", 0),
+            }
+        )
+        return item
+
+    if not result.get("success"):
+        item.update(
+            {"success": False, "error": result.get("error", "Ошибка обработки")}
+        )
+        return item
+
+    top_prediction = result["top_prediction"]
+    item.update(
+        {
+            "success": True,
+            "is_cat": True,
+            "cat_confidence": result.get("cat_confidence"),
+            "analysis_result": {
+                "confidence": top_prediction["confidence"],
+                "analysis_timestamp": datetime.now().isoformat(),
+                "predicted_class": top_prediction["class_name"],
+            },
+            "processing_metadata": {
+                "predictions": result["predictions"],
+                "top_prediction": top_prediction,
+                "batch_size": result.get("batch_size", 1),
+            },
+        }
+    )
+    return item
+
+
+@app.post("/batch", summary="Пакетная обработка изображений нейросетью")
+async def process_batch(
+    request: Request,
+    images: List[UploadFile] = File(..., description="Изображения котов"),
+    check_cat: bool = Form(True, description="Проверять, что на фото кот"),
+    encoding: str = Form(
+        "encoded", description="encoded — файлы изображений, raw_rgb — RGB uint8"
+    ),
+):
+    # Много изображений за один запрос: модели считают их настоящими батчами,
+    # ошибка одного изображения не роняет остальные
+    if not neural_service.is_loaded:  # pyright: ignore[reportOptionalMemberAccess]
+        raise HTTPException(status_code=500, detail="Нейросеть не загружена")
+    _check_encoding(encoding)
+
+    if len(images) > settings.NEURAL_BATCH_ENDPOINT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Слишком много изображений: {len(images)}, "
+            f"максимум {settings.NEURAL_BATCH_ENDPOINT_MAX_ITEMS}",
+        )
+
+    response_format = neural_codec.negotiate_format(request.headers.get("accept"))
+
+    start_time = datetime.now()
+    items: List[dict | None] = [None] * len(images)
+    payloads: List[bytes] = []
+    positions: List[int] = []
+    for index, image in enumerate(images):
+        try:
+            data = await image.read()
+        except Exception as e:
+            items[index] = _batch_item(
+                index, image.filename, {"success": False, "error": str(e)}
+            )
+            continue
+        if not data:
+            items[index] = _batch_item(
+                index, image.filename, {"success": False, "error": "Пустой файл"}
+            )
+            continue
+        try:
+            payloads.append(_decode_input(data, encoding))
+        except ValueError as e:
+            items[index] = _batch_item(
+                index, image.filename, {"success": False, "error": str(e)}
+            )
+            continue
+        positions.append(index)
+
+    try:
+        results = (
+            await neural_service.process_batch(payloads, check_cat=check_cat)  # pyright: ignore[reportOptionalMemberAccess]
+            if payloads
+            else []
+        )
+    except InferenceQueueFullError as e:
+        logger.warning(f"⚠️ Нейросеть перегружена: {e}")
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        logger.error(f"❌ Ошибка пакетной обработки: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for index, result in zip(positions, results):
+        items[index] = _batch_item(index, images[index].filename, result)
+
+    succeeded = sum(1 for item in items if item and item["success"])
+    print(f"✅ Пакетная обработка: {succeeded}/{len(images)} изображений")
+    return _respond(
+        {
+            "success": True,
+            "count": len(images),
+            "succeeded": succeeded,
+            "processing_time_ms": int(
+                (datetime.now() - start_time).total_seconds() * 1000
+            ),
+            "results": items,
+        },
+        response_format,
+    )
+
+
 @app.get("/health")
 async def health_check():
     # Проверка статуса нейросети
@@ -137,6 +328,14 @@ async def health_check():
         }
 
 
+@app.get("/stats")
+async def stats():
+    # Статистика пакетной обработки (распределение размеров батчей)
+    if neural_service is None:
+        return {"loaded": False}
+    return {"loaded": neural_service.is_loaded, **neural_service.stats()}
+
+
 @app.get("/model-info")
 async def model_info():
     # Информация о загруженной модели
@@ -197,6 +396,16 @@ async def model_info():
 def run_neural():
     import uvicorn
 
+    if settings.NEURAL_TRANSPORT == "uds":
+        # Для транспорта uds API и нейросеть общаются через Unix-сокет
+        print(f"🚀 Запуск реальной нейросети на unix:{settings.NEURAL_UDS_PATH}")
+        uvicorn.run(
+            "cat_server.neural:app",
+            uds=settings.NEURAL_UDS_PATH,
+            log_level="info",
+        )
+        return
+
     print("🚀 Запуск реальной нейросети на http://localhost:8050/docs")
     uvicorn.run(
         "cat_server.neural:app",
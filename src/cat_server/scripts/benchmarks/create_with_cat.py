@@ -0,0 +1,138 @@
+"""Прежняя вставка кота и рекомендации против create_with_cat.
+
+    python -m cat_server.scripts.benchmarks.create_with_cat [--inserts 200]
+        [--haircut Лев] [--url postgresql+asyncpg://...]
+
+Для каждого пути — среднее и p95 времени одной вставки (новая сессия на
+вставку, как в запросе API) и число обменов с Postgres на вставку: SQL-запросы
+и COMMIT. Нужна БД со стрижками (db-init, add-haircuts); созданных котов и
+рекомендации скрипт удаляет.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from cat_server.core.config import settings
+from cat_server.infrastructure.entities import Cats, Haircuts, Recommendations
+from cat_server.infrastructure.repositories import (
+    CatsRepository,
+    RecommendationsRepository,
+)
+
+
+@contextmanager
+def count_round_trips(engine):
+    # Каждый SQL-запрос и каждый COMMIT — отдельный обмен с Postgres
+    counts = {"statements": 0, "commits": 0}
+
+    def on_execute(*args):
+        counts["statements"] += 1
+
+    def on_commit(*args):
+        counts["commits"] += 1
+
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", on_execute)
+    event.listen(sync_engine, "commit", on_commit)
+    try:
+        yield counts
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", on_execute)
+        event.remove(sync_engine, "commit", on_commit)
+
+
+async def two_step(session, haircut, confidence) -> Tuple[int, int]:
+    # Прежний путь: кот и рекомендация — два INSERT, два COMMIT и два refresh
+    cat = await CatsRepository(session).create()
+    recommendation = await RecommendationsRepository(session).create(
+        cat.id, haircut, confidence
+    )
+    return cat.id, recommendation.id
+
+
+async def one_statement(session, haircut, confidence) -> Tuple[int, int]:
+    return await RecommendationsRepository(session).create_with_cat(haircut, confidence)
+
+
+PATHS = {"two_step": two_step, "create_with_cat": one_statement}
+
+
+async def measure(
+    engine, session_factory, path, haircut_id: int, inserts: int, cat_ids: List[int]
+) -> Dict[str, float]:
+    timings = []
+    with count_round_trips(engine) as counts:
+        for _ in range(inserts):
+            started = time.perf_counter()
+            async with session_factory() as session:
+                cat_id, _ = await path(session, haircut_id, 0.5)
+            timings.append((time.perf_counter() - started) * 1000)
+            cat_ids.append(cat_id)
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        "statements": counts["statements"] / inserts,
+        "commits": counts["commits"] / inserts,
+    }
+
+
+async def run(url: str, haircut: str | None, inserts: int) -> Dict[str, Dict]:
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with session_factory() as session:
+        query = select(Haircuts.id).order_by(Haircuts.id).limit(1)
+        if haircut is not None:
+            query = query.where(Haircuts.name == haircut)
+        haircut_id = await session.scalar(query)
+    if haircut_id is None:
+        await engine.dispose()
+        raise SystemExit("Стрижка не найдена: заполните каталог (add-haircuts)")
+
+    cat_ids: List[int] = []
+    try:
+        report = {}
+        for name, path in PATHS.items():
+            # Прогрев: соединения пула и подготовленные запросы asyncpg
+            await measure(engine, session_factory, path, haircut_id, 5, cat_ids)
+            report[name] = await measure(
+                engine, session_factory, path, haircut_id, inserts, cat_ids
+            )
+        return report
+    finally:
+        async with session_factory() as session:
+            await session.execute(
+                delete(Recommendations).where(Recommendations.cat_id.in_(cat_ids))
+            )
+            await session.execute(delete(Cats).where(Cats.id.in_(cat_ids)))
+            await session.commit()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк вставки кота")
+    parser.add_argument("--inserts", type=int, default=200)
+    parser.add_argument("--haircut", help="Имя стрижки (по умолчанию — первая)")
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.url, args.haircut, args.inserts))
+    print(f"Вставок на путь: {args.inserts}")
+    for name, row in report.items():
+        print(
+            f"{name:>15}: "
+            + ", ".join(f"{key}={value:.2f}" for key, value in row.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Сравнение задержки транспортов нейросети (NEURAL_TRANSPORT).
+
+    python -m cat_server.scripts.benchmarks.neural_transports
+        [--transports local http uds] [--requests 200] [--concurrency 1 8]
+        [--size 1280x960] [--port 8051]
+
+Для http и uds сервис нейросети запускается отдельным процессом uvicorn
+(как cat-neural), для local — в этом же процессе. Запросы идут через
+NeuralNetworkClient с теми же настройками пула, что у API. Для каждого
+транспорта и уровня параллельности — среднее, p50/p95/p99 задержки
+и пропускная способность.
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import aiohttp
+
+from cat_server.core.dependencies import get_neural_service
+from cat_server.domain.dto import ImageData, NeuralNetworkRequest, ProcessingException
+from cat_server.scripts.benchmarks.preprocess_backends import sample_jpegs
+from cat_server.services.image_processing_service import NeuralNetworkClient
+
+TRANSPORTS = ("local", "http", "uds")
+
+
+async def wait_ready(url: str, uds_path: str | None, timeout: float = 120.0) -> None:
+    # Ждём загрузки моделей: /health отвечает до того, как они готовы
+    connector = aiohttp.UnixConnector(path=uds_path) if uds_path else None
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession(connector=connector) as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/health") as response:
+                    if (await response.json()).get("status") == "ready":
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"Сервис нейросети не готов за {timeout:.0f} с: {url}")
+
+
+def start_server(port: int | None, uds_path: str | None) -> subprocess.Popen:
+    bind = ["--uds", uds_path] if uds_path else ["--host", "127.0.0.1"]
+    if port is not None:
+        bind += ["--port", str(port)]
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "cat_server.neural:app", "--log-level"]
+        + ["warning"]
+        + bind
+    )
+
+
+async def make_client(transport: str, port: int, uds_path: str) -> NeuralNetworkClient:
+    if transport == "local":
+        neural_service = await get_neural_service()
+        if not await neural_service.initialize():
+            raise SystemExit("Модели не загружены: нужен SavedModel в models/")
+        return NeuralNetworkClient(
+            base_url="http://localhost",
+            transport="local",
+            neural_service=neural_service,
+        )
+    if transport == "uds":
+        return NeuralNetworkClient(
+            base_url="http://localhost", transport="uds", uds_path=uds_path
+        )
+    return NeuralNetworkClient(base_url=f"http://127.0.0.1:{port}")
+
+
+async def measure(
+    client: NeuralNetworkClient,
+    images: List[Tuple[str, bytes]],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    failures = 0
+    indexes = iter(range(requests))
+
+    async def worker():
+        nonlocal failures
+        for index in indexes:
+            name, data = images[index % len(images)]
+            request = NeuralNetworkRequest(
+                image=ImageData(
+                    file_name=name, data=data, size=len(data), format="JPEG"
+                ),
+                processing_type="analysis",
+            )
+            started = time.perf_counter()
+            try:
+                await client.analyze_and_process_image(request)
+            except ProcessingException:
+                failures += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return {"failures": failures}
+
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+    return {
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "rps": len(latencies) / elapsed,
+        "failures": failures,
+    }
+
+
+async def run(
+    transports: List[str],
+    images: List[Tuple[str, bytes]],
+    requests: int,
+    concurrency: List[int],
+    port: int,
+) -> Dict[Tuple[str, int], Dict[str, float]]:
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        uds_path = str(Path(tmp) / "cat-neural.sock")
+        servers = []
+        try:
+            if "http" in transports:
+                servers.append(start_server(port, None))
+                await wait_ready(f"http://127.0.0.1:{port}", None)
+            if "uds" in transports:
+                servers.append(start_server(None, uds_path))
+                await wait_ready("http://localhost", uds_path)
+
+            for transport in transports:
+                client = await make_client(transport, port, uds_path)
+                try:
+                    # Прогрев: соединения пула, графы TF, батчер
+                    await measure(client, images, len(images), 1)
+                    for level in concurrency:
+                        report[(transport, level)] = await measure(
+                            client, images, requests, level
+                        )
+                finally:
+                    await client.close()
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait(timeout=30)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк транспортов нейросети")
+    parser.add_argument(
+        "--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS)
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--size", default="1280x960", help="Размер образцов WxH")
+    parser.add_argument("--port", type=int, default=8051)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    images = sample_jpegs((width, height))
+    report = asyncio.run(
+        run(args.transports, images, args.requests, args.concurrency, args.port)
+    )
+    print(f"Изображений: {len(images)} ({args.size}), запросов: {args.requests}")
+    for (transport, level), row in report.items():
+        print(
+            f"{transport:>5} x{level:<3}: "
+            + ", ".join(f"{key}={value:.2f}" for key, value in row.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Сравнение бэкендов декодирования DualModelLoader (NEURAL_PREPROCESS_BACKEND).
+
+    python -m cat_server.scripts.benchmarks.preprocess_backends [--size 4000x3000]
+        [--repeat 20] [--images a.jpg b.jpg] [--models]
+
+Для каждого бэкенда — среднее и p95 времени preprocess_image и отличие
+входного тензора от tf. С --models — ещё совпадение класса и разница
+вероятностей стрижек (нужны SavedModel в infrastructure/models).
+"""
+
+import argparse
+import io
+import statistics
+import time
+from importlib import resources
+from pathlib import Path
+from typing import Dict, List, Tuple, get_args
+
+import numpy as np
+from PIL import Image as PILImage
+
+# cat_server.core — до infrastructure: entities и core импортируют друг друга
+import cat_server.core  # noqa: F401
+from cat_server.infrastructure.ai_model.dual_model_loader import (
+    DualModelLoader,
+    PreprocessBackend,
+)
+
+BACKENDS: Tuple[PreprocessBackend, ...] = get_args(PreprocessBackend)
+
+
+def sample_jpegs(size: Tuple[int, int]) -> List[Tuple[str, bytes]]:
+    # Фото котов из каталога стрижек, увеличенные до размера снимка с телефона
+    images_dir = resources.files("cat_server.scripts.haircuts") / "haircut_images"
+    images = []
+    for path in sorted(images_dir.iterdir(), key=lambda p: p.name):
+        if not path.name.lower().endswith((".jpg", ".jpeg")):
+            continue
+        with PILImage.open(io.BytesIO(path.read_bytes())) as img:
+            resized = img.convert("RGB").resize(size, PILImage.Resampling.BICUBIC)
+        buffer = io.BytesIO()
+        resized.save(buffer, "JPEG", quality=90)
+        images.append((path.name, buffer.getvalue()))
+    return images
+
+
+def time_backend(
+    loader: DualModelLoader, images: List[Tuple[str, bytes]], repeat: int
+) -> Dict[str, float]:
+    for _, data in images:
+        loader.preprocess_image(data)  # прогрев
+    timings = []
+    for _ in range(repeat):
+        for _, data in images:
+            started = time.perf_counter()
+            loader.preprocess_image(data)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def tensor_delta(
+    reference: DualModelLoader,
+    loader: DualModelLoader,
+    images: List[Tuple[str, bytes]],
+) -> Dict[str, float]:
+    deltas = [
+        np.abs(loader.preprocess_image(data) - reference.preprocess_image(data))
+        for _, data in images
+    ]
+    return {
+        "mean_abs": float(np.mean([d.mean() for d in deltas])),
+        "max_abs": float(max(d.max() for d in deltas)),
+    }
+
+
+def prediction_delta(
+    reference: DualModelLoader,
+    loader: DualModelLoader,
+    images: List[Tuple[str, bytes]],
+) -> Dict[str, float]:
+    same_top = 0
+    max_delta = 0.0
+    for _, data in images:
+        expected = reference.predict(data, require_cat=False)
+        actual = loader.predict(data, require_cat=False)
+        expected_scores = {
+            p["class_name"]: p["confidence"] for p in expected["predictions"]
+        }
+        for prediction in actual["predictions"]:
+            max_delta = max(
+                max_delta,
+                abs(
+                    prediction["confidence"] - expected_scores[prediction["class_name"]]
+                ),
+            )
+        same_top += (
+            actual["top_prediction"]["class_name"]
+            == expected["top_prediction"]["class_name"]
+        )
+    return {"top_class_agreement": same_top / len(images), "max_prob_delta": max_delta}
+
+
+def run(
+    images: List[Tuple[str, bytes]], repeat: int, with_models: bool
+) -> Dict[str, Dict[str, float]]:
+    loaders = {
+        backend: DualModelLoader(preprocess_backend=backend) for backend in BACKENDS
+    }
+    if with_models:
+        for loader in loaders.values():
+            if not loader.load_models():
+                raise SystemExit("Модели не загружены: нужен SavedModel в models/")
+
+    reference = loaders["tf"]
+    report = {}
+    for backend, loader in loaders.items():
+        row = time_backend(loader, images, repeat)
+        row.update(tensor_delta(reference, loader, images))
+        if with_models:
+            row.update(prediction_delta(reference, loader, images))
+        report[backend] = row
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк декодирования изображений")
+    parser.add_argument("--size", default="4000x3000", help="Размер образцов WxH")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--images", type=Path, nargs="*", help="Свои JPEG вместо образцов"
+    )
+    parser.add_argument(
+        "--models", action="store_true", help="Сравнить и предсказания моделей"
+    )
+    args = parser.parse_args()
+
+    if args.images:
+        images = [(path.name, path.read_bytes()) for path in args.images]
+    else:
+        width, height = (int(v) for v in args.size.split("x"))
+        images = sample_jpegs((width, height))
+
+    report = run(images, args.repeat, args.models)
+    print(f"Изображений: {len(images)}, повторов: {args.repeat}")
+    for backend, row in report.items():
+        print(
+            f"{backend:>14}: "
+            + ", ".join(f"{key}={value:.4f}" for key, value in row.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
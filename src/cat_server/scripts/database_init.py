@@ -1,12 +1,27 @@
 import asyncio
 
+from sqlalchemy import text
+
 from cat_server.core.database import engine
 from cat_server.infrastructure.entities import Base
 
+# create_all не меняет существующие таблицы: столбцы, добавленные после
+# первого запуска, догоняются здесь (повторный запуск ничего не меняет)
+ALTER_COLUMNS = [
+    'ALTER TABLE "ProcessingLogs" ALTER COLUMN "CatID" DROP NOT NULL',
+    # Ссылки на изображения стрижек в BlobStore
+    'ALTER TABLE "Haircuts" ADD COLUMN IF NOT EXISTS "ImageHash" VARCHAR(64)',
+    'ALTER TABLE "Haircuts" ADD COLUMN IF NOT EXISTS "ImageContentType" VARCHAR',
+    'ALTER TABLE "Haircuts" ADD COLUMN IF NOT EXISTS "ImageSize" INTEGER',
+    'ALTER TABLE "Haircuts" ALTER COLUMN "ImageBytes" DROP NOT NULL',
+]
+
 
 async def create_database():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        for statement in ALTER_COLUMNS:
+            await conn.execute(text(statement))
     print("Все таблицы созданы!")
 
 
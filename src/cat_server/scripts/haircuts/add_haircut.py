@@ -1,12 +1,25 @@
+import argparse
 import asyncio
-import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from importlib import resources
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
-from PIL import Image
+import redis.asyncio as aioredis
 
+from cat_server.core.config import settings
 from cat_server.core.database import AsyncSessionLocal
+from cat_server.core.dependencies import create_blob_store
 from cat_server.infrastructure import HaircutsRepository
+from cat_server.infrastructure.blob_store import blob_hash
+from cat_server.services.haircut_renditions import (
+    PreparedImage,
+    prepare_catalog_image,
+)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
 
 # --- Описания стрижек ---
 HAIRCUT_DESCRIPTIONS = {
@@ -17,63 +30,159 @@ HAIRCUT_DESCRIPTIONS = {
 }
 
 
-def load_haircut_data():
-    """Загружает данные о стрижках из ресурсов пакета."""
-    haircuts_data = []
-
+def list_haircut_files(images_dir: Path | None = None) -> List[Tuple[str, Path]]:
+    """Файлы изображений каталога: из ресурсов пакета или из images_dir."""
+    if images_dir is not None:
+        return _haircut_files(images_dir)
     # Используем importlib.resources для надёжного доступа к ресурсам
     with resources.path(
         "cat_server.scripts.haircuts", "haircut_images"
     ) as haircuts_dir:
-        for p in Path(haircuts_dir).iterdir():
-            if p.is_file():
-                name = p.stem
-                description = HAIRCUT_DESCRIPTIONS.get(name)
-                if description is None:
-                    print(f"Нет описания для стрижки: {name}. Пропускаем.")
-                    continue
-
-                try:
-                    with Image.open(p) as img:
-                        buf = io.BytesIO()
-                        img_format = img.format or "PNG"
-                        img.save(buf, format=img_format)
-                        haircuts_data.append((name, description, buf.getvalue()))
-                except Exception as e:
-                    print(f"Ошибка при обработке изображения {p.name}: {e}")
-                    continue
-
-    return haircuts_data
-
-
-async def add_haircut_in_db(
-    repo, name: str, description: str, image_bytes: bytes
-) -> None:
-    await repo.create(
-        name=name,
-        description=description,
-        image_bytes=image_bytes,
-    )
+        return _haircut_files(Path(haircuts_dir))
 
 
-async def main():
-    haircuts_data = load_haircut_data()
-    if not haircuts_data:
-        print("⚠️ Нет данных о стрижках для загрузки.")
+def _haircut_files(directory: Path) -> List[Tuple[str, Path]]:
+    files = []
+    for p in sorted(directory.iterdir()):
+        if not p.is_file() or p.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        if p.stem not in HAIRCUT_DESCRIPTIONS:
+            print(f"Нет описания для стрижки: {p.stem}. Пропускаем.")
+            continue
+        files.append((p.stem, p))
+    return files
+
+
+def load_descriptions(images_dir: Path | None) -> None:
+    # descriptions.json рядом с изображениями дополняет встроенные описания
+    if images_dir is None:
         return
+    descriptions_file = images_dir / "descriptions.json"
+    if descriptions_file.is_file():
+        HAIRCUT_DESCRIPTIONS.update(json.loads(descriptions_file.read_text("utf-8")))
 
-    async with AsyncSessionLocal() as session:
-        repo = HaircutsRepository(session)
-        for name, desc, img_bytes in haircuts_data:
-            print(f"Загружаем стрижку: {name}")
-            await add_haircut_in_db(repo, name, desc, img_bytes)
-    print("✅ Все стрижки успешно загружены.")
+
+def create_pool(workers: int | None) -> ProcessPoolExecutor:
+    # fork, пока в процессе нет других потоков и соединений: процессы пула
+    # наследуют уже импортированные модули (spawn заново импортировал бы
+    # приложение вместе с TensorFlow в каждом процессе)
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("fork")
+    )
+    # С fork все процессы запускаются при первой задаче
+    pool.submit(int).result()
+    return pool
+
+
+async def prepare_images(
+    pool: ProcessPoolExecutor, paths: List[Path], with_renditions: bool
+) -> AsyncIterator[PreparedImage]:
+    # Проверка декодированием и копии — параллельно в пуле процессов.
+    # Результаты отдаются по готовности, чтобы не держать весь каталог в памяти
+    loop = asyncio.get_running_loop()
+    tasks = {
+        loop.run_in_executor(pool, prepare_catalog_image, str(p), with_renditions): p
+        for p in paths
+    }
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            try:
+                yield task.result()
+            except Exception as e:
+                print(f"Ошибка при обработке изображения {tasks[task].name}: {e}")
+
+
+async def load_catalog(
+    images_dir: Path | None = None, workers: int | None = None
+) -> Dict[str, int]:
+    load_descriptions(images_dir)
+    files = list_haircut_files(images_dir)
+    if not files:
+        print("⚠️ Нет данных о стрижках для загрузки.")
+        return {}
+
+    pool = create_pool(workers)
+    blob_store = create_blob_store()
+    redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        async with AsyncSessionLocal() as session:
+            # Через redis запущенные API узнают об изменении каталога стрижек
+            repo = HaircutsRepository(session, redis=redis, blob_store=blob_store)
+            existing = await repo.get_catalog_index()
+
+            # Неизменённые стрижки (тот же sha256 файла и описание) пропускаются
+            # до декодирования — повторный запуск почти ничего не делает
+            changed: List[Tuple[str, Path]] = []
+            for name, path in files:
+                digest = blob_hash(path.read_bytes())
+                if existing.get(name) != (digest, HAIRCUT_DESCRIPTIONS[name]):
+                    changed.append((name, path))
+            print(f"Стрижек: {len(files)}, изменённых: {len(changed)}")
+            if not changed:
+                return {}
+
+            names = {str(path): name for name, path in changed}
+            rows: List[Dict[str, Any]] = []
+            renditions: Dict[str, List[Dict[str, Any]]] = {}
+            async for image in prepare_images(
+                pool, [path for _, path in changed], blob_store is not None
+            ):
+                name = names[image.path]
+                row: Dict[str, Any] = {
+                    "name": name,
+                    "description": HAIRCUT_DESCRIPTIONS[name],
+                    "image_bytes": None,
+                    "image_hash": blob_hash(image.data),
+                    "image_content_type": image.content_type,
+                    "image_size": len(image.data),
+                }
+                if blob_store is None:
+                    row["image_bytes"] = image.data
+                else:
+                    # Файлы в хранилище пишутся до транзакции: ключ — хеш,
+                    # повторная запись того же содержимого ничего не меняет
+                    await blob_store.put(image.data)
+                    renditions[name] = [
+                        {
+                            "name": rendition.name,
+                            "format": rendition.format,
+                            "width": rendition.width,
+                            "height": rendition.height,
+                            "image_hash": await blob_store.put(rendition.data),
+                            "image_size": len(rendition.data),
+                        }
+                        for rendition in image.renditions
+                    ]
+                rows.append(row)
+
+            return await repo.bulk_upsert(rows, renditions)
+    finally:
+        pool.shutdown()
+        await redis.aclose()
+
+
+async def main(images_dir: Path | None = None, workers: int | None = None):
+    ids = await load_catalog(images_dir, workers)
+    print(f"✅ Стрижки загружены: {len(ids)}")
 
 
 def run_add_haircuts():
     """Точка входа для CLI скрипта (например, при вызове add-haircuts)."""
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Загрузка каталога стрижек")
+    parser.add_argument(
+        "--images-dir",
+        type=Path,
+        default=None,
+        help="Каталог с изображениями <Имя>.jpg и descriptions.json",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Процессов для декодирования"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.images_dir, args.workers))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_add_haircuts()
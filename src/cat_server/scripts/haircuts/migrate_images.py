@@ -0,0 +1,111 @@
+import asyncio
+
+import redis.asyncio as aioredis
+from sqlalchemy import select
+
+from cat_server.core.config import settings
+from cat_server.core.database import AsyncSessionLocal, engine
+from cat_server.core.dependencies import create_local_blob_store
+from cat_server.infrastructure.blob_store import (
+    LocalBlobStore,
+    blob_hash,
+    image_content_type,
+)
+from cat_server.infrastructure.entities import Haircuts
+from cat_server.infrastructure.repositories import (
+    HAIRCUTS_CHANGED_CHANNEL,
+    HaircutsRepository,
+)
+from cat_server.scripts.database_init import create_database
+from cat_server.services.haircut_renditions import make_renditions
+
+
+async def migrate_images(store: LocalBlobStore) -> int:
+    # Переносит ImageBytes в хранилище по одной строке: повторный запуск
+    # продолжает с оставшихся, уже перенесённые файлы не переписываются
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Haircuts.id).where(
+                Haircuts.image_bytes.is_not(None), Haircuts.image_hash.is_(None)
+            )
+        )
+        ids = list(result.scalars())
+
+    migrated = 0
+    for haircut_id in ids:
+        async with AsyncSessionLocal() as session:
+            haircut = await session.get(Haircuts, haircut_id)
+            if haircut is None or haircut.image_bytes is None:
+                continue
+            data: bytes = haircut.image_bytes  # pyright: ignore[reportAssignmentType]
+            key = await store.put(data)
+            # Проверяем записанный файл до удаления байтов из БД
+            stored = await store.get(key)
+            if stored is None or blob_hash(stored) != key:
+                print(f"❌ Стрижка {haircut_id}: файл в хранилище повреждён")
+                continue
+            haircut.image_hash = key  # pyright: ignore[reportAttributeAccessIssue]
+            haircut.image_content_type = image_content_type(data)  # pyright: ignore[reportAttributeAccessIssue]
+            haircut.image_size = len(data)  # pyright: ignore[reportAttributeAccessIssue]
+            haircut.image_bytes = None  # pyright: ignore[reportAttributeAccessIssue]
+            await session.commit()
+            migrated += 1
+            print(f"📦 Стрижка {haircut_id} перенесена: {key[:12]}…")
+    return migrated
+
+
+async def add_missing_renditions(store: LocalBlobStore) -> int:
+    # Копии для стрижек, у которых их ещё нет (перенесённые и старые загрузки)
+    async with AsyncSessionLocal() as session:
+        # Изменение публикуется один раз в main, а не на каждую стрижку
+        repo = HaircutsRepository(session, redis=None, blob_store=store)
+        with_renditions = {row.haircut_id for row in await repo.get_renditions()}
+        haircuts = [
+            haircut
+            for haircut in await repo.get_all()
+            if haircut.id not in with_renditions
+        ]
+        added = 0
+        for haircut in haircuts:
+            data = (
+                await store.get(haircut.image_hash)  # pyright: ignore[reportArgumentType]
+                if haircut.image_hash is not None
+                else haircut.image_bytes
+            )
+            if data is None:
+                print(f"⚠️ Стрижка {haircut.id}: нет изображения для копий")
+                continue
+            renditions = await asyncio.to_thread(make_renditions, data)  # pyright: ignore[reportArgumentType]
+            await repo.add_renditions(haircut.id, renditions)  # pyright: ignore[reportArgumentType]
+            added += 1
+    return added
+
+
+async def main():
+    store = create_local_blob_store()
+    # Те же изменения схемы, что и в db-init: столбцы BlobStore и HaircutRenditions
+    await create_database()
+    migrated = await migrate_images(store)
+    print(f"✅ Перенесено изображений: {migrated}")
+    with_renditions = await add_missing_renditions(store)
+    print(f"✅ Созданы копии для стрижек: {with_renditions}")
+
+    if migrated or with_renditions:
+        # Запущенные API перечитают каталог стрижек
+        redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        try:
+            await redis.publish(HAIRCUTS_CHANGED_CHANNEL, "changed")
+        except Exception as e:
+            print(f"⚠️ Не удалось уведомить API об изменении каталога: {e}")
+        finally:
+            await redis.aclose()
+    await engine.dispose()
+
+
+def run_migrate_haircut_images():
+    """Точка входа для CLI скрипта (migrate-haircut-images)."""
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,24 @@
-from .image_processing_service import ImageProcessingService
-from .user_session_service import UserSessionService
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .image_processing_service import ImageProcessingService
+    from .user_session_service import UserSessionService
 
 __all__ = [
     "UserSessionService",
     "ImageProcessingService",
 ]
+
+
+def __getattr__(name: str):
+    # Ленивый импорт: процессы пула валидации импортируют только
+    # services.image_validation, без TensorFlow и aiohttp
+    if name == "ImageProcessingService":
+        from .image_processing_service import ImageProcessingService
+
+        return ImageProcessingService
+    if name == "UserSessionService":
+        from .user_session_service import UserSessionService
+
+        return UserSessionService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
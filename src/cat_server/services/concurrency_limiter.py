@@ -0,0 +1,92 @@
+import time
+from typing import Any, Dict
+
+
+class ConcurrencyLimitExceeded(Exception):
+    # Лимит одновременных запросов к нейросети исчерпан — отказываем сразу
+    pass
+
+
+class AdaptiveConcurrencyLimiter:
+    # AIMD-лимит одновременных вызовов нейросети, управляемый задержкой.
+    # Базовая задержка — минимум наблюдаемых (медленно дрейфует вверх);
+    # ответ быстрее baseline * latency_tolerance увеличивает лимит на
+    # 1/limit (в сумме +1 за «окно» из limit ответов), медленный ответ,
+    # таймаут или 503 умножают лимит на backoff — не чаще раза за baseline
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 200,
+        backoff: float = 0.9,
+        latency_tolerance: float = 2.0,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.baseline_ms: float | None = None
+        self._last_decrease = 0.0
+
+        self.in_flight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.increases = 0
+        self.decreases = 0
+
+    def acquire(self) -> None:
+        if self.in_flight >= int(self.limit):
+            self.rejected += 1
+            raise ConcurrencyLimitExceeded(
+                f"Лимит запросов к нейросети исчерпан ({self.in_flight}/{int(self.limit)})"
+            )
+        self.in_flight += 1
+        self.accepted += 1
+
+    def release(self, latency_ms: float | None, overloaded: bool = False) -> None:
+        # latency_ms=None — запрос завершился ошибкой, не связанной с нагрузкой
+        self.in_flight -= 1
+        if overloaded:
+            self._decrease()
+            return
+        if latency_ms is None:
+            return
+
+        if self.baseline_ms is None or latency_ms < self.baseline_ms:
+            self.baseline_ms = latency_ms
+        else:
+            # Медленный дрейф вверх: базовая задержка следует за сменой модели/железа
+            self.baseline_ms += (latency_ms - self.baseline_ms) * 0.01
+
+        if latency_ms > self.baseline_ms * self.latency_tolerance:
+            self._decrease()
+        elif (self.in_flight + 1) * 2 >= self.limit:
+            # Растём, только если лимит хотя бы наполовину занят
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.increases += 1
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        window = (self.baseline_ms or 0.0) / 1000
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.decreases += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "baseline_latency_ms": round(self.baseline_ms, 2)
+            if self.baseline_ms is not None
+            else None,
+        }
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cat_server.infrastructure.blob_store import (
+    BlobStore,
+    blob_hash,
+    image_content_type,
+    image_etag,
+)
+from cat_server.infrastructure.repositories import (
+    HAIRCUTS_CHANGED_CHANNEL,
+    HaircutsRepository,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CatalogRendition:
+    name: str
+    format: str
+    width: int
+    height: int
+    image_hash: str
+    image_size: int
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    @property
+    def etag(self) -> str:
+        return image_etag(self.image_hash)
+
+
+@dataclass(frozen=True)
+class CatalogHaircut:
+    id: int
+    name: str
+    description: str
+    # Только у строк, не перенесённых в BlobStore
+    image_bytes: bytes | None
+    image_hash: str | None = None
+    # Считаются один раз при загрузке каталога, а не на каждый запрос
+    image_etag: str | None = None
+    image_content_type: str | None = None
+    # Отсортированы по ширине
+    renditions: Tuple[CatalogRendition, ...] = ()
+
+
+def catalog_entry(haircut: Any, renditions: Iterable[Any] = ()) -> CatalogHaircut:
+    image_bytes = haircut.image_bytes
+    image_hash = haircut.image_hash
+    content_type = haircut.image_content_type
+    if image_hash is None and image_bytes:
+        image_hash = blob_hash(image_bytes)
+        content_type = image_content_type(image_bytes)
+    return CatalogHaircut(
+        id=haircut.id,
+        name=haircut.name,
+        description=haircut.description,
+        image_bytes=image_bytes,
+        image_hash=image_hash,
+        image_etag=image_etag(image_hash) if image_hash else None,
+        image_content_type=content_type,
+        renditions=tuple(
+            sorted(
+                (
+                    CatalogRendition(
+                        name=row.name,
+                        format=row.format,
+                        width=row.width,
+                        height=row.height,
+                        image_hash=row.image_hash,
+                        image_size=row.image_size,
+                    )
+                    for row in renditions
+                ),
+                key=lambda rendition: rendition.width,
+            )
+        ),
+    )
+
+
+def choose_rendition(
+    haircut: CatalogHaircut, width: int, accept: str = ""
+) -> CatalogRendition | None:
+    # Самая маленькая копия не уже width; WebP — если клиент его принимает.
+    # Если все копии уже запрошенной ширины — самая большая из них
+    preferred = "WEBP" if "image/webp" in accept else "JPEG"
+    candidates = [r for r in haircut.renditions if r.format == preferred]
+    if not candidates:
+        return None
+    for rendition in candidates:
+        if rendition.width >= width:
+            return rendition
+    return candidates[-1]
+
+
+def image_path(haircut: CatalogHaircut, blob_store: BlobStore | None) -> Path | None:
+    # Файл для отдачи без чтения в память; None — изображение ещё в ImageBytes
+    if haircut.image_bytes is not None or haircut.image_hash is None:
+        return None
+    if blob_store is None:
+        return None
+    return blob_store.local_path(haircut.image_hash)
+
+
+async def read_image(
+    haircut: CatalogHaircut, blob_store: BlobStore | None
+) -> bytes | None:
+    if haircut.image_bytes is not None:
+        return haircut.image_bytes
+    if haircut.image_hash is None or blob_store is None:
+        return None
+    return await blob_store.get(haircut.image_hash)
+
+
+class HaircutCatalog:
+    # Каталог стрижек в памяти процесса: несколько строк, которые почти не
+    # меняются, загружаются при старте и индексируются по id и по имени.
+    # Чтение рекомендаций не обращается к таблице Haircuts; при изменении
+    # таблицы все процессы перечитывают каталог по сообщению Redis pub/sub
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        redis: aioredis.Redis,
+        miss_reload_interval: float = 5.0,
+    ):
+        self.session_factory = session_factory
+        self.redis = redis
+        self.miss_reload_interval = miss_reload_interval
+        self._by_id: Dict[int, CatalogHaircut] = {}
+        self._by_name: Dict[str, CatalogHaircut] = {}
+        self._reload_lock = asyncio.Lock()
+        self._stale = True
+        self._listener: asyncio.Task | None = None
+        self._last_miss_reload = 0.0
+
+        self.reloads = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def start(self) -> None:
+        await self.reload()
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def reload(self) -> None:
+        # Одновременные сообщения об изменении сливаются в одну перезагрузку:
+        # ждавшим блокировку хватает чтения, начатого после их сообщения
+        self._stale = True
+        async with self._reload_lock:
+            if not self._stale:
+                return
+            self._stale = False
+            try:
+                async with self.session_factory() as session:
+                    repo = HaircutsRepository(session, redis=None)
+                    haircuts = await repo.get_all()
+                    renditions = await repo.get_renditions()
+            except Exception:
+                self._stale = True
+                raise
+            by_haircut: Dict[int, List[Any]] = defaultdict(list)
+            for rendition in renditions:
+                by_haircut[rendition.haircut_id].append(rendition)
+            entries = [
+                catalog_entry(haircut, by_haircut.get(haircut.id, ()))
+                for haircut in haircuts
+            ]
+            # Словари заменяются целиком: читатели не видят полузагруженный каталог
+            self._by_id = {entry.id: entry for entry in entries}
+            self._by_name = {entry.name: entry for entry in entries}
+            self.reloads += 1
+            print(f"📚 Каталог стрижек загружен: {len(entries)} шт.")
+
+    async def get(self, haircut_id: int) -> CatalogHaircut | None:
+        haircut = self._by_id.get(haircut_id)
+        if haircut is None and await self._reload_after_miss():
+            haircut = self._by_id.get(haircut_id)
+        self._count(haircut)
+        return haircut
+
+    async def get_by_name(self, name: str) -> CatalogHaircut | None:
+        haircut = self._by_name.get(name)
+        if haircut is None and await self._reload_after_miss():
+            haircut = self._by_name.get(name)
+        self._count(haircut)
+        return haircut
+
+    def name_to_id(self) -> Dict[str, int]:
+        return {name: entry.id for name, entry in self._by_name.items()}
+
+    def all(self) -> List[CatalogHaircut]:
+        return list(self._by_id.values())
+
+    def _count(self, haircut: CatalogHaircut | None) -> None:
+        if haircut is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    async def _reload_after_miss(self) -> bool:
+        # Промах — вероятно, пропущенное сообщение (Redis переподключался).
+        # Перечитываем не чаще miss_reload_interval, чтобы запросы к
+        # несуществующим id не превращались в запросы к БД
+        now = time.monotonic()
+        if now - self._last_miss_reload < self.miss_reload_interval:
+            return False
+        self._last_miss_reload = now
+        return await self._reload_quietly()
+
+    async def _reload_quietly(self) -> bool:
+        # Недоступная БД не должна ронять чтение или подписку: остаётся
+        # прежний каталог
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось перечитать каталог стрижек: {e}")
+            return False
+        return True
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(HAIRCUTS_CHANGED_CHANNEL)
+                if delay > 1.0:
+                    # Пока подписки не было, изменения могли быть пропущены
+                    await self._reload_quietly()
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._reload_quietly()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"⚠️ Подписка на изменения стрижек прервана: {e}, повтор через {delay}с"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "haircuts": len(self._by_id),
+            "reloads": self.reloads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "subscribed": self._listener is not None and not self._listener.done(),
+        }
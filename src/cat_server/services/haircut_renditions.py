@@ -0,0 +1,84 @@
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+# Ширины уменьшенных копий изображения стрижки: клиент запрашивает ?width=
+RENDITION_WIDTHS: Dict[str, int] = {
+    "thumb": 160,
+    "mobile": 480,
+    "full": 1080,
+}
+RENDITION_FORMATS = ("WEBP", "JPEG")
+
+_SAVE_OPTIONS: Dict[str, dict] = {
+    "WEBP": {"quality": 80, "method": 4},
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+}
+
+
+@dataclass(frozen=True)
+class RenditionImage:
+    name: str  # "thumb", "mobile", "full"
+    format: str  # "WEBP" или "JPEG"
+    width: int
+    height: int
+    data: bytes
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+
+def make_renditions(
+    data: bytes, formats: Sequence[str] = RENDITION_FORMATS
+) -> List[RenditionImage]:
+    # Вызывается при загрузке каталога (add-haircuts, миграция), не на запрос.
+    # Изображение не увеличивается: если оригинал уже меньше, копия — его размера
+    with PILImage.open(io.BytesIO(data)) as img:
+        source = ImageOps.exif_transpose(img).convert("RGB")
+
+    renditions = []
+    for name, target_width in RENDITION_WIDTHS.items():
+        width = min(target_width, source.width)
+        height = max(1, round(source.height * width / source.width))
+        resized = (
+            source
+            if width == source.width
+            else source.resize((width, height), PILImage.Resampling.LANCZOS)
+        )
+        for image_format in formats:
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **_SAVE_OPTIONS[image_format])
+            renditions.append(
+                RenditionImage(name, image_format, width, height, buffer.getvalue())
+            )
+    return renditions
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    # Результат обработки файла каталога в процессе пула
+    path: str
+    data: bytes
+    content_type: str
+    renditions: List[RenditionImage]
+
+
+def prepare_catalog_image(path: str, with_renditions: bool = True) -> PreparedImage:
+    # Выполняется в процессе пула загрузчика каталога: проверка, что файл
+    # декодируется целиком, и построение копий. Модуль зависит только от PIL,
+    # чтобы процессы пула не импортировали приложение
+    data = Path(path).read_bytes()
+    with PILImage.open(io.BytesIO(data)) as img:
+        image_format = img.format or "JPEG"
+        img.load()
+    return PreparedImage(
+        path=path,
+        data=data,
+        content_type=f"image/{image_format.lower()}",
+        renditions=make_renditions(data) if with_renditions else [],
+    )
@@ -0,0 +1,73 @@
+import io
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+# off — в нейросеть уходит исходный файл; jpeg/png — картинка уже размера
+# модели; raw — несжатый RGB uint8 (size*size*3 байт), нейросеть его не декодирует
+ImageNormalization = Literal["off", "jpeg", "png", "raw"]
+
+# Значение поля формы encoding для несжатого тензора
+RAW_RGB_ENCODING = "raw_rgb"
+RAW_RGB_CONTENT_TYPE = "application/octet-stream"
+
+
+@dataclass(frozen=True)
+class NormalizedImage:
+    data: bytes
+    content_type: str
+    format: str  # "JPEG", "PNG" или "RAW"
+    size: int  # сторона квадрата, под которую подготовлено изображение
+
+    @property
+    def is_raw(self) -> bool:
+        return self.format == "RAW"
+
+
+def normalize_image(
+    data: bytes, mode: ImageNormalization, size: int = 224, quality: int = 90
+) -> NormalizedImage:
+    # Приводит изображение к входу модели (size x size RGB) на стороне API
+    with PILImage.open(io.BytesIO(data)) as img:
+        return normalize_opened_image(img, mode, size, quality)
+
+
+def normalize_opened_image(
+    img: PILImage.Image, mode: ImageNormalization, size: int = 224, quality: int = 90
+) -> NormalizedImage:
+    # То же для уже открытого файла (валидация открывает его сама).
+    # JPEG декодируется сразу в уменьшенном масштабе (draft, DCT-scaling),
+    # ориентация из EXIF применяется до ресайза
+    img.draft("RGB", (size, size))
+    image = ImageOps.exif_transpose(img).convert("RGB")
+    # Как tf.image.resize в модели: растяжение до квадрата без обрезки
+    image = image.resize((size, size), PILImage.Resampling.BILINEAR)
+
+    if mode == "raw":
+        return NormalizedImage(
+            np.asarray(image, dtype=np.uint8).tobytes(),
+            RAW_RGB_CONTENT_TYPE,
+            "RAW",
+            size,
+        )
+
+    buffer = io.BytesIO()
+    if mode == "png":
+        image.save(buffer, "PNG")
+        return NormalizedImage(buffer.getvalue(), "image/png", "PNG", size)
+    image.save(buffer, "JPEG", quality=quality)
+    return NormalizedImage(buffer.getvalue(), "image/jpeg", "JPEG", size)
+
+
+def decode_raw_rgb(data: bytes, size: int = 224) -> np.ndarray:
+    # Несжатый RGB от API -> батч из одного тензора, как после preprocess_image
+    expected = size * size * 3
+    if len(data) != expected:
+        raise ValueError(
+            f"Ожидалось {expected} байт RGB {size}x{size}, получено {len(data)}"
+        )
+    image = np.frombuffer(data, dtype=np.uint8).reshape(1, size, size, 3)
+    return image.astype(np.float32) / 255.0
@@ -2,19 +2,19 @@
 
 import asyncio
 import base64
-import io
 import json
 import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Literal
 
 import aiohttp
-from PIL import Image as PILImage
 
 from cat_server.domain.dto import (
     AnalysisResult,
     HaircutRecommendation,
     ImageData,
+    ImageThumbnail,
     NeuralNetworkRequest,
     NeuralNetworkResponse,
     ProcessingError,
@@ -22,32 +22,264 @@ from cat_server.domain.dto import (
     ProcessingResult,
     ValidationResult,
 )
+from cat_server.infrastructure.blob_store import BlobStore
 from cat_server.infrastructure.repositories import (
     ICatsRepository,
     IHaircutsRepository,
     IRecommendationsRepository,
 )
-from cat_server.services.neural_service import NeuralService
+from cat_server.services import neural_codec
+from cat_server.services.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitExceeded,
+)
+from cat_server.services.haircut_catalog import (
+    HaircutCatalog,
+    catalog_entry,
+    read_image,
+)
+from cat_server.services.image_normalization import (
+    RAW_RGB_ENCODING,
+    ImageNormalization,
+    NormalizedImage,
+    decode_raw_rgb,
+    normalize_image,
+)
+from cat_server.services.image_validation import (
+    ImageInspection,
+    ImageValidator,
+    inspect_image,
+)
+from cat_server.services.inference_executor import InferenceQueueFullError
+from cat_server.services.latency_window import LatencyWindow
+from cat_server.services.neural_endpoints import (
+    BalancingStrategy,
+    EndpointPool,
+    NeuralEndpoint,
+)
+from cat_server.services.processing_logs import ProcessingLogBuffer
+from cat_server.services.result_cache import ResultCache, image_digest
 from cat_server.services.user_session_service import UserSessionService
 
+if TYPE_CHECKING:
+    # TensorFlow загружается только при локальном транспорте (create_neural_client)
+    from cat_server.services.neural_service import NeuralService
+
 logger = logging.getLogger(__name__)
 
+# local — NeuralService в процессе API; http — по сети на NEURAL_API_URL;
+# uds — HTTP через Unix domain socket к сервису нейросети на той же машине
+NeuralTransport = Literal["local", "http", "uds"]
+
+# Ошибки, после которых реплика считается сбойной (для circuit breaker),
+# в отличие от ошибок самого запроса (400, 413 и т.п.)
+ENDPOINT_FAILURE_ERRORS = {
+    "NEURAL_API_TIMEOUT",
+    "NEURAL_API_CONNECTION",
+    "NEURAL_API_SERVER_ERROR",
+    "NEURAL_API_UNAVAILABLE",
+    "NEURAL_API_UNKNOWN",
+}
+
+# Признаки перегрузки нейросети: уменьшают адаптивный лимит, а в API
+# отдаются как 503 с Retry-After вместо 400
+OVERLOAD_ERRORS = {
+    "NEURAL_CONCURRENCY_LIMIT",
+    "NEURAL_API_TIMEOUT",
+    "NEURAL_API_UNAVAILABLE",
+}
+
+# Хедж не отправляется, пока у реплики мало замеров для p95
+HEDGE_MIN_SAMPLES = 20
+
 
 class NeuralNetworkClient:
-    def __init__(self, base_url: str, timeout: int = 60):
+    # Один клиент на всё приложение: пул соединений с keep-alive и кешем DNS
+    # переиспользуется между запросами и закрывается в lifespan
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int = 60,
+        pool_limit: int = 100,
+        pool_limit_per_host: int = 50,
+        keepalive_timeout: int = 30,
+        dns_cache_ttl: int = 300,
+        compact_response: bool = True,
+        transport: NeuralTransport = "http",
+        uds_path: str | None = None,
+        neural_service: "NeuralService | None" = None,
+        endpoints: List[str] | None = None,
+        balancing: BalancingStrategy = "least_outstanding",
+        breaker_failure_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        hedge: bool = False,
+        hedge_min_delay_ms: int = 20,
+        limiter: AdaptiveConcurrencyLimiter | None = None,
+        normalization: ImageNormalization = "off",
+        normalization_size: int = 224,
+    ):
+        if transport == "local" and neural_service is None:
+            raise ValueError("Для локального транспорта нужен NeuralService")
+        if transport == "uds" and not uds_path:
+            raise ValueError("Для транспорта uds нужен путь к сокету")
         self.base_url = base_url
         self.timeout = timeout
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        # Компактный ответ: без изображения в base64, msgpack при наличии
+        self.compact_response = compact_response
+        self.transport = transport
+        self.uds_path = uds_path
+        self.neural_service = neural_service
+        # Несколько реплик нейросети: балансировка, circuit breaker, хеджирование.
+        # Через Unix-сокет реплика всегда одна
+        self.endpoints = EndpointPool(
+            [base_url] if transport == "uds" else (endpoints or [base_url]),
+            strategy=balancing,
+            failure_threshold=breaker_failure_threshold,
+            reset_timeout=breaker_reset_timeout,
+        )
+        self.hedge = hedge
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        # Адаптивный лимит одновременных вызовов: лишнее отклоняется сразу
+        self.limiter = limiter
+        # Приведение к размеру модели на стороне API: килобайты вместо мегабайт
+        self.normalization = normalization
+        self.normalization_size = normalization_size
+        self.normalization_failures = 0
+        self._session: aiohttp.ClientSession | None = None
+
+        self.requests_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.latency = LatencyWindow()
         print(
-            f"🔧 NeuralNetworkClient инициализирован с URL: {base_url}, timeout: {timeout}"
+            f"🔧 NeuralNetworkClient инициализирован: транспорт {transport}, "
+            f"реплик: {len(self.endpoints)}, timeout: {timeout}"
         )
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Сессия создаётся лениво: для неё нужен запущенный event loop
+        if self._session is None or self._session.closed:
+            connector: aiohttp.BaseConnector
+            if self.transport == "uds":
+                connector = aiohttp.UnixConnector(
+                    path=self.uds_path,  # pyright: ignore[reportArgumentType]
+                    limit=self.pool_limit,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+            else:
+                connector = aiohttp.TCPConnector(
+                    limit=self.pool_limit,
+                    limit_per_host=self.pool_limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    use_dns_cache=True,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self.neural_service is not None:
+            await self.neural_service.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "transport": self.transport,
+            "base_url": self.base_url,
+            "pool_limit": self.pool_limit,
+            "pool_limit_per_host": self.pool_limit_per_host,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "pool_utilization": round(self.in_flight / self.pool_limit, 3)
+            if self.pool_limit
+            else None,
+            "requests_total": self.requests_total,
+            "session_open": self._session is not None and not self._session.closed,
+            # Задержка вызова нейросети для сравнения транспортов
+            "latency": self.latency.stats(),
+            "hedge": self.hedge,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            **self.endpoints.stats(),
+            "normalization": self.normalization,
+            "normalization_failures": self.normalization_failures,
+            "concurrency_limit": self.limiter.stats()
+            if self.limiter is not None
+            else None,
+        }
+
+    async def _normalize(self, image_data: ImageData) -> NormalizedImage | None:
+        if self.normalization == "off":
+            return None
+        thumbnail = image_data.thumbnail
+        if (
+            thumbnail is not None
+            and thumbnail.size == self.normalization_size
+            and thumbnail.format == self.normalization.upper()
+        ):
+            # Уже подготовлено при валидации
+            return NormalizedImage(
+                thumbnail.data, thumbnail.content_type, thumbnail.format, thumbnail.size
+            )
+        try:
+            # Декодирование PIL — в потоке, чтобы не блокировать event loop
+            return await asyncio.to_thread(
+                normalize_image,
+                image_data.data,
+                self.normalization,
+                self.normalization_size,
+            )
+        except Exception as e:
+            # Нейросеть справится и с исходным файлом
+            self.normalization_failures += 1
+            logger.warning(f"⚠️ Не удалось нормализовать {image_data.file_name}: {e}")
+            return None
+
     async def _process_with_local_neural(
-        self, image_data: ImageData, neural_service: NeuralService
+        self, image_data: ImageData, normalized: NormalizedImage | None = None
     ) -> NeuralNetworkResponse | None:
         """Обработка изображений локальной нейросетью"""
         print("🧠 Обработка локальной нейросетью...")
+        start_time = datetime.now()
+
+        model_input: Any = image_data.data
+        if normalized is not None:
+            model_input = (
+                decode_raw_rgb(normalized.data, normalized.size)
+                if normalized.is_raw
+                else normalized.data
+            )
+
+        try:
+            neural_result = await self.neural_service.process_image(model_input)  # pyright: ignore[reportOptionalMemberAccess]
+        except InferenceQueueFullError as e:
+            raise ProcessingException(
+                ProcessingError(
+                    error_id="NEURAL_API_UNAVAILABLE",
+                    error_type="neural_local",
+                    message="Нейросеть перегружена",
+                    details=str(e),
+                    suggestions=NeuralNetworkClient._get_error_suggestions(503),
+                )
+            )
 
-        neural_result = await neural_service.process_image(image_data.data)
+        # Как и по HTTP: "не кот" — это не ошибка нейросети, а пустой результат
+        if not neural_result["success"] and neural_result.get("error") == "not_a_cat":
+            return None
 
         if not neural_result["success"]:
             raise ProcessingException(
@@ -67,31 +299,197 @@ class NeuralNetworkClient:
             predicted_class=top_prediction["class_name"],
         )
 
-        processed_image = ImageData(
-            file_name=f"processed_{image_data.file_name}",
-            data=image_data.data,
-            size=image_data.size,
-            format=image_data.format,
-            resolution=image_data.resolution,
-            is_processed=True,
-        )
-
         return NeuralNetworkResponse(
             analysis_result=analysis_result,
-            processed_image=processed_image,
-            processing_time_ms=0,
+            processing_time_ms=int(
+                (datetime.now() - start_time).total_seconds() * 1000
+            ),
             processing_metadata={
                 "model_type": "teachable_machine",
+                "source": "local_neural_network",
                 "predictions": neural_result.get("predictions", []),
                 "top_prediction": top_prediction,
+                "batch_size": neural_result.get("batch_size", 1),
             },
         )
 
     async def analyze_and_process_image(
         self, request: NeuralNetworkRequest
     ) -> NeuralNetworkResponse | None:
-        async with aiohttp.ClientSession() as session:
-            form_data = aiohttp.FormData()
+        if self.limiter is not None:
+            try:
+                self.limiter.acquire()
+            except ConcurrencyLimitExceeded as e:
+                raise ProcessingException(
+                    ProcessingError(
+                        error_id="NEURAL_CONCURRENCY_LIMIT",
+                        error_type="neural_api",
+                        message="Нейросеть перегружена, повторите запрос позже",
+                        details=str(e),
+                        suggestions=NeuralNetworkClient._get_error_suggestions(503),
+                    )
+                )
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        latency_ms: float | None = None
+        overloaded = False
+        try:
+            normalized = await self._normalize(request.image)
+            if self.transport == "local":
+                result = await self._process_with_local_neural(
+                    request.image, normalized
+                )
+            else:
+                result = await self._process_over_http(request, normalized)
+            latency_ms = (time.perf_counter() - started) * 1000
+            return result
+        except ProcessingException as e:
+            overloaded = e.error.error_id in OVERLOAD_ERRORS
+            raise
+        finally:
+            self.in_flight -= 1
+            self.latency.add((time.perf_counter() - started) * 1000)
+            if self.limiter is not None:
+                self.limiter.release(latency_ms, overloaded)
+
+    async def _process_over_http(
+        self, request: NeuralNetworkRequest, normalized: NormalizedImage | None = None
+    ) -> NeuralNetworkResponse | None:
+        # Не более двух попыток на разных репликах: хедж, если первая
+        # отвечает дольше p95, или повтор, если первая упала
+        key = (
+            image_digest(request.image.data)
+            if self.endpoints.strategy == "consistent_hash"
+            else None
+        )
+        primary = self.endpoints.choose(key)
+        if primary is None:
+            raise ProcessingException(self._no_endpoint_error())
+
+        attempts = {
+            asyncio.create_task(
+                self._call_endpoint(primary, request, normalized)
+            ): primary
+        }
+        pending = set(attempts)
+        hedge_delay = self._hedge_delay(primary)
+        last_error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=hedge_delay if len(attempts) == 1 else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if attempts[task] is not primary and hedge_delay is not None:
+                            self.hedge_wins += 1
+                        return task.result()
+                    if not self._is_endpoint_failure(error):
+                        raise error
+                    last_error = error
+
+                # Вторая попытка: по таймауту хеджа или после сбоя первой
+                if len(attempts) > 1:
+                    continue
+                secondary = self.endpoints.choose(key, exclude=attempts.values())
+                if secondary is None:
+                    continue
+                if done:
+                    self.failovers += 1
+                    logger.warning(
+                        f"⚠️ Реплика {primary.url} недоступна, повтор на {secondary.url}"
+                    )
+                else:
+                    self.hedged_requests += 1
+                task = asyncio.create_task(
+                    self._call_endpoint(secondary, request, normalized)
+                )
+                attempts[task] = secondary
+                pending.add(task)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error or ProcessingException(self._no_endpoint_error())
+
+    async def _call_endpoint(
+        self,
+        endpoint: NeuralEndpoint,
+        request: NeuralNetworkRequest,
+        normalized: NormalizedImage | None = None,
+    ) -> NeuralNetworkResponse | None:
+        endpoint.outstanding += 1
+        endpoint.requests_total += 1
+        endpoint.breaker.on_request()
+        started = time.perf_counter()
+        try:
+            result = await self._post(endpoint.url, request, normalized)
+        except asyncio.CancelledError:
+            # Проигравший хедж — не сбой реплики
+            endpoint.breaker.release_probe()
+            raise
+        except Exception as e:
+            if self._is_endpoint_failure(e):
+                endpoint.failures_total += 1
+                endpoint.breaker.record_failure()
+            else:
+                endpoint.breaker.record_success()
+            raise
+        else:
+            endpoint.breaker.record_success()
+            endpoint.latency.add((time.perf_counter() - started) * 1000)
+            return result
+        finally:
+            endpoint.outstanding -= 1
+
+    def _hedge_delay(self, endpoint: NeuralEndpoint) -> float | None:
+        if not self.hedge or len(self.endpoints) < 2:
+            return None
+        if len(endpoint.latency) < HEDGE_MIN_SAMPLES:
+            return None
+        p95 = endpoint.latency.percentile(95) or 0.0
+        return max(p95, self.hedge_min_delay_ms) / 1000
+
+    @staticmethod
+    def _is_endpoint_failure(error: BaseException) -> bool:
+        return (
+            isinstance(error, ProcessingException)
+            and error.error.error_id in ENDPOINT_FAILURE_ERRORS
+        )
+
+    @staticmethod
+    def _no_endpoint_error() -> ProcessingError:
+        return ProcessingError(
+            error_id="NEURAL_API_UNAVAILABLE",
+            error_type="neural_api",
+            message="Все реплики нейросети недоступны",
+            suggestions=NeuralNetworkClient._get_error_suggestions(503),
+        )
+
+    async def _post(
+        self,
+        url: str,
+        request: NeuralNetworkRequest,
+        normalized: NormalizedImage | None = None,
+    ) -> NeuralNetworkResponse | None:
+        session = self._get_session()
+        form_data = aiohttp.FormData()
+        if normalized is not None:
+            form_data.add_field(
+                name="image",
+                value=normalized.data,
+                filename=f"{request.image.file_name}",
+                content_type=normalized.content_type,
+            )
+            if normalized.is_raw:
+                form_data.add_field("encoding", RAW_RGB_ENCODING)
+        else:
             form_data.add_field(
                 name="image",
                 value=request.image.data,
@@ -99,57 +497,65 @@ class NeuralNetworkClient:
                 content_type=f"image/{request.image.format.lower()}",
             )
 
-            metadata = {
-                "processed_at": request.processing_type,
-                "image_metadata": {
-                    "filename": request.image.file_name,
-                    "format": request.image.format,
-                    "size": request.image.size,
-                    "resolution": request.image.resolution,
-                },
-            }
-            form_data.add_field("metadata", json.dumps(metadata))
-            try:
-                print(f"📡 Отправка POST-запроса на {self.base_url}")
-                async with session.post(
-                    f"{self.base_url}",
-                    data=form_data,
-                    timeout=aiohttp.ClientTimeout(total=self.timeout),
-                ) as response:
-                    print(f"📥 Получен ответ от нейросети: статус {response.status}")
-                    if response.status == 200:
-                        response_data = await response.json()
-                        print(f"✅ Успешный ответ от нейросети: {response_data}")
-                        return self._parse_success_response(response_data)
-                    else:
-                        processing_error = await self._handle_http_error(response)
-                        raise ProcessingException(processing_error)
-
-            except asyncio.TimeoutError:
-                logger.error("⏰ Таймаут при запросе к нейросети")
-                raise ProcessingException(
-                    ProcessingError(
-                        error_id="NEURAL_API_TIMEOUT",
-                        error_type="neural_api",
-                        message="Нейросеть не ответила вовремя",
-                        suggestions=["Увеличьте timeout", "Попробуйте позже"],
+        metadata = {
+            "processed_at": request.processing_type,
+            "image_metadata": {
+                "filename": request.image.file_name,
+                "format": request.image.format,
+                "size": request.image.size,
+                "resolution": request.image.resolution,
+            },
+        }
+        form_data.add_field("metadata", json.dumps(metadata))
+        try:
+            print(f"📡 Отправка POST-запроса на {url}")
+            headers = (
+                {"Accept": neural_codec.compact_accept_header()}
+                if self.compact_response
+                else {}
+            )
+            async with session.post(
+                url,
+                data=form_data,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                print(f"📥 Получен ответ от нейросети: статус {response.status}")
+                if response.status == 200:
+                    response_data = neural_codec.decode(
+                        await response.read(), response.content_type
                     )
+                    print(f"✅ Успешный ответ от нейросети: {response_data}")
+                    return self._parse_success_response(response_data)
+                else:
+                    processing_error = await self._handle_http_error(response)
+                    raise ProcessingException(processing_error)
+
+        except asyncio.TimeoutError:
+            logger.error("⏰ Таймаут при запросе к нейросети")
+            raise ProcessingException(
+                ProcessingError(
+                    error_id="NEURAL_API_TIMEOUT",
+                    error_type="neural_api",
+                    message="Нейросеть не ответила вовремя",
+                    suggestions=["Увеличьте timeout", "Попробуйте позже"],
                 )
+            )
 
-            except aiohttp.ClientError as e:
-                logger.exception("🔌 Ошибка подключения к нейросети")
-                raise ProcessingException(
-                    ProcessingError(
-                        error_id="NEURAL_API_CONNECTION",
-                        error_type="neural_api",
-                        message="Ошибка подключения к нейросети",
-                        details=str(e),
-                        suggestions=[
-                            "Проверьте интернет-соединение",
-                            "Проверьте URL API",
-                        ],
-                    )
+        except aiohttp.ClientError as e:
+            logger.exception("🔌 Ошибка подключения к нейросети")
+            raise ProcessingException(
+                ProcessingError(
+                    error_id="NEURAL_API_CONNECTION",
+                    error_type="neural_api",
+                    message="Ошибка подключения к нейросети",
+                    details=str(e),
+                    suggestions=[
+                        "Проверьте интернет-соединение",
+                        "Проверьте URL API",
+                    ],
                 )
+            )
 
     @staticmethod
     def _parse_success_response(
@@ -165,22 +571,23 @@ class NeuralNetworkClient:
             predicted_class=analysis_data.get("predicted_class", ""),
         )
 
-        image_data = (
-            neural_data["processed_image"] if "processed_image" in neural_data else {}
-        )
-
-        if len(image_data) == 0:
+        # Кот не обнаружен: в компактном ответе is_cat=False, в полном нет изображения
+        if neural_data.get("is_cat") is False or "analysis_result" not in neural_data:
             return None
 
-        image_bytes = base64.b64decode(image_data["data"])
-        processed_image = ImageData(
-            file_name=image_data["filename"],
-            data=image_bytes,
-            size=len(image_bytes),
-            format=image_data["format"],
-            resolution=image_data["resolution"],
-            is_processed=True,
-        )
+        image_data = neural_data.get("processed_image") or {}
+
+        processed_image = None
+        if image_data:
+            image_bytes = base64.b64decode(image_data["data"])
+            processed_image = ImageData(
+                file_name=image_data["filename"],
+                data=image_bytes,
+                size=len(image_bytes),
+                format=image_data["format"],
+                resolution=image_data["resolution"],
+                is_processed=True,
+            )
 
         result = NeuralNetworkResponse(
             analysis_result=analysis_result,
@@ -245,25 +652,81 @@ class ImageProcessingService:
         recommendations_repo: IRecommendationsRepository,
         user_session_service: UserSessionService,
         neural_client: NeuralNetworkClient,
+        result_cache: ResultCache | None = None,
+        image_validator: ImageValidator | None = None,
+        haircut_catalog: HaircutCatalog | None = None,
+        blob_store: BlobStore | None = None,
+        processing_logs: ProcessingLogBuffer | None = None,
     ):
         self.cats_repo = cats_repo
         self.haircut_repo = haircut_repo
         self.recommendations_repo = recommendations_repo
         self.user_session_service = user_session_service
         self.neural_client = neural_client
+        self.result_cache = result_cache
+        self.image_validator = image_validator
+        self.haircut_catalog = haircut_catalog
+        self.blob_store = blob_store
+        self.processing_logs = processing_logs
 
     async def process_images(
         self,
         image_data: ImageData,
+    ) -> ProcessingResult:
+        result = await self._process_images(image_data)
+        self._log_processing(result)
+        return result
+
+    def _log_processing(self, result: ProcessingResult) -> None:
+        # Только запись в буфер: в БД логи уходят пачками вне запроса
+        if self.processing_logs is None:
+            return
+        error = result.error
+        self.processing_logs.record(
+            # cat_id=0 в ProcessingResult — кот не создан
+            cat_id=result.cat_id or None,
+            processing_time=result.processing_time_ms / 1000,
+            status="success" if result.status == "completed" else "error",
+            error_message=f"{error.error_id}: {error.message}"
+            if error is not None
+            else None,
+        )
+
+    async def _analyze(self, image_data: ImageData) -> NeuralNetworkResponse | None:
+        nn_request = NeuralNetworkRequest(
+            image=image_data,
+            processing_type="analysis and enhancement",
+        )
+        result_cache = self.result_cache
+        if result_cache is None:
+            return await self.neural_client.analyze_and_process_image(nn_request)
+
+        # В кеше только ответ нейросети: кот и рекомендация создаются на каждую
+        # загрузку, поэтому разные сессии с одним файлом не делят cat_id
+        async def compute():
+            nn_response = await self.neural_client.analyze_and_process_image(nn_request)
+            if nn_response is None:
+                # "Кот не определён" кешируется на меньший срок; сбои нейросети
+                # приходят исключением и не кешируются
+                return {"response": None}, result_cache.negative_ttl
+            response = nn_response.model_dump(mode="json", exclude={"processed_image"})
+            return {"response": response}, result_cache.ttl
+
+        cached = await result_cache.get_or_compute(
+            image_digest(image_data.data), compute
+        )
+        if cached["response"] is None:
+            return None
+        return NeuralNetworkResponse.model_validate(cached["response"])
+
+    async def _process_images(
+        self,
+        image_data: ImageData,
     ) -> ProcessingResult:
         start_time = datetime.now()
         try:
-            nn_request = NeuralNetworkRequest(
-                image=image_data,
-                processing_type="analysis and enhancement",
-            )
             print("🧠 Отправка изображений в нейросеть...")
-            nn_response = await self.neural_client.analyze_and_process_image(nn_request)
+            nn_response = await self._analyze(image_data)
 
             if nn_response is None:
                 processing_time_ms = int(
@@ -281,14 +744,10 @@ class ImageProcessingService:
                     ),
                 )
 
-            cat = await self.cats_repo.create()
-
-            recommendation = await self.recommendations_repo.create(
-                cat.id,  # pyright: ignore[reportArgumentType]
-                nn_response.analysis_result.predicted_class,
+            cat_id, _ = await self.recommendations_repo.create_with_cat(
+                await self._haircut_ref(nn_response.analysis_result.predicted_class),
                 nn_response.analysis_result.confidence,
             )
-            del recommendation
 
             processing_time_ms = int(
                 (datetime.now() - start_time).total_seconds() * 1000
@@ -296,7 +755,7 @@ class ImageProcessingService:
             print(f"✅ Обработка завершена успешно: время={processing_time_ms}ms")
 
             return ProcessingResult(
-                cat_id=cat.id,  # pyright: ignore[reportArgumentType]
+                cat_id=cat_id,
                 analysis_result=nn_response.analysis_result,
                 processing_time_ms=processing_time_ms,
                 status="completed",
@@ -332,6 +791,15 @@ class ImageProcessingService:
                 ),
             )
 
+    async def _haircut_ref(self, name: str) -> int | str:
+        # id стрижки из каталога в памяти; без каталога (или если имени в нём
+        # нет) id ищется подзапросом по имени в том же INSERT
+        if self.haircut_catalog is not None:
+            haircut = await self.haircut_catalog.get_by_name(name)
+            if haircut is not None:
+                return haircut.id
+        return name
+
     async def validate_image(self, image_data: ImageData) -> ValidationResult:
         print("🔍 Начало валидации изображений...")
         errors = []
@@ -347,23 +815,7 @@ class ImageProcessingService:
             )
 
         try:
-            with PILImage.open(io.BytesIO(image_data.data)) as img:
-                width, height = img.size
-                if width < 640 or height < 480:
-                    errors.append(
-                        ProcessingError(
-                            error_id="VALIDATION_RESOLUTION",
-                            error_type="validation",
-                            message=f"Изображение {image_data.file_name} имеет недостаточное разрешение",
-                            details=f"Текущее: {width}x{height}, минимальное: 640x480",
-                            suggestions=[
-                                "Используйте изображение с более высоким разрешением"
-                            ],
-                        )
-                    )
-
-                image_data.resolution = f"{width}x{height}"
-
+            inspection = await self._inspect(image_data.data)
         except Exception as e:
             errors.append(
                 ProcessingError(
@@ -374,24 +826,69 @@ class ImageProcessingService:
                     suggestions=["Используйте формат JPEG или PNG"],
                 )
             )
+        else:
+            width, height = inspection.width, inspection.height
+            if width < 640 or height < 480:
+                errors.append(
+                    ProcessingError(
+                        error_id="VALIDATION_RESOLUTION",
+                        error_type="validation",
+                        message=f"Изображение {image_data.file_name} имеет недостаточное разрешение",
+                        details=f"Текущее: {width}x{height}, минимальное: 640x480",
+                        suggestions=[
+                            "Используйте изображение с более высоким разрешением"
+                        ],
+                    )
+                )
+
+            # Метаданные и уменьшенная копия сохраняются в ImageData,
+            # чтобы нейросетевой клиент не разбирал файл повторно
+            image_data.resolution = f"{width}x{height}"
+            image_data.width = width
+            image_data.height = height
+            image_data.orientation = inspection.orientation
+            if inspection.thumbnail is not None:
+                thumbnail = inspection.thumbnail
+                image_data.thumbnail = ImageThumbnail(
+                    data=thumbnail.data,
+                    content_type=thumbnail.content_type,
+                    format=thumbnail.format,
+                    size=thumbnail.size,
+                )
 
         print(f"🔍 Валидация завершена: ошибок={len(errors)}")
         return ValidationResult(is_valid=len(errors) == 0, errors=errors)
 
-    async def get_processing_result(self, cat_id: int) -> Dict[str, Any] | None:
+    async def _inspect(self, data: bytes) -> ImageInspection:
+        if self.image_validator is not None:
+            return await self.image_validator.inspect(data)
+        # Без пула (воркер задач, скрипты) — в потоке, не в event loop
+        return await asyncio.to_thread(inspect_image, data)
+
+    async def get_processing_result(
+        self, cat_id: int, include_image: bool = True
+    ) -> Dict[str, Any] | None:
         recommendation = await self.recommendations_repo.get_by_cat_id(cat_id)
         if recommendation is None:
             return None
 
-        haircut = await self.haircut_repo.get_by_id(recommendation.haircut_id)
+        # Каталог в памяти: таблица Haircuts (с ImageBytes) не читается
+        if self.haircut_catalog is not None:
+            haircut = await self.haircut_catalog.get(recommendation.haircut_id)
+        else:
+            row = await self.haircut_repo.get_by_id(recommendation.haircut_id)
+            haircut = catalog_entry(row) if row is not None else None
         if haircut is None:
             return None
 
         return {
             "cat_id": cat_id,
-            "image": haircut.image_bytes,
+            "haircut_id": haircut.id,
+            "image": await read_image(haircut, self.blob_store)
+            if include_image
+            else None,
             "recommendation": HaircutRecommendation(
-                haircut_name=haircut.name,  # pyright: ignore[reportArgumentType]
-                haircut_description=haircut.description,  # pyright: ignore[reportArgumentType]
+                haircut_name=haircut.name,
+                haircut_description=haircut.description,
             ),
         }
@@ -0,0 +1,118 @@
+import struct
+from dataclasses import dataclass
+
+# Сколько байт начала файла нужно для определения формата и размеров.
+# У JPEG перед SOF может стоять EXIF с превью — такие файлы досматривает PIL
+SNIFF_BYTES = 64 * 1024
+
+# Заголовок WebP с размерами кадра (VP8, VP8L, VP8X) укладывается в 30 байт
+_WEBP_HEADER_BYTES = 30
+
+# Маркеры SOF0..SOF15 без DHT (C4), JPG (C8) и DAC (CC)
+_JPEG_SOF_MARKERS = {0xC0 + n for n in range(16)} - {0xC4, 0xC8, 0xCC}
+
+
+@dataclass(frozen=True)
+class ImageHeader:
+    format: str  # "JPEG", "PNG", "GIF", "WEBP" — как Image.format в PIL
+    width: int
+    height: int
+
+    @property
+    def resolution(self) -> str:
+        return f"{self.width}x{self.height}"
+
+
+def detect_format(head: bytes) -> str | None:
+    # Только по сигнатуре: хватает первых 12 байт
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def sniff_image_header(head: bytes) -> ImageHeader | None:
+    # Формат и размеры из заголовка без декодирования пикселей.
+    # None — формат не распознан или заголовок не уместился в head
+    image_format = detect_format(head)
+    try:
+        if image_format == "PNG":
+            return _sniff_png(head)
+        if image_format == "GIF":
+            return _sniff_gif(head)
+        if image_format == "WEBP":
+            return _sniff_webp(head)
+        if image_format == "JPEG":
+            return _sniff_jpeg(head)
+    except (struct.error, IndexError):
+        # Обрезанный заголовок — файл досмотрит PIL при валидации
+        return None
+    return None
+
+
+def _sniff_png(head: bytes) -> ImageHeader | None:
+    # Первый чанк PNG всегда IHDR: ширина и высота big-endian
+    if head[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", head[16:24])
+    return ImageHeader("PNG", width, height)
+
+
+def _sniff_gif(head: bytes) -> ImageHeader:
+    width, height = struct.unpack("<HH", head[6:10])
+    return ImageHeader("GIF", width, height)
+
+
+def _sniff_webp(head: bytes) -> ImageHeader | None:
+    if len(head) < _WEBP_HEADER_BYTES:
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        # Lossy: кадр начинается с 9d 01 2a, размеры — 14 бит
+        if head[23:26] != b"\x9d\x01\x2a":
+            return None
+        width, height = struct.unpack("<HH", head[26:30])
+        return ImageHeader("WEBP", width & 0x3FFF, height & 0x3FFF)
+    if chunk == b"VP8L":
+        # Lossless: 14 бит ширины-1 и 14 бит высоты-1 после сигнатуры 0x2f
+        if head[20] != 0x2F:
+            return None
+        bits = int.from_bytes(head[21:25], "little")
+        return ImageHeader("WEBP", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk == b"VP8X":
+        # Extended: размеры холста — 24 бита (минус один)
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return ImageHeader("WEBP", width, height)
+    return None
+
+
+def _sniff_jpeg(head: bytes) -> ImageHeader | None:
+    # Идём по сегментам до SOF: в нём высота и ширина кадра
+    offset = 2
+    while offset + 4 <= len(head):
+        if head[offset] != 0xFF:
+            return None
+        marker = head[offset + 1]
+        if marker == 0xFF:
+            # Допустимое заполнение между маркерами
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        (length,) = struct.unpack(">H", head[offset + 2 : offset + 4])
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(head):
+                return None
+            height, width = struct.unpack(">HH", head[offset + 5 : offset + 9])
+            return ImageHeader("JPEG", width, height)
+        if marker in (0xD9, 0xDA):
+            return None
+        offset += 2 + length
+    return None
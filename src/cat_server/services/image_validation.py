@@ -0,0 +1,151 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from PIL import Image as PILImage
+
+from cat_server.services.image_normalization import (
+    ImageNormalization,
+    NormalizedImage,
+    normalize_opened_image,
+)
+
+logger = logging.getLogger(__name__)
+
+# Тег EXIF Orientation
+EXIF_ORIENTATION = 0x0112
+
+
+@dataclass(frozen=True)
+class ImageInspection:
+    # Результат разбора файла в процессе пула; передаётся обратно через pickle
+    format: str
+    width: int
+    height: int
+    orientation: int
+    thumbnail: NormalizedImage | None = None
+
+
+def inspect_image(
+    data: bytes, thumbnail_mode: ImageNormalization = "off", thumbnail_size: int = 224
+) -> ImageInspection:
+    # Выполняется в процессе пула. Открывает файл один раз: размеры, формат и
+    # ориентация из заголовка, при включённой нормализации — ещё и вход модели
+    with PILImage.open(io.BytesIO(data)) as img:
+        width, height = img.size
+        image_format = img.format or "unknown"
+        orientation = int(img.getexif().get(EXIF_ORIENTATION, 1))
+        thumbnail = (
+            normalize_opened_image(img, thumbnail_mode, thumbnail_size)
+            if thumbnail_mode != "off"
+            else None
+        )
+    return ImageInspection(image_format, width, height, orientation, thumbnail)
+
+
+def _warm_up() -> None:
+    # Распаковка ссылки на функцию импортирует этот модуль в процессе пула
+    return None
+
+
+class ImageValidator:
+    # Разбор загрузок Pillow вне event loop API: в пуле процессов (GIL не
+    # держится при всплеске больших файлов) или, при workers=0, в потоке.
+    # Пул создаётся один раз в lifespan
+
+    def __init__(
+        self,
+        workers: int = 2,
+        thumbnail_mode: ImageNormalization = "off",
+        thumbnail_size: int = 224,
+    ):
+        self.workers = max(0, workers)
+        self.thumbnail_mode = thumbnail_mode
+        self.thumbnail_size = thumbnail_size
+        self._pool: ProcessPoolExecutor | None = None
+
+        self.inspected = 0
+        self.failures = 0
+        self.pool_restarts = 0
+        self.total_ms = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # fork процесса API небезопасен (потоки TensorFlow и aiohttp), а
+            # spawn импортирует в каждом процессе __main__ — под cat-server
+            # это всё приложение. forkserver запускается один раз, заранее
+            # импортирует __main__ и этот модуль (только PIL и numpy), и
+            # процессы пула ответвляются от него уже готовыми
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["__main__", __name__])
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context
+            )
+        return self._pool
+
+    async def inspect(self, data: bytes) -> ImageInspection:
+        started = time.perf_counter()
+        try:
+            if self.workers == 0:
+                return await asyncio.to_thread(
+                    inspect_image, data, self.thumbnail_mode, self.thumbnail_size
+                )
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            try:
+                return await loop.run_in_executor(
+                    pool,
+                    inspect_image,
+                    data,
+                    self.thumbnail_mode,
+                    self.thumbnail_size,
+                )
+            except BrokenProcessPool:
+                # Процесс пула упал (например, OOM на огромной картинке):
+                # пересоздаём пул, а загрузку считаем невалидной
+                logger.warning("⚠️ Пул валидации изображений упал, пересоздаём")
+                self._reset_pool(pool)
+                raise
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.inspected += 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+
+    def _reset_pool(self, broken: ProcessPoolExecutor) -> None:
+        # Одновременные запросы к упавшему пулу пересоздают его один раз
+        if self._pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self.pool_restarts += 1
+
+    def start(self) -> None:
+        # Процессы запускаются заранее, чтобы первая загрузка не ждала запуска
+        if self.workers > 0:
+            pool = self._get_pool()
+            for _ in range(self.workers):
+                pool.submit(_warm_up)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "thumbnail_mode": self.thumbnail_mode,
+            "inspected": self.inspected,
+            "failures": self.failures,
+            "pool_restarts": self.pool_restarts,
+            "mean_ms": round(self.total_ms / self.inspected, 2)
+            if self.inspected
+            else 0.0,
+        }
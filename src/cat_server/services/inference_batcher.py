@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Set
+
+from cat_server.infrastructure.ai_model.dual_model_loader import ImageInput
+from cat_server.services.inference_executor import InferenceExecutor
+
+logger = logging.getLogger(__name__)
+
+PredictBatchFn = Callable[[List[ImageInput], bool], List[Dict[str, Any]]]
+
+
+@dataclass
+class _PendingItem:
+    image_data: ImageInput
+    require_cat: bool
+    future: asyncio.Future = field(repr=False)
+
+
+class InferenceBatcher:
+    # Склеивает параллельные запросы в один батч перед вызовом моделей.
+    # Батч отправляется, когда набран max_batch_size или истёк max_wait_ms
+    # с момента прихода первого изображения. Если задан executor, батчи
+    # выполняются в его пуле, не более одного батча на поток
+
+    def __init__(
+        self,
+        predict_batch: PredictBatchFn,
+        max_batch_size: int = 8,
+        max_wait_ms: int = 5,
+        executor: InferenceExecutor | None = None,
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0, max_wait_ms)
+        self.executor = executor
+        self._queue: asyncio.Queue[_PendingItem] = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+        # Пока все потоки заняты, новые запросы копятся в очереди
+        # и уходят следующим, более крупным батчем
+        self._slots = asyncio.Semaphore(executor.max_workers if executor else 1)
+        self._in_flight: Set[asyncio.Task] = set()
+
+        self.batch_size_counts: Counter[int] = Counter()
+        self.total_batches = 0
+        self.total_items = 0
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        # Ожидающие запросы не должны зависнуть навсегда
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if not item.future.done():
+                item.future.set_exception(
+                    RuntimeError("Пакетная обработка остановлена")
+                )
+
+    async def submit(
+        self, image_data: ImageInput, require_cat: bool = True
+    ) -> Dict[str, Any]:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingItem(image_data, require_cat, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect(loop)
+            except BaseException:
+                self._slots.release()
+                raise
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._on_dispatched)
+
+    def _on_dispatched(self, task: asyncio.Task) -> None:
+        self._in_flight.discard(task)
+        self._slots.release()
+
+    async def _collect(self, loop: asyncio.AbstractEventLoop) -> List[_PendingItem]:
+        batch: List[_PendingItem] = []
+        try:
+            batch.append(await self._queue.get())
+            deadline = loop.time() + self.max_wait_ms / 1000
+
+            while len(batch) < self.max_batch_size:
+                # Сначала забираем всё, что уже лежит в очереди
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Уже забранные запросы возвращаются в начало очереди: их завершит
+            # stop() или обработает перезапущенный воркер
+            self._requeue_front(batch)
+            raise
+
+        return batch
+
+    def _requeue_front(self, items: List[_PendingItem]) -> None:
+        rest = []
+        while not self._queue.empty():
+            rest.append(self._queue.get_nowait())
+        for item in items + rest:
+            self._queue.put_nowait(item)
+
+    async def _dispatch(self, batch: List[_PendingItem]) -> None:
+        self.batch_size_counts[len(batch)] += 1
+        self.total_batches += 1
+        self.total_items += len(batch)
+
+        # Запросы с проверкой кота и без неё выполняются разными вызовами
+        groups: Dict[bool, List[_PendingItem]] = {}
+        for item in batch:
+            groups.setdefault(item.require_cat, []).append(item)
+
+        for require_cat, items in groups.items():
+            images = [item.image_data for item in items]
+            try:
+                if self.executor is not None:
+                    results = await self.executor.run(
+                        self.predict_batch, images, require_cat
+                    )
+                else:
+                    results = self.predict_batch(images, require_cat)
+            except Exception as e:
+                logger.error(f"❌ Ошибка пакетной обработки: {e}")
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            for item, result in zip(items, results):
+                if not item.future.done():
+                    result["batch_size"] = len(batch)
+                    item.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queued": self._queue.qsize(),
+            "total_batches": self.total_batches,
+            "total_items": self.total_items,
+            "mean_batch_size": round(self.total_items / self.total_batches, 2)
+            if self.total_batches
+            else 0.0,
+            "batch_size_distribution": {
+                str(size): count
+                for size, count in sorted(self.batch_size_counts.items())
+            },
+        }
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class InferenceQueueFullError(Exception):
+    # Очередь инференса заполнена — запрос нужно отклонить сразу (503)
+    pass
+
+
+class InferenceExecutor:
+    # Выделенный пул потоков для TensorFlow: декодирование и вызовы моделей
+    # не блокируют event loop, а число ожидающих изображений ограничено
+
+    def __init__(self, max_workers: int = 2, max_queue_size: int = 32):
+        self.max_workers = max(1, max_workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="inference"
+        )
+        self.pending = 0
+        self.rejected = 0
+        self.completed = 0
+
+    @contextmanager
+    def slot(self, count: int = 1) -> Iterator[None]:
+        # Резервирует место в очереди на время обработки count изображений.
+        # Батч крупнее всей очереди принимается, только пока очередь пуста
+        if self.pending and self.pending + count > self.max_queue_size:
+            self.rejected += count
+            raise InferenceQueueFullError(
+                f"Очередь инференса заполнена ({self.pending}/{self.max_queue_size})"
+            )
+        self.pending += count
+        try:
+            yield
+        finally:
+            self.pending -= count
+            self.completed += count
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, fn, *args)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "completed": self.completed,
+        }
@@ -0,0 +1,33 @@
+from collections import deque
+from typing import Any, Dict
+
+
+class LatencyWindow:
+    # Скользящее окно последних задержек (мс) для перцентилей в статистике
+
+    def __init__(self, size: int = 512):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, latency_ms: float) -> None:
+        self._samples.append(latency_ms)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        if not self._samples:
+            return {"samples": 0}
+        return {
+            "samples": len(self._samples),
+            "mean_ms": round(sum(self._samples) / len(self._samples), 2),
+            "p50_ms": round(self.percentile(50), 2),  # pyright: ignore[reportArgumentType]
+            "p95_ms": round(self.percentile(95), 2),  # pyright: ignore[reportArgumentType]
+            "p99_ms": round(self.percentile(99), 2),  # pyright: ignore[reportArgumentType]
+        }
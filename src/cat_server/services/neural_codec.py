@@ -0,0 +1,59 @@
+import json
+from typing import Any, Dict, Literal, Tuple
+
+try:
+    import msgpack
+except ImportError:  # msgpack необязателен: без него компактный ответ идёт в JSON
+    msgpack = None
+
+# Форматы ответа сервиса нейросети, согласуются через заголовок Accept.
+# Компактные форматы не возвращают изображение обратно — только предсказания
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+COMPACT_JSON_MEDIA_TYPE = "application/vnd.cat-neural.compact+json"
+
+ResponseFormat = Literal["msgpack", "compact_json", "full"]
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def compact_accept_header() -> str:
+    # Заголовок Accept клиента: msgpack, затем компактный JSON, затем обычный
+    if msgpack_available():
+        return (
+            f"{MSGPACK_MEDIA_TYPE}, {COMPACT_JSON_MEDIA_TYPE};q=0.9, "
+            "application/json;q=0.5"
+        )
+    return f"{COMPACT_JSON_MEDIA_TYPE}, application/json;q=0.5"
+
+
+def negotiate_format(accept: str | None) -> ResponseFormat:
+    media_types = {part.split(";")[0].strip() for part in (accept or "").split(",")}
+    if MSGPACK_MEDIA_TYPE in media_types and msgpack_available():
+        return "msgpack"
+    if COMPACT_JSON_MEDIA_TYPE in media_types or MSGPACK_MEDIA_TYPE in media_types:
+        return "compact_json"
+    return "full"
+
+
+def encode(
+    payload: Dict[str, Any], response_format: ResponseFormat
+) -> Tuple[bytes, str]:
+    if response_format == "msgpack":
+        return msgpack.packb(payload, use_bin_type=True), MSGPACK_MEDIA_TYPE  # pyright: ignore[reportOptionalMemberAccess]
+    media_type = (
+        COMPACT_JSON_MEDIA_TYPE
+        if response_format == "compact_json"
+        else "application/json"
+    )
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8"), media_type
+
+
+def decode(body: bytes, content_type: str | None) -> Dict[str, Any]:
+    media_type = (content_type or "").split(";")[0].strip()
+    if media_type == MSGPACK_MEDIA_TYPE:
+        if not msgpack_available():
+            raise ValueError("Получен msgpack-ответ, но пакет msgpack не установлен")
+        return msgpack.unpackb(body, raw=False)  # pyright: ignore[reportOptionalMemberAccess]
+    return json.loads(body)
@@ -0,0 +1,159 @@
+import bisect
+import hashlib
+import time
+from typing import Any, Dict, Iterable, List, Literal
+
+from cat_server.services.latency_window import LatencyWindow
+
+# least_outstanding — реплика с наименьшим числом запросов в работе;
+# consistent_hash — одно и то же изображение всегда идёт на одну реплику
+# (локальность кешей нейросети), при её недоступности — на следующую по кольцу
+BalancingStrategy = Literal["least_outstanding", "consistent_hash"]
+
+# Виртуальных узлов на реплику: сглаживает распределение по кольцу
+RING_REPLICAS = 64
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha256(value.encode("utf-8")).digest()[:8], "big")
+
+
+class CircuitBreaker:
+    # closed — запросы идут; open — реплика исключена до reset_timeout;
+    # half_open — пропускается один пробный запрос, успех закрывает breaker
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._probe_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allows_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        return state == "half_open" and not self._probe_in_flight
+
+    def on_request(self) -> None:
+        if self.state == "half_open":
+            self._probe_in_flight = True
+
+    def release_probe(self) -> None:
+        # Пробный запрос отменён, не дойдя до результата
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or (
+            self.consecutive_failures >= self.failure_threshold
+        ):
+            # Неудачная проба снова открывает breaker на полный период
+            if self.opened_at is None:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+
+class NeuralEndpoint:
+    def __init__(self, url: str, breaker: CircuitBreaker):
+        self.url = url
+        self.breaker = breaker
+        self.outstanding = 0
+        self.requests_total = 0
+        self.failures_total = 0
+        self.latency = LatencyWindow()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "state": self.breaker.state,
+            "outstanding": self.outstanding,
+            "requests_total": self.requests_total,
+            "failures_total": self.failures_total,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "times_opened": self.breaker.times_opened,
+            "latency": self.latency.stats(),
+        }
+
+
+class EndpointPool:
+    # Набор реплик сервиса нейросети с балансировкой и circuit breaker на каждую
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        strategy: BalancingStrategy = "least_outstanding",
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.endpoints = [
+            NeuralEndpoint(url, CircuitBreaker(failure_threshold, reset_timeout))
+            for url in dict.fromkeys(urls)
+        ]
+        if not self.endpoints:
+            raise ValueError("Не задано ни одного адреса нейросети")
+        self.strategy = strategy
+        self._ring: List[tuple[int, int]] = sorted(
+            (_ring_hash(f"{endpoint.url}#{replica}"), index)
+            for index, endpoint in enumerate(self.endpoints)
+            for replica in range(RING_REPLICAS)
+        )
+        self._ring_keys = [point for point, _ in self._ring]
+        self.no_endpoint_available = 0
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def choose(
+        self, key: str | None = None, exclude: Iterable[NeuralEndpoint] = ()
+    ) -> NeuralEndpoint | None:
+        excluded = {id(endpoint) for endpoint in exclude}
+        candidates = [
+            endpoint
+            for endpoint in self._ordered(key)
+            if id(endpoint) not in excluded and endpoint.breaker.allows_request()
+        ]
+        if not candidates:
+            self.no_endpoint_available += 1
+            return None
+        if self.strategy == "consistent_hash" and key is not None:
+            return candidates[0]
+        return min(candidates, key=lambda endpoint: endpoint.outstanding)
+
+    def _ordered(self, key: str | None) -> List[NeuralEndpoint]:
+        # Для consistent_hash — реплики в порядке обхода кольца от хеша ключа
+        if self.strategy != "consistent_hash" or key is None:
+            return self.endpoints
+        start = bisect.bisect(self._ring_keys, _ring_hash(key))
+        ordered: List[NeuralEndpoint] = []
+        seen = set()
+        for offset in range(len(self._ring)):
+            index = self._ring[(start + offset) % len(self._ring)][1]
+            if index not in seen:
+                seen.add(index)
+                ordered.append(self.endpoints[index])
+                if len(ordered) == len(self.endpoints):
+                    break
+        return ordered
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "no_endpoint_available": self.no_endpoint_available,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+        }
@@ -1,8 +1,14 @@
 import logging
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
-from cat_server.infrastructure.ai_model.dual_model_loader import DualModelLoader
+from cat_server.infrastructure.ai_model.dual_model_loader import (
+    DualModelLoader,
+    ImageInput,
+    PreprocessBackend,
+)
+from cat_server.services.inference_batcher import InferenceBatcher
+from cat_server.services.inference_executor import InferenceExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -10,9 +16,29 @@ base_dir = Path(__file__).resolve().parent.parent
 
 
 class NeuralService:
-    def __init__(self):
+    def __init__(
+        self,
+        max_batch_size: int = 8,
+        max_batch_wait_ms: int = 5,
+        inference_workers: int = 2,
+        inference_queue_size: int = 32,
+        shared_backbone: bool = False,
+        fused_cascade: bool = False,
+        xla: bool = False,
+        preprocess_backend: PreprocessBackend = "tf",
+    ):
         self.model_loader = None
+        self.shared_backbone = shared_backbone
+        self.fused_cascade = fused_cascade
+        self.xla = xla
+        self.preprocess_backend = preprocess_backend
         self.is_loaded = False
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait_ms = max_batch_wait_ms
+        self.executor = InferenceExecutor(
+            max_workers=inference_workers, max_queue_size=inference_queue_size
+        )
+        self.batcher: InferenceBatcher | None = None
 
     async def initialize(self) -> bool:
         try:
@@ -20,11 +46,22 @@ class NeuralService:
             cat_filter_path = str(base_dir / "infrastructure" / "models" / "cat_filter")
 
             self.model_loader = DualModelLoader(
-                main_model_dir=main_model_path, cat_filter_model_dir=cat_filter_path
+                main_model_dir=main_model_path,
+                cat_filter_model_dir=cat_filter_path,
+                shared_backbone=self.shared_backbone,
+                fused_cascade=self.fused_cascade,
+                xla=self.xla,
+                preprocess_backend=self.preprocess_backend,
             )
             self.is_loaded = self.model_loader.load_models()
 
             if self.is_loaded:
+                self.batcher = InferenceBatcher(
+                    predict_batch=self.model_loader.predict_batch,
+                    max_batch_size=self.max_batch_size,
+                    max_wait_ms=self.max_batch_wait_ms,
+                    executor=self.executor,
+                )
                 logger.info("✅ Двойная нейросеть успешно инициализирована")
             else:
                 logger.error("❌ Не удалось загрузить нейросети")
@@ -36,11 +73,60 @@ class NeuralService:
             return False
 
     async def process_image(
-        self, image_data: bytes, check_cat: bool = True
+        self, image_data: ImageInput, check_cat: bool = True
     ) -> Dict[str, Any]:
         if not self.is_loaded or self.model_loader is None:
             success = await self.initialize()
             if not success:
                 return {"success": False, "error": "Нейросеть не загружена"}
 
-        return self.model_loader.predict(image_data, require_cat=check_cat)  # pyright: ignore[reportOptionalMemberAccess]
+        # При переполненной очереди сразу поднимается InferenceQueueFullError;
+        # параллельные запросы склеиваются в один батч и считаются в пуле потоков
+        with self.executor.slot():
+            return await self.batcher.submit(image_data, require_cat=check_cat)  # pyright: ignore[reportOptionalMemberAccess]
+
+    async def process_batch(
+        self, images: List[ImageInput], check_cat: bool = True
+    ) -> List[Dict[str, Any]]:
+        # Явный батч от клиента (POST /batch): минуя микробатчер, режется на
+        # тензоры по max_batch_size, чтобы не занимать поток надолго
+        if not self.is_loaded or self.model_loader is None:
+            success = await self.initialize()
+            if not success:
+                return [
+                    {"success": False, "error": "Нейросеть не загружена"}
+                    for _ in images
+                ]
+
+        results: List[Dict[str, Any]] = []
+        with self.executor.slot(len(images)):
+            for start in range(0, len(images), self.max_batch_size):
+                chunk = images[start : start + self.max_batch_size]
+                chunk_results = await self.executor.run(
+                    self.model_loader.predict_batch,  # pyright: ignore[reportOptionalMemberAccess]
+                    chunk,
+                    check_cat,
+                )
+                for result in chunk_results:
+                    result["batch_size"] = len(chunk)
+                results.extend(chunk_results)
+        return results
+
+    async def shutdown(self) -> None:
+        if self.batcher is not None:
+            await self.batcher.stop()
+        self.executor.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+            "executor": self.executor.stats(),
+            "shared_backbone": self.model_loader is not None
+            and self.model_loader.shared_backbone is not None,
+            "fused_cascade": self.model_loader is not None
+            and self.model_loader.fused_cascade is not None,
+            # Среднее время декодирования для сравнения бэкендов предобработки
+            "preprocess": self.model_loader.preprocess_stats()
+            if self.model_loader is not None
+            else None,
+        }
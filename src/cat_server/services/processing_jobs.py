@@ -0,0 +1,205 @@
+import base64
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import redis.asyncio as aioredis
+
+from cat_server.domain.dto import ImageData, ImageThumbnail
+from cat_server.services.session_events import publish_session_event
+
+logger = logging.getLogger(__name__)
+
+# Запись потока: (id записи, поля)
+StreamEntry = Tuple[str, Dict[str, str]]
+
+
+class ProcessingJobQueue:
+    # Очередь асинхронной обработки загрузок на Redis Streams.
+    # API кладёт изображение в поток и сразу отвечает 202 с job_id,
+    # воркеры читают поток через consumer group; статус задачи хранится
+    # в хеше job:{job_id} и отдаётся эндпоинтом статуса.
+    # Сами байты изображения лежат в job:{job_id}:payload с тем же TTL, а в
+    # потоке — только ссылка на задачу: поток не растёт на размер загрузок
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        stream: str = "image_jobs",
+        group: str = "image_workers",
+        job_ttl: int = 3600,
+    ):
+        self.redis = redis
+        self.stream = stream
+        self.group = group
+        self.job_ttl = job_ttl
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    @staticmethod
+    def _payload_key(job_id: str) -> str:
+        return f"job:{job_id}:payload"
+
+    def _min_entry_id(self) -> str:
+        # ID записи потока начинается с времени добавления в мс: всё старше
+        # job_ttl уже без статуса и данных, такие записи можно обрезать
+        return f"{int((time.time() - self.job_ttl) * 1000)}-0"
+
+    async def enqueue(self, session_id: str, image_data: ImageData) -> str:
+        job_id = str(uuid.uuid4())
+        await self.redis.hset(
+            self._job_key(job_id),
+            mapping={
+                "job_id": job_id,
+                "session_id": session_id,
+                "status": "pending",
+                "attempts": 0,
+                "updated_at": datetime.now().isoformat(),
+            },
+        )
+        await self.redis.expire(self._job_key(job_id), self.job_ttl)
+
+        # Клиент Redis работает со строками, поэтому изображение — в base64
+        payload = {"data": base64.b64encode(image_data.data).decode("ascii")}
+        fields = {
+            "job_id": job_id,
+            "session_id": session_id,
+            "file_name": image_data.file_name,
+            "format": image_data.format,
+        }
+        # Результат валидации едет вместе с файлом: воркер его не повторяет
+        if image_data.width is not None and image_data.height is not None:
+            fields["width"] = str(image_data.width)
+            fields["height"] = str(image_data.height)
+            fields["orientation"] = str(image_data.orientation or 1)
+        thumbnail = image_data.thumbnail
+        if thumbnail is not None:
+            payload["thumbnail"] = base64.b64encode(thumbnail.data).decode("ascii")
+            fields["thumbnail_content_type"] = thumbnail.content_type
+            fields["thumbnail_format"] = thumbnail.format
+            fields["thumbnail_size"] = str(thumbnail.size)
+        await self.redis.hset(self._payload_key(job_id), mapping=payload)
+        await self.redis.expire(self._payload_key(job_id), self.job_ttl)
+        # Обрезка по возрасту, а не по длине: всплеск загрузок не вытесняет
+        # ещё не обработанные записи
+        await self.redis.xadd(
+            self.stream,
+            fields,
+            minid=self._min_entry_id(),
+            approximate=True,
+        )
+        print(f"📨 Задача {job_id} поставлена в очередь")
+        return job_id
+
+    async def get_status(self, job_id: str) -> Dict[str, str] | None:
+        job = await self.redis.hgetall(self._job_key(job_id))
+        return job or None
+
+    async def set_status(
+        self,
+        job_id: str,
+        status: str,
+        cat_id: int | None = None,
+        error_message: str | None = None,
+        session_id: str | None = None,
+    ) -> None:
+        mapping: Dict[str, Any] = {
+            "status": status,
+            "updated_at": datetime.now().isoformat(),
+        }
+        if cat_id is not None:
+            mapping["cat_id"] = cat_id
+        if error_message is not None:
+            mapping["error_message"] = error_message
+        await self.redis.hset(self._job_key(job_id), mapping=mapping)
+        await self.redis.expire(self._job_key(job_id), self.job_ttl)
+        if session_id is not None:
+            await publish_session_event(
+                self.redis,
+                session_id,
+                {
+                    "type": "job_status",
+                    "job_id": job_id,
+                    "status": status,
+                    "cat_id": cat_id,
+                    "error_message": error_message,
+                },
+            )
+
+    async def record_attempt(self, job_id: str) -> int:
+        attempts = await self.redis.hincrby(self._job_key(job_id), "attempts", 1)
+        return int(attempts)
+
+    async def record_cat(self, job_id: str, cat_id: int) -> None:
+        # Кот уже в БД: повторная доставка записи не должна создать второго
+        await self.redis.hset(self._job_key(job_id), "cat_id", cat_id)
+
+    async def refund_attempt(self, job_id: str) -> None:
+        # Попытка не удалась не по вине задачи (перегрузка нейросети)
+        await self.redis.hincrby(self._job_key(job_id), "attempts", -1)
+
+    # --- Сторона воркера ---
+
+    async def ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True
+            )
+        except aioredis.ResponseError as e:
+            # Группа уже создана другим воркером
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read(
+        self, consumer: str, count: int = 8, block_ms: int = 5000
+    ) -> List[StreamEntry]:
+        response = await self.redis.xreadgroup(
+            self.group, consumer, {self.stream: ">"}, count=count, block=block_ms
+        )
+        return [entry for _, entries in response or [] for entry in entries]
+
+    async def claim_stale(
+        self, consumer: str, min_idle_ms: int, count: int = 8
+    ) -> List[StreamEntry]:
+        # Записи, зависшие у упавших воркеров, забираем себе
+        _, entries, _ = await self.redis.xautoclaim(
+            self.stream, self.group, consumer, min_idle_ms, "0-0", count=count
+        )
+        # Удалённые из потока (обрезка по возрасту) записи приходят пустыми
+        return [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    async def ack(self, entry_id: str, job_id: str) -> None:
+        # Задача завершена окончательно: данные изображения больше не нужны
+        await self.redis.xack(self.stream, self.group, entry_id)
+        await self.redis.delete(self._payload_key(job_id))
+
+    async def load_image(self, fields: Dict[str, str]) -> ImageData | None:
+        # None — данные задачи истекли вместе с TTL
+        payload = await self.redis.hgetall(self._payload_key(fields["job_id"]))
+        if not payload:
+            return None
+        data = base64.b64decode(payload["data"])
+        image_data = ImageData(
+            file_name=fields["file_name"],
+            data=data,
+            size=len(data),
+            format=fields["format"],
+            uploaded_at=datetime.now(),
+        )
+        if "width" in fields:
+            image_data.width = int(fields["width"])
+            image_data.height = int(fields["height"])
+            image_data.resolution = f"{fields['width']}x{fields['height']}"
+            image_data.orientation = int(fields["orientation"])
+        if "thumbnail" in payload:
+            image_data.thumbnail = ImageThumbnail(
+                data=base64.b64decode(payload["thumbnail"]),
+                content_type=fields["thumbnail_content_type"],
+                format=fields["thumbnail_format"],
+                size=int(fields["thumbnail_size"]),
+            )
+        return image_data
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cat_server.infrastructure.repositories import ProcessingLogsRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessingLogBuffer:
+    # Записи ProcessingLogs копятся в памяти и пишутся пачкой (executemany)
+    # по достижении batch_size или раз в flush_interval секунд — на запрос
+    # не приходится отдельного commit. record() не ждёт БД: при
+    # переполненном буфере запись отбрасывается и считается в dropped.
+    # Записи, не сброшенные до падения процесса, теряются
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+    ):
+        self.session_factory = session_factory
+        self.max_size = max(1, max_size)
+        self.batch_size = max(1, min(batch_size, self.max_size))
+        self.flush_interval = flush_interval
+        self._entries: List[Dict[str, Any]] = []
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def record(
+        self,
+        cat_id: int | None,
+        processing_time: float,
+        status: str,
+        error_message: str | None = None,
+        processed_at: datetime | None = None,
+    ) -> bool:
+        if len(self._entries) >= self.max_size:
+            self.dropped += 1
+            return False
+        self._entries.append(
+            {
+                "cat_id": cat_id,
+                "processing_time": processing_time,
+                "status": status,
+                "error_message": error_message,
+                "processed_at": processed_at or datetime.now(),
+            }
+        )
+        self.recorded += 1
+        if len(self._entries) >= self.batch_size:
+            self._flush_requested.set()
+        return True
+
+    def start(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Остановка в lifespan: фоновая задача снимается, остаток сбрасывается
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        while self._entries:
+            if not await self.flush():
+                break
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    async def flush(self) -> bool:
+        async with self._flush_lock:
+            if not self._entries:
+                return True
+            batch = self._entries[: self.batch_size]
+            # Новые записи во время записи в БД попадают в следующую пачку
+            del self._entries[: self.batch_size]
+            if len(self._entries) >= self.batch_size:
+                self._flush_requested.set()
+            try:
+                async with self.session_factory() as session:
+                    await ProcessingLogsRepository(session).create_many(batch)
+            except Exception as e:
+                # Повтор не делается: при недоступной БД буфер иначе не
+                # освободился бы, а record() начал бы отбрасывать свежие записи
+                self.failed += len(batch)
+                logger.warning(
+                    f"⚠️ Не удалось записать {len(batch)} логов обработки: {e}"
+                )
+                return False
+            self.written += len(batch)
+            self.flushes += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._entries),
+            "max_size": self.max_size,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+# compute() возвращает результат и TTL в секундах (None — не кешировать)
+ComputeFn = Callable[[], Awaitable[Tuple[Dict[str, Any], int | None]]]
+
+
+def image_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    # Кеш ответов нейросети по хешу содержимого изображения:
+    # локальный LRU в процессе + Redis с TTL, общий для всех воркеров.
+    # Одинаковые параллельные загрузки ждут один общий вызов нейросети
+
+    def __init__(
+        self,
+        redis: aioredis.Redis | None,
+        max_entries: int = 1024,
+        ttl: int = 3600,
+        negative_ttl: int = 300,
+        key_prefix: str = "nn_response:",
+    ):
+        self.redis = redis
+        self.max_entries = max(1, max_entries)
+        # Отрицательные результаты ("не кот") живут меньше
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.key_prefix = key_prefix
+        self._local: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.shared_in_flight = 0
+        self.evictions = 0
+        self.redis_errors = 0
+
+    async def get(self, digest: str) -> Dict[str, Any] | None:
+        entry = self._local.get(digest)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._local.move_to_end(digest)
+                self.local_hits += 1
+                return value
+            del self._local[digest]
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self.key_prefix + digest)
+                if raw is not None:
+                    ttl = await self.redis.ttl(self.key_prefix + digest)
+                    value = json.loads(raw)
+                    self._remember(digest, value, ttl if ttl > 0 else None)
+                    self.redis_hits += 1
+                    return value
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"⚠️ Кеш результатов: ошибка чтения из Redis: {e}")
+
+        self.misses += 1
+        return None
+
+    async def set(self, digest: str, value: Dict[str, Any], ttl: int) -> None:
+        self._remember(digest, value, ttl)
+        if self.redis is not None:
+            try:
+                await self.redis.setex(self.key_prefix + digest, ttl, json.dumps(value))
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"⚠️ Кеш результатов: ошибка записи в Redis: {e}")
+
+    async def get_or_compute(self, digest: str, compute: ComputeFn) -> Dict[str, Any]:
+        cached = await self.get(digest)
+        if cached is not None:
+            return cached
+
+        # Single-flight: пока идёт вычисление, остальные ждут тот же результат
+        task = self._in_flight.get(digest)
+        if task is not None:
+            self.shared_in_flight += 1
+        else:
+            task = asyncio.create_task(self._compute(digest, compute))
+            self._in_flight[digest] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(digest, None))
+
+        # shield: отмена одного запроса не отменяет вычисление для остальных
+        return await asyncio.shield(task)
+
+    async def _compute(self, digest: str, compute: ComputeFn) -> Dict[str, Any]:
+        value, ttl = await compute()
+        if ttl is not None and ttl > 0:
+            await self.set(digest, value, ttl)
+        return value
+
+    def _remember(self, digest: str, value: Dict[str, Any], ttl: int | None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else float("inf")
+        self._local[digest] = (expires_at, value)
+        self._local.move_to_end(digest)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "local_entries": len(self._local),
+            "max_entries": self.max_entries,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "shared_in_flight": self.shared_in_flight,
+            "in_flight": len(self._in_flight),
+            "evictions": self.evictions,
+            "redis_errors": self.redis_errors,
+        }
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Set
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "session_events:"
+
+
+def session_channel(session_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{session_id}"
+
+
+async def publish_session_event(
+    redis: aioredis.Redis, session_id: str, event: Dict[str, Any]
+) -> None:
+    # Ошибка публикации не должна ломать обработку — клиент может опросить статус
+    try:
+        await redis.publish(session_channel(session_id), json.dumps(event))
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось опубликовать событие сессии: {e}")
+
+
+class SessionEventHub:
+    # Одна подписка Redis (PSUBSCRIBE session_events:*) на процесс, события
+    # раздаются по очередям подключённых клиентов. Простаивающее SSE-соединение
+    # стоит одной asyncio.Queue, а не отдельного соединения с Redis
+
+    def __init__(self, redis: aioredis.Redis, queue_size: int = 16):
+        self.redis = redis
+        self.queue_size = max(1, queue_size)
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._reader: asyncio.Task | None = None
+
+        self.events_received = 0
+        self.events_delivered = 0
+        self.events_dropped = 0
+
+    def start(self) -> None:
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: str) -> AsyncIterator[asyncio.Queue]:
+        self.start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[session_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[session_id]
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"⚠️ Подписка на события сессий прервана: {e}, повтор через {delay}с"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                await pubsub.aclose()
+
+    def _dispatch(self, channel: str, data: str) -> None:
+        self.events_received += 1
+        session_id = channel[len(CHANNEL_PREFIX) :]
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return
+        for queue in self._subscribers.get(session_id, ()):
+            if queue.full():
+                # Медленный клиент получает последние события, старые отбрасываются
+                queue.get_nowait()
+                self.events_dropped += 1
+            queue.put_nowait(event)
+            self.events_delivered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "events_received": self.events_received,
+            "events_delivered": self.events_delivered,
+            "events_dropped": self.events_dropped,
+            "subscribed": self._reader is not None and not self._reader.done(),
+        }
@@ -4,6 +4,7 @@ from datetime import datetime
 import redis.asyncio as aioredis
 
 from cat_server.domain.dto import SessionData
+from cat_server.services.session_events import publish_session_event
 
 
 class UserSessionService:
@@ -33,6 +34,12 @@ class UserSessionService:
             session = await self.get_session(session_id)
             session.cat_id = cat_id
             await self._save_session(session_id, session)
+            # Подписчики SSE узнают о готовой рекомендации без опроса
+            await publish_session_event(
+                self.redis,
+                session_id,
+                {"type": "recommendation_ready", "cat_id": cat_id},
+            )
             return True
         except ValueError:
             return False
@@ -0,0 +1,133 @@
+import json
+from importlib import resources
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+# cat_server.core — до модулей тестов: infrastructure.entities и core
+# импортируют друг друга, и другой порядок падает на частично загруженном модуле
+import cat_server.core  # noqa: F401
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / "infrastructure" / "models"
+
+
+@pytest.fixture(scope="session")
+def sample_images() -> List[Tuple[str, bytes]]:
+    # Фотографии котов из каталога стрижек — те же JPEG, что грузят клиенты
+    images_dir = resources.files("cat_server.scripts.haircuts") / "haircut_images"
+    return [
+        (path.name, path.read_bytes())
+        for path in sorted(images_dir.iterdir(), key=lambda p: p.name)
+        if path.name.lower().endswith((".jpg", ".jpeg", ".png"))
+    ]
+
+
+def _real_model_dirs() -> Tuple[str, str] | None:
+    dirs = (MODELS_DIR / "main_model", MODELS_DIR / "cat_filter")
+    if all((path / "saved_model.pb").exists() for path in dirs):
+        return str(dirs[0]), str(dirs[1])
+    return None
+
+
+@pytest.fixture(scope="session")
+def model_dirs(tmp_path_factory, sample_images) -> Tuple[str, str]:
+    # (main_model, cat_filter). Рабочие модели, если их SavedModel лежит в
+    # репозитории; иначе — пара моделей той же архитектуры, что у Teachable
+    # Machine: общий MobileNetV2 и две полносвязные головы. Годится для
+    # сравнения путей вычисления на одном и том же входе
+    real = _real_model_dirs()
+    if real is not None:
+        return real
+    return _build_models(tmp_path_factory.mktemp("models"), sample_images)
+
+
+@pytest.fixture(scope="session")
+def trained_model_dirs() -> Tuple[str, str]:
+    # Устойчивость ответа к изменению входа проверяется только на обученных
+    # моделях: случайный backbone усиливает любые отличия пикселей
+    real = _real_model_dirs()
+    if real is None:
+        pytest.skip("нет SavedModel обученных моделей в infrastructure/models")
+    return real
+
+
+@pytest.fixture(scope="session")
+def model_dirs_160(tmp_path_factory, sample_images) -> Tuple[str, str]:
+    # Модели с входом не 224: размер берётся из imageSize в metadata.json
+    return _build_models(
+        tmp_path_factory.mktemp("models_160"), sample_images, image_size=160
+    )
+
+
+@pytest.fixture(scope="session")
+def model_dirs_tanh(tmp_path_factory, sample_images) -> Tuple[str, str]:
+    # Те же модели, но с tanh в скрытом слое голов: SharedBackbone собирает
+    # головы с relu и должен получить отказ проверки при загрузке
+    return _build_models(
+        tmp_path_factory.mktemp("models_tanh"), sample_images, activation="tanh"
+    )
+
+
+def _build_models(
+    root: Path, sample_images, image_size: int = 224, activation: str = "relu"
+) -> Tuple[str, str]:
+    tf = pytest.importorskip("tensorflow")
+    keras = pytest.importorskip("keras")
+    import numpy as np
+
+    backbone = keras.applications.MobileNetV2(
+        input_shape=(image_size, image_size, 3),
+        alpha=0.35,
+        include_top=False,
+        weights=None,
+        pooling="avg",
+    )
+    # Статистики BatchNorm по образцам: со значениями по умолчанию признаки
+    # случайного backbone почти не зависят от изображения
+    calibration = tf.stack(
+        [
+            tf.image.resize(
+                tf.image.decode_image(data, channels=3), [image_size, image_size]
+            )
+            / 255.0
+            for _, data in sample_images
+        ]
+    )
+    for layer in backbone.layers:
+        if isinstance(layer, keras.layers.BatchNormalization):
+            layer.momentum = 0.0
+    backbone(calibration, training=True)
+    # Скрытый слой голов стандартизирует признаки: общая для всех фото часть
+    # эмбеддинга иначе перевешивает, и модель отвечает одним классом
+    features = backbone(calibration, training=False).numpy()
+    mean, std = features.mean(axis=0), features.std(axis=0) + 1e-3
+
+    rng = np.random.default_rng(0)
+    dirs = []
+    for name, classes in (("main_model", 4), ("cat_filter", 2)):
+        inputs = keras.Input((image_size, image_size, 3))
+        hidden = keras.layers.Dense(16, activation=activation)(backbone(inputs))
+        outputs = keras.layers.Dense(classes, activation="softmax")(hidden)
+        model = keras.Model(inputs, outputs)
+        hidden_layer, output_layer = model.layers[-2:]
+        kernel = rng.normal(0, 1, (features.shape[1], 16)) / std[:, None]
+        kernel /= np.sqrt(features.shape[1])
+        hidden_layer.set_weights(
+            [kernel.astype("float32"), (-mean @ kernel).astype("float32")]
+        )
+        output_layer.set_weights(
+            [
+                rng.normal(0, 1, (16, classes)).astype("float32"),
+                np.zeros(classes, "float32"),
+            ]
+        )
+        model_dir = root / name
+        model.export(str(model_dir), verbose=False)
+        metadata = json.loads((MODELS_DIR / name / "metadata.json").read_text("utf-8"))
+        metadata["imageSize"] = image_size
+        (model_dir / "metadata.json").write_text(
+            json.dumps(metadata, ensure_ascii=False), "utf-8"
+        )
+        dirs.append(str(model_dir))
+    return dirs[0], dirs[1]
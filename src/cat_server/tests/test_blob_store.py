@@ -0,0 +1,23 @@
+import pytest
+
+from cat_server.core import dependencies
+from cat_server.core.config import settings
+
+
+def test_database_storage_is_default():
+    assert settings.HAIRCUT_IMAGE_STORAGE == "database"
+    assert dependencies.create_blob_store() is None
+
+
+@pytest.mark.parametrize("blob_dir", ["", "data/blobs", "/nonexistent/blobs"])
+def test_local_storage_requires_existing_absolute_dir(monkeypatch, blob_dir):
+    monkeypatch.setattr(settings, "HAIRCUT_IMAGE_STORAGE", "local")
+    monkeypatch.setattr(settings, "BLOB_STORE_DIR", blob_dir)
+    with pytest.raises(RuntimeError, match="BLOB_STORE_DIR"):
+        dependencies.create_blob_store()
+
+
+def test_local_storage_uses_configured_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "HAIRCUT_IMAGE_STORAGE", "local")
+    monkeypatch.setattr(settings, "BLOB_STORE_DIR", str(tmp_path))
+    assert dependencies.create_blob_store().root == tmp_path
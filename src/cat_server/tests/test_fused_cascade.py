@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from cat_server.infrastructure.ai_model.dual_model_loader import (  # noqa: E402
+    DualModelLoader,
+)
+
+TOLERANCE = 1e-4
+
+pytestmark = pytest.mark.slow
+
+
+@pytest.mark.parametrize("shared_backbone", [False, True])
+@pytest.mark.parametrize("dirs_fixture", ["model_dirs", "model_dirs_160"])
+def test_fused_cascade_matches_python_cascade(
+    request, sample_images, dirs_fixture, shared_backbone
+):
+    main_dir, filter_dir = request.getfixturevalue(dirs_fixture)
+    python_cascade = DualModelLoader(
+        main_dir, filter_dir, shared_backbone=shared_backbone
+    )
+    fused = DualModelLoader(
+        main_dir, filter_dir, shared_backbone=shared_backbone, fused_cascade=True
+    )
+    assert python_cascade.load_models()
+    assert fused.load_models()
+    # Граф трассируется под imageSize модели, а не под 224
+    assert fused.fused_cascade is not None
+
+    images = [data for _, data in sample_images]
+    for require_cat in (True, False):
+        expected = python_cascade.predict_batch(images, require_cat=require_cat)
+        actual = fused.predict_batch(images, require_cat=require_cat)
+        for expected_row, actual_row in zip(expected, actual):
+            assert actual_row["success"] == expected_row["success"]
+            if "cat_confidence" in expected_row:
+                assert actual_row["cat_confidence"] == pytest.approx(
+                    expected_row["cat_confidence"], abs=TOLERANCE
+                )
+            if expected_row["success"]:
+                assert (
+                    actual_row["top_prediction"]["class_name"]
+                    == expected_row["top_prediction"]["class_name"]
+                )
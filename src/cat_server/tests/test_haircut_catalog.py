@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from cat_server.core.dependencies import build_image_processing_service  # noqa: E402
+from cat_server.infrastructure.repositories import (  # noqa: E402
+    HAIRCUTS_CHANGED_CHANNEL,
+)
+from cat_server.services.user_session_service import UserSessionService  # noqa: E402
+
+
+def test_service_haircut_repository_publishes_changes():
+    # Репозиторий стрижек сервиса получает Redis приложения: запись через него
+    # не может оставить каталоги других процессов устаревшими
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(HAIRCUTS_CHANGED_CHANNEL)
+        await pubsub.get_message(timeout=1)
+
+        service = build_image_processing_service(
+            UserSessionService(redis=redis), db_session=None, neural_client=None
+        )
+        assert service.haircut_repo.redis is redis
+        await service.haircut_repo._publish_change()
+
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+        assert message is not None and message["data"] == "changed"
+        await pubsub.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from cat_server.api.endpoints import _read_upload
+from cat_server.services.image_sniffing import sniff_image_header
+
+
+def _encode(image_format: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (700, 500), "orange").save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        _encode("JPEG"),
+        _encode("PNG"),
+        _encode("GIF"),
+        _encode("WEBP"),
+        _encode("WEBP", lossless=True),
+    ],
+)
+def test_sniff_image_header_reads_size(data):
+    header = sniff_image_header(data)
+    assert header is not None
+    assert (header.width, header.height) == (700, 500)
+
+
+@pytest.mark.parametrize(
+    "head",
+    [
+        b"RIFF\0\0\0\0WEBPVP8L\0\0",
+        b"RIFF\0\0\0\0WEBPVP8X\0\0",
+        b"RIFF\0\0\0\0WEBPVP8 ",
+        b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR\0\0",
+        b"\xff\xd8\xff\xc0\0\x11\x08",
+        b"GIF89a\x01",
+    ],
+)
+def test_truncated_header_is_not_an_error(head):
+    assert sniff_image_header(head) is None
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "PNG"])
+def test_read_upload_returns_whole_file_and_header(image_format):
+    # Файл больше окна определения формата: данные не должны потеряться
+    data = _encode(image_format) + b"\0" * 100_000
+    upload = UploadFile(io.BytesIO(data), size=len(data))
+    read, header = asyncio.run(_read_upload(upload))
+    assert read == data
+    assert (header.width, header.height) == (700, 500)
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from cat_server.services.inference_batcher import InferenceBatcher
+
+
+def _predict_batch(images, require_cat):
+    return [{"success": True, "image": image} for image in images]
+
+
+def test_stop_while_collecting_fails_taken_requests():
+    async def scenario():
+        # Батч из 8 ждёт добора до 10 с: воркер остановлен посреди _collect
+        batcher = InferenceBatcher(_predict_batch, max_batch_size=8, max_wait_ms=10000)
+        requests = [asyncio.create_task(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        return await asyncio.wait_for(
+            asyncio.gather(*requests, return_exceptions=True), timeout=1
+        )
+
+    results = asyncio.run(scenario())
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_restarted_worker_keeps_request_order():
+    async def scenario():
+        batcher = InferenceBatcher(_predict_batch, max_batch_size=8, max_wait_ms=10000)
+        first = [asyncio.create_task(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        # Отмена воркера без stop(): запросы возвращаются в очередь
+        batcher._worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await batcher._worker
+        assert batcher.stats()["queued"] == 3
+
+        batcher.max_wait_ms = 0
+        later = [asyncio.create_task(batcher.submit(i)) for i in range(3, 5)]
+        results = await asyncio.wait_for(asyncio.gather(*first, *later), timeout=1)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert [result["image"] for result in results] == list(range(5))
+
+
+class _RecordingLoader:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict_batch(self, images, require_cat):
+        self.batch_sizes.append(len(images))
+        return [{"success": True, "image": image} for image in images]
+
+
+def test_concurrent_requests_are_coalesced_up_to_max_batch_size():
+    loader = _RecordingLoader()
+
+    async def scenario():
+        batcher = InferenceBatcher(
+            loader.predict_batch, max_batch_size=8, max_wait_ms=50
+        )
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+        stats = batcher.stats()
+        await batcher.stop()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    assert loader.batch_sizes == [8, 8, 4]
+    # Каждый вызов получает результат своего изображения
+    assert [result["image"] for result in results] == list(range(20))
+    assert [result["batch_size"] for result in results] == [8] * 16 + [4] * 4
+    assert stats["batch_size_distribution"] == {"4": 1, "8": 2}
+    assert stats["total_batches"] == 3
+    assert stats["total_items"] == 20
+    assert stats["mean_batch_size"] == 6.67
+
+
+def test_requests_within_wait_window_share_a_batch():
+    loader = _RecordingLoader()
+
+    async def scenario():
+        batcher = InferenceBatcher(
+            loader.predict_batch, max_batch_size=8, max_wait_ms=500
+        )
+        first = [asyncio.create_task(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        # Пришли позже первого, но до истечения окна ожидания
+        second = [asyncio.create_task(batcher.submit(i)) for i in range(3, 5)]
+        results = await asyncio.gather(*first, *second)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert loader.batch_sizes == [5]
+    assert [result["image"] for result in results] == list(range(5))
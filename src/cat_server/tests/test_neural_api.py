@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from cat_server import neural
+
+SIZE = 2
+TOP = {"class_name": "Лев", "confidence": 0.9, "percentage": "90.00%"}
+
+
+class _NeuralService:
+    is_loaded = True
+    model_loader = SimpleNamespace(image_size=SIZE)
+
+    def __init__(self):
+        self.inputs = []
+
+    async def process_image(self, image):
+        self.inputs.append(image)
+        return {"success": True, "top_prediction": TOP, "predictions": [TOP]}
+
+    async def process_batch(self, images, check_cat=True):
+        self.inputs.extend(images)
+        return [
+            {"success": True, "top_prediction": TOP, "predictions": [TOP]}
+            for _ in images
+        ]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    service = _NeuralService()
+    monkeypatch.setattr(neural, "neural_service", service)
+    # Без lifespan: модели не загружаются, сервис подменён заглушкой
+    return TestClient(neural.app), service
+
+
+def _post(client, data: bytes, encoding: str, path: str = "/"):
+    field = "image" if path == "/" else "images"
+    return client.post(
+        path,
+        files={field: ("cat.rgb", data, "application/octet-stream")},
+        data={"encoding": encoding},
+    )
+
+
+def test_raw_rgb_of_wrong_length_is_client_error(client):
+    http, service = client
+    response = _post(http, b"\x00" * 5, "raw_rgb")
+    assert response.status_code == 400
+    assert service.inputs == []
+
+
+def test_unknown_encoding_is_rejected(client):
+    http, service = client
+    for path in ("/", "/batch"):
+        response = _post(http, b"\x00" * 12, "rgb", path)
+        assert response.status_code == 400, path
+    assert service.inputs == []
+
+
+def test_raw_rgb_of_model_size_is_processed(client):
+    http, service = client
+    response = _post(http, b"\x00" * (SIZE * SIZE * 3), "raw_rgb")
+    assert response.status_code == 200
+    assert service.inputs[0].shape == (1, SIZE, SIZE, 3)
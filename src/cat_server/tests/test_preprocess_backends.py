@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from cat_server.infrastructure.ai_model.dual_model_loader import (  # noqa: E402
+    DualModelLoader,
+)
+from cat_server.scripts.benchmarks.preprocess_backends import (  # noqa: E402
+    prediction_delta,
+    sample_jpegs,
+    tensor_delta,
+)
+
+REDUCED_BACKENDS = ["tf_jpeg_ratio", "pil_draft"]
+
+pytestmark = pytest.mark.slow
+
+
+@pytest.fixture(scope="module")
+def large_jpegs():
+    # 1600x1200: декодирование с уменьшением в 4 раза (короткая сторона 300)
+    return sample_jpegs((1600, 1200))
+
+
+@pytest.mark.parametrize("backend", REDUCED_BACKENDS)
+def test_reduced_decoding_input_close_to_tf(large_jpegs, backend):
+    reference = DualModelLoader(preprocess_backend="tf")
+    loader = DualModelLoader(preprocess_backend=backend)
+    delta = tensor_delta(reference, loader, large_jpegs)
+    assert delta["mean_abs"] < 0.01
+
+
+def test_small_jpeg_is_decoded_in_full():
+    # Короткая сторона меньше входа модели: уменьшать нечего. tf_jpeg_ratio
+    # декодирует тем же libjpeg, что и tf; Pillow отличается на единицы
+    # уровней яркости (другое восстановление цветности)
+    small_jpegs = sample_jpegs((300, 200))
+    reference = DualModelLoader(preprocess_backend="tf")
+    ratio = tensor_delta(
+        reference, DualModelLoader(preprocess_backend="tf_jpeg_ratio"), small_jpegs
+    )
+    assert ratio["max_abs"] == 0.0
+    draft = tensor_delta(
+        reference, DualModelLoader(preprocess_backend="pil_draft"), small_jpegs
+    )
+    assert draft["mean_abs"] < 0.005
+
+
+@pytest.mark.parametrize("backend", REDUCED_BACKENDS)
+def test_reduced_decoding_predictions_match_tf(
+    trained_model_dirs, large_jpegs, backend
+):
+    reference = DualModelLoader(*trained_model_dirs, preprocess_backend="tf")
+    loader = DualModelLoader(*trained_model_dirs, preprocess_backend=backend)
+    assert reference.load_models()
+    assert loader.load_models()
+    delta = prediction_delta(reference, loader, large_jpegs)
+    assert delta["top_class_agreement"] == 1.0
+    assert delta["max_prob_delta"] < 0.05
@@ -0,0 +1,219 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from cat_server import worker as worker_module  # noqa: E402
+from cat_server.domain.dto import (  # noqa: E402
+    ImageData,
+    ImageThumbnail,
+    ProcessingError,
+    ProcessingResult,
+)
+from cat_server.services.processing_jobs import ProcessingJobQueue  # noqa: E402
+
+
+def _image(size: int = 1024) -> ImageData:
+    data = bytes(range(256)) * (size // 256)
+    return ImageData(
+        file_name="cat.jpg",
+        data=data,
+        size=len(data),
+        format="JPEG",
+        uploaded_at=datetime.now(),
+        width=640,
+        height=480,
+        orientation=1,
+        thumbnail=ImageThumbnail(
+            data=b"thumb", content_type="image/webp", format="WEBP", size=5
+        ),
+    )
+
+
+def _queue(redis) -> ProcessingJobQueue:
+    return ProcessingJobQueue(redis, stream="jobs", group="workers", job_ttl=60)
+
+
+def test_stream_entry_holds_reference_only():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        queue = _queue(redis)
+        image = _image(64 * 1024)
+        job_id = await queue.enqueue("session", image)
+
+        [(_, fields)] = await redis.xrange("jobs")
+        assert fields["job_id"] == job_id
+        assert "data" not in fields and "thumbnail" not in fields
+        assert sum(map(len, fields.values())) < 1024
+        assert 0 < await redis.ttl(f"job:{job_id}:payload") <= 60
+
+        restored = await queue.load_image(fields)
+        assert restored.data == image.data
+        assert restored.thumbnail.data == b"thumb"
+        assert restored.resolution == "640x480"
+
+        await queue.ensure_group()
+        [(entry_id, _)] = await queue.read("worker", block_ms=1)
+        await queue.ack(entry_id, job_id)
+        assert await queue.load_image(fields) is None
+
+    asyncio.run(scenario())
+
+
+def test_trim_by_age_keeps_unprocessed_entries():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        queue = _queue(redis)
+        # Запись старше job_ttl: её статус и данные уже истекли
+        await redis.xadd("jobs", {"job_id": "stale"}, id="1-0")
+        for _ in range(50):
+            await queue.enqueue("session", _image())
+
+        # XADD обрезает приблизительно (целыми узлами потока), поэтому
+        # границу проверяем точной обрезкой по тому же MINID
+        await redis.xtrim("jobs", minid=queue._min_entry_id(), approximate=False)
+        entries = await redis.xrange("jobs")
+        assert len(entries) == 50
+        assert all(fields["job_id"] != "stale" for _, fields in entries)
+
+    asyncio.run(scenario())
+
+
+class _OverloadedService:
+    async def process_images(self, image_data):
+        return ProcessingResult(
+            processing_time_ms=1,
+            status="error",
+            error=ProcessingError(
+                error_id="NEURAL_CONCURRENCY_LIMIT",
+                error_type="neural_api",
+                message="busy",
+            ),
+        )
+
+
+def test_overload_does_not_consume_attempts(monkeypatch):
+    monkeypatch.setattr(
+        worker_module,
+        "build_image_processing_service",
+        lambda *args, **kwargs: _OverloadedService(),
+    )
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        queue = _queue(redis)
+        job_id = await queue.enqueue("session", _image())
+        await queue.ensure_group()
+        [entry] = await queue.read("worker", block_ms=1)
+
+        job_worker = worker_module.JobWorker(
+            redis=redis,
+            job_queue=queue,
+            neural_client=None,
+            result_cache=None,
+            consumer="worker",
+            max_attempts=2,
+        )
+        for _ in range(5):
+            await job_worker._handle(entry)
+
+        job = await queue.get_status(job_id)
+        assert job["status"] == "pending"
+        assert job["attempts"] == "0"
+        # Запись не подтверждена и ждёт повторной обработки
+        pending = await redis.xpending("jobs", "workers")
+        assert pending["pending"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_expired_payload_fails_job():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        queue = _queue(redis)
+        job_id = await queue.enqueue("session", _image())
+        await redis.delete(f"job:{job_id}:payload")
+        await queue.ensure_group()
+        [entry] = await queue.read("worker", block_ms=1)
+
+        job_worker = worker_module.JobWorker(
+            redis=redis,
+            job_queue=queue,
+            neural_client=None,
+            result_cache=None,
+            consumer="worker",
+        )
+        await job_worker._handle(entry)
+
+        job = await queue.get_status(job_id)
+        assert job["status"] == "error"
+        assert (await redis.xpending("jobs", "workers"))["pending"] == 0
+
+    asyncio.run(scenario())
+
+
+class _CountingService:
+    def __init__(self):
+        self.calls = 0
+
+    async def process_images(self, image_data):
+        self.calls += 1
+        return ProcessingResult(
+            cat_id=100 + self.calls,
+            processing_time_ms=1,
+            status="completed",
+            error=None,
+        )
+
+
+class _FlakyUserSession:
+    # Первая привязка кота к сессии падает, как при обрыве связи с Redis
+    links = []
+
+    def __init__(self, redis, session_ttl):
+        pass
+
+    async def link_cat_to_session(self, session_id, cat_id):
+        self.links.append(cat_id)
+        if len(self.links) == 1:
+            raise ConnectionError("Redis недоступен")
+        return True
+
+
+def test_redelivery_after_cat_created_does_not_create_another(monkeypatch):
+    service = _CountingService()
+    _FlakyUserSession.links = []
+    monkeypatch.setattr(
+        worker_module, "build_image_processing_service", lambda *a, **kw: service
+    )
+    monkeypatch.setattr(worker_module, "UserSessionService", _FlakyUserSession)
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        queue = _queue(redis)
+        job_id = await queue.enqueue("session", _image())
+        await queue.ensure_group()
+        [entry] = await queue.read("worker", block_ms=1)
+
+        job_worker = worker_module.JobWorker(
+            redis=redis,
+            job_queue=queue,
+            neural_client=None,
+            result_cache=None,
+            consumer="worker",
+        )
+        await job_worker._handle(entry)
+        assert (await queue.get_status(job_id))["status"] == "pending"
+        # Повторная доставка той же записи (XAUTOCLAIM)
+        await job_worker._handle(entry)
+
+        job = await queue.get_status(job_id)
+        assert job["status"] == "completed"
+        assert job["cat_id"] == "101"
+        assert (await redis.xpending("jobs", "workers"))["pending"] == 0
+
+    asyncio.run(scenario())
+    assert service.calls == 1
+    assert _FlakyUserSession.links == [101, 101]
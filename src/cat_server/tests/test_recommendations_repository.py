@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from cat_server.core.database import TEST_DATABASE_URL
+from cat_server.infrastructure.entities import Base, Cats, Haircuts, Recommendations
+from cat_server.infrastructure.repositories import RecommendationsRepository
+from cat_server.scripts.benchmarks.create_with_cat import count_round_trips, two_step
+
+pytestmark = pytest.mark.integration
+
+HAIRCUT_NAME = "Тест create_with_cat"
+
+
+def run_with_database(scenario):
+    # Тестовая БД из core.database; без неё тест пропускается.
+    # NullPool: соединения asyncpg не переживают asyncio.run
+    async def main():
+        engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        except (OSError, DBAPIError) as e:
+            await engine.dispose()
+            pytest.skip(f"тестовая БД недоступна: {e}")
+
+        session_factory = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        created_cats = []
+        async with session_factory() as session:
+            haircut_id = await session.scalar(
+                select(Haircuts.id).where(Haircuts.name == HAIRCUT_NAME)
+            )
+            if haircut_id is None:
+                haircut = Haircuts(name=HAIRCUT_NAME, description="")
+                session.add(haircut)
+                await session.commit()
+                haircut_id = haircut.id
+        try:
+            await scenario(engine, session_factory, haircut_id, created_cats)
+        finally:
+            async with session_factory() as session:
+                await session.execute(
+                    delete(Recommendations).where(
+                        Recommendations.cat_id.in_(created_cats)
+                    )
+                )
+                await session.execute(delete(Cats).where(Cats.id.in_(created_cats)))
+                await session.execute(
+                    delete(Haircuts).where(Haircuts.name == HAIRCUT_NAME)
+                )
+                await session.commit()
+            await engine.dispose()
+
+    asyncio.run(main())
+
+
+async def load(session_factory, cat_id, recommendation_id):
+    async with session_factory() as session:
+        cat = await session.get(Cats, cat_id)
+        recommendation = await session.get(Recommendations, recommendation_id)
+        cat_recommendations = await session.scalar(
+            select(func.count())
+            .select_from(Recommendations)
+            .where(Recommendations.cat_id == cat_id)
+        )
+    return cat, recommendation, cat_recommendations
+
+
+def test_create_with_cat_matches_two_step_path():
+    async def scenario(engine, session_factory, haircut_id, created_cats):
+        async with session_factory() as session:
+            old_ids = await two_step(session, haircut_id, 0.75)
+        async with session_factory() as session:
+            new_ids = await RecommendationsRepository(session).create_with_cat(
+                haircut_id, 0.75
+            )
+        created_cats.extend([old_ids[0], new_ids[0]])
+
+        old_cat, old_recommendation, old_count = await load(session_factory, *old_ids)
+        new_cat, new_recommendation, new_count = await load(session_factory, *new_ids)
+        assert new_cat is not None and new_cat.created_at is not None
+        assert old_cat.created_at is not None
+        assert new_recommendation.cat_id == new_cat.id
+        assert old_recommendation.cat_id == old_cat.id
+        assert (new_recommendation.haircut_id, new_recommendation.confidence) == (
+            old_recommendation.haircut_id,
+            old_recommendation.confidence,
+        )
+        assert new_count == old_count == 1
+
+    run_with_database(scenario)
+
+
+def test_create_with_cat_resolves_haircut_name():
+    async def scenario(engine, session_factory, haircut_id, created_cats):
+        async with session_factory() as session:
+            cat_id, recommendation_id = await RecommendationsRepository(
+                session
+            ).create_with_cat(HAIRCUT_NAME, 0.5)
+        created_cats.append(cat_id)
+
+        _, recommendation, _ = await load(session_factory, cat_id, recommendation_id)
+        assert recommendation.haircut_id == haircut_id
+
+    run_with_database(scenario)
+
+
+def test_unknown_haircut_leaves_no_cat():
+    async def scenario(engine, session_factory, haircut_id, created_cats):
+        async with session_factory() as session:
+            cats_before = await session.scalar(select(func.count()).select_from(Cats))
+            with pytest.raises(DBAPIError):
+                await RecommendationsRepository(session).create_with_cat(
+                    "Нет такой стрижки", 0.5
+                )
+            cats_after = await session.scalar(select(func.count()).select_from(Cats))
+        assert cats_after == cats_before
+
+    run_with_database(scenario)
+
+
+def test_create_with_cat_round_trips():
+    async def scenario(engine, session_factory, haircut_id, created_cats):
+        with count_round_trips(engine) as before:
+            async with session_factory() as session:
+                cat_id, _ = await two_step(session, haircut_id, 0.5)
+        created_cats.append(cat_id)
+        with count_round_trips(engine) as after:
+            async with session_factory() as session:
+                cat_id, _ = await RecommendationsRepository(session).create_with_cat(
+                    haircut_id, 0.5
+                )
+        created_cats.append(cat_id)
+
+        # Было: INSERT + refresh на кота и на рекомендацию, два COMMIT
+        assert before["commits"] == 2
+        assert before["statements"] >= 3
+        # Стало: один INSERT ... RETURNING и один COMMIT
+        assert after == {"statements": 1, "commits": 1}
+
+    run_with_database(scenario)
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime
+
+from cat_server.domain.dto import AnalysisResult, ImageData, NeuralNetworkResponse
+from cat_server.services.image_processing_service import ImageProcessingService
+from cat_server.services.result_cache import ResultCache
+
+
+class _NeuralClient:
+    def __init__(self, is_cat: bool = True):
+        self.is_cat = is_cat
+        self.calls = 0
+
+    async def analyze_and_process_image(self, request):
+        self.calls += 1
+        if not self.is_cat:
+            return None
+        return NeuralNetworkResponse(
+            analysis_result=AnalysisResult(
+                confidence=0.9,
+                analyzed_at=datetime.now(),
+                predicted_class="Лев",
+            ),
+            processing_time_ms=5,
+            processing_metadata={},
+        )
+
+
+class _RecommendationsRepo:
+    def __init__(self):
+        self.rows = []
+
+    async def create_with_cat(self, haircut, confidence):
+        self.rows.append((haircut, confidence))
+        return len(self.rows), len(self.rows)
+
+
+def _service(neural_client, recommendations_repo) -> ImageProcessingService:
+    return ImageProcessingService(
+        cats_repo=None,
+        haircut_repo=None,
+        recommendations_repo=recommendations_repo,
+        user_session_service=None,
+        neural_client=neural_client,
+        result_cache=ResultCache(redis=None),
+    )
+
+
+def _image() -> ImageData:
+    return ImageData(file_name="cat.jpg", data=b"same bytes", size=10, format="JPEG")
+
+
+def test_cached_analysis_creates_cat_per_upload():
+    neural_client = _NeuralClient()
+    recommendations = _RecommendationsRepo()
+    service = _service(neural_client, recommendations)
+
+    async def scenario():
+        return [await service.process_images(_image()) for _ in range(3)]
+
+    results = asyncio.run(scenario())
+    assert neural_client.calls == 1
+    assert [r.status for r in results] == ["completed"] * 3
+    # Каждая загрузка (в том числе из другой сессии) — свой кот и рекомендация
+    assert [r.cat_id for r in results] == [1, 2, 3]
+    assert recommendations.rows == [("Лев", 0.9)] * 3
+    assert all(r.analysis_result.predicted_class == "Лев" for r in results)
+
+
+def test_not_a_cat_is_cached_without_rows():
+    neural_client = _NeuralClient(is_cat=False)
+    recommendations = _RecommendationsRepo()
+    service = _service(neural_client, recommendations)
+
+    async def scenario():
+        return [await service.process_images(_image()) for _ in range(2)]
+
+    results = asyncio.run(scenario())
+    assert neural_client.calls == 1
+    assert all(r.error.error_id == "NEURAL_NETWORK_ERROR" for r in results)
+    assert recommendations.rows == []
+
+
+class _SlowNeuralClient(_NeuralClient):
+    # Ответ нейросети задерживается, пока тест не откроет release
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def analyze_and_process_image(self, request):
+        await self.release.wait()
+        return await super().analyze_and_process_image(request)
+
+
+def test_concurrent_identical_uploads_share_one_neural_call():
+    neural_client = _SlowNeuralClient()
+    recommendations = _RecommendationsRepo()
+    service = _service(neural_client, recommendations)
+
+    async def scenario():
+        uploads = [
+            asyncio.create_task(service.process_images(_image())) for _ in range(5)
+        ]
+        await asyncio.sleep(0.01)
+        neural_client.release.set()
+        return await asyncio.gather(*uploads), service.result_cache.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert neural_client.calls == 1
+    assert stats["shared_in_flight"] == 4
+    assert sorted(r.cat_id for r in results) == [1, 2, 3, 4, 5]
+
+
+def test_cancelled_waiter_does_not_cancel_shared_computation():
+    neural_client = _SlowNeuralClient()
+    recommendations = _RecommendationsRepo()
+    service = _service(neural_client, recommendations)
+
+    async def scenario():
+        # Первый запрос запускает вычисление, его и отменяем
+        uploads = [
+            asyncio.create_task(service.process_images(_image())) for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        uploads[0].cancel()
+        await asyncio.sleep(0.01)
+        neural_client.release.set()
+        return await asyncio.gather(*uploads, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert [r.status for r in results[1:]] == ["completed", "completed"]
+    assert neural_client.calls == 1
+    assert len(recommendations.rows) == 2
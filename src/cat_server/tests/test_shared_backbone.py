@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from cat_server.infrastructure.ai_model.dual_model_loader import (  # noqa: E402
+    SHARED_BACKBONE_TOLERANCE,
+    DualModelLoader,
+)
+
+# Модульные тесты пути общего backbone. Без SavedModel обученных моделей в
+# репозитории они идут на синтетической паре из conftest, чьи головы устроены
+# так, как их собирает SharedBackbone; на рабочих моделях это предположение
+# проверяет DualModelLoader при загрузке (_shared_backbone_matches)
+
+pytestmark = pytest.mark.slow
+
+
+@pytest.fixture(scope="module")
+def loaders(model_dirs):
+    main_dir, filter_dir = model_dirs
+    two_models = DualModelLoader(main_dir, filter_dir)
+    shared = DualModelLoader(main_dir, filter_dir, shared_backbone=True)
+    assert two_models.load_models()
+    assert shared.load_models()
+    assert shared.shared_backbone is not None, "общий backbone не распознан"
+    return two_models, shared
+
+
+def _scores(result):
+    return {p["class_name"]: p["confidence"] for p in result["predictions"]}
+
+
+def test_predict_matches_two_models(loaders, sample_images):
+    two_models, shared = loaders
+    for name, data in sample_images:
+        expected = two_models.predict(data, require_cat=False)
+        actual = shared.predict(data, require_cat=False)
+        assert expected["success"] and actual["success"], name
+        assert (
+            actual["top_prediction"]["class_name"]
+            == expected["top_prediction"]["class_name"]
+        ), name
+        expected_scores = _scores(expected)
+        actual_scores = _scores(actual)
+        for label, score in expected_scores.items():
+            assert actual_scores[label] == pytest.approx(
+                score, abs=SHARED_BACKBONE_TOLERANCE
+            ), name
+
+
+def test_cat_filter_matches_two_models(loaders, sample_images):
+    two_models, shared = loaders
+    for name, data in sample_images:
+        _, expected = two_models.is_cat_image(data)
+        _, actual = shared.is_cat_image(data)
+        assert actual == pytest.approx(expected, abs=SHARED_BACKBONE_TOLERANCE), name
+
+
+def test_predict_batch_matches_two_models(loaders, sample_images):
+    two_models, shared = loaders
+    images = [data for _, data in sample_images]
+    for require_cat in (True, False):
+        expected = two_models.predict_batch(images, require_cat=require_cat)
+        actual = shared.predict_batch(images, require_cat=require_cat)
+        for expected_row, actual_row in zip(expected, actual):
+            assert actual_row["success"] == expected_row["success"]
+            if "cat_confidence" in expected_row:
+                assert actual_row["cat_confidence"] == pytest.approx(
+                    expected_row["cat_confidence"], abs=SHARED_BACKBONE_TOLERANCE
+                )
+            if expected_row["success"]:
+                expected_scores = np.array(list(_scores(expected_row).values()))
+                actual_scores = np.array(
+                    [_scores(actual_row)[k] for k in _scores(expected_row)]
+                )
+                assert (
+                    np.abs(actual_scores - expected_scores).max()
+                    <= SHARED_BACKBONE_TOLERANCE
+                )
+
+
+def test_head_mismatch_falls_back_to_two_models(model_dirs_tanh, sample_images):
+    main_dir, filter_dir = model_dirs_tanh
+    shared = DualModelLoader(main_dir, filter_dir, shared_backbone=True)
+    assert shared.load_models()
+    assert shared.shared_backbone is None
+
+    two_models = DualModelLoader(main_dir, filter_dir)
+    assert two_models.load_models()
+    _, data = sample_images[0]
+    assert _scores(shared.predict(data, require_cat=False)) == _scores(
+        two_models.predict(data, require_cat=False)
+    )
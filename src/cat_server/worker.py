@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+import redis.asyncio as aioredis
+
+from cat_server.core.config import settings
+from cat_server.core.database import AsyncSessionLocal, check_database_connection
+from cat_server.core.dependencies import (
+    build_image_processing_service,
+    create_job_queue,
+    create_neural_client,
+    create_processing_log_buffer,
+    create_result_cache,
+)
+from cat_server.services.image_processing_service import (
+    OVERLOAD_ERRORS,
+    NeuralNetworkClient,
+)
+from cat_server.services.processing_jobs import ProcessingJobQueue, StreamEntry
+from cat_server.services.processing_logs import ProcessingLogBuffer
+from cat_server.services.result_cache import ResultCache
+from cat_server.services.user_session_service import UserSessionService
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    # Воркер асинхронных загрузок: читает поток через consumer group,
+    # обрабатывает до concurrency задач одновременно и подтверждает (XACK)
+    # только завершённые. Задачи упавших воркеров забираются через XAUTOCLAIM,
+    # поэтому воркеры масштабируются простым запуском новых процессов
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        job_queue: ProcessingJobQueue,
+        neural_client: NeuralNetworkClient,
+        result_cache: ResultCache | None,
+        consumer: str,
+        concurrency: int = 4,
+        claim_idle_ms: int = 60000,
+        max_attempts: int = 3,
+        processing_logs: ProcessingLogBuffer | None = None,
+    ):
+        self.redis = redis
+        self.job_queue = job_queue
+        self.neural_client = neural_client
+        self.result_cache = result_cache
+        self.consumer = consumer
+        self.concurrency = max(1, concurrency)
+        self.claim_idle_ms = claim_idle_ms
+        self.max_attempts = max_attempts
+        self.processing_logs = processing_logs
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        await self.job_queue.ensure_group()
+        print(f"👷 Воркер {self.consumer} слушает поток {self.job_queue.stream}")
+
+        while not self._stopping.is_set():
+            entries = await self.job_queue.claim_stale(
+                self.consumer, self.claim_idle_ms, count=self.concurrency
+            )
+            if not entries:
+                entries = await self.job_queue.read(
+                    self.consumer, count=self.concurrency, block_ms=2000
+                )
+            if entries:
+                results = await asyncio.gather(
+                    *(self._handle(entry) for entry in entries),
+                    return_exceptions=True,
+                )
+                for error in results:
+                    if isinstance(error, Exception):
+                        logger.error(f"❌ Сбой воркера при обработке записи: {error}")
+
+        print(f"🛑 Воркер {self.consumer} остановлен")
+
+    async def _handle(self, entry: StreamEntry) -> None:
+        entry_id, fields = entry
+        job_id = fields["job_id"]
+        session_id = fields["session_id"]
+
+        job = await self.job_queue.get_status(job_id)
+        if job is not None and job.get("cat_id"):
+            # Прошлая попытка создала кота и упала позже (привязка к сессии,
+            # статус): изображение повторно не обрабатываем
+            try:
+                await self._complete(entry_id, job_id, session_id, int(job["cat_id"]))
+            except Exception as e:
+                await self._retry_later(job_id, session_id, e)
+            return
+
+        image_data = await self.job_queue.load_image(fields)
+        if image_data is None:
+            await self.job_queue.set_status(
+                job_id,
+                "error",
+                error_message="Данные задачи устарели",
+                session_id=session_id,
+            )
+            await self.job_queue.ack(entry_id, job_id)
+            return
+
+        attempts = await self.job_queue.record_attempt(job_id)
+        if attempts > self.max_attempts:
+            # Запись, роняющая воркеры, не должна крутиться вечно
+            await self.job_queue.set_status(
+                job_id,
+                "error",
+                error_message="Превышено число попыток обработки",
+                session_id=session_id,
+            )
+            await self.job_queue.ack(entry_id, job_id)
+            return
+
+        await self.job_queue.set_status(job_id, "processing", session_id=session_id)
+        try:
+            async with AsyncSessionLocal() as db_session:
+                user_session = UserSessionService(redis=self.redis, session_ttl=3600)
+                service = build_image_processing_service(
+                    user_session,
+                    db_session,
+                    self.neural_client,
+                    self.result_cache,
+                    processing_logs=self.processing_logs,
+                )
+                result = await service.process_images(image_data)
+
+            if result.error is not None and result.error.error_id in OVERLOAD_ERRORS:
+                # Нейросеть перегружена: без XACK запись заберут повторно,
+                # а попытка не засчитывается — иначе пик нагрузки
+                # исчерпает max_attempts у ни в чём не виноватых задач
+                await self.job_queue.refund_attempt(job_id)
+                await self.job_queue.set_status(
+                    job_id, "pending", session_id=session_id
+                )
+                return
+
+            if result.status == "completed" and result.cat_id is not None:
+                await self.job_queue.record_cat(job_id, result.cat_id)
+                await self._complete(entry_id, job_id, session_id, result.cat_id)
+            else:
+                await self.job_queue.set_status(
+                    job_id,
+                    "error",
+                    error_message=result.error.message
+                    if result.error
+                    else "Processing Failed",
+                    session_id=session_id,
+                )
+                await self.job_queue.ack(entry_id, job_id)
+            print(f"✅ Задача {job_id} обработана: {result.status}")
+
+        except Exception as e:
+            await self._retry_later(job_id, session_id, e)
+
+    async def _complete(
+        self, entry_id: str, job_id: str, session_id: str, cat_id: int
+    ) -> None:
+        user_session = UserSessionService(redis=self.redis, session_ttl=3600)
+        await user_session.link_cat_to_session(session_id, cat_id)
+        await self.job_queue.set_status(
+            job_id, "completed", cat_id=cat_id, session_id=session_id
+        )
+        await self.job_queue.ack(entry_id, job_id)
+
+    async def _retry_later(
+        self, job_id: str, session_id: str, error: Exception
+    ) -> None:
+        # Без XACK: запись останется в pending и будет забрана повторно
+        logger.exception(f"💥 Ошибка обработки задачи {job_id}")
+        await self.job_queue.set_status(
+            job_id, "pending", error_message=str(error), session_id=session_id
+        )
+
+
+async def main() -> None:
+    redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    await check_database_connection()
+    neural_client = await create_neural_client()
+    processing_logs = create_processing_log_buffer()
+
+    worker = JobWorker(
+        redis=redis_client,
+        job_queue=create_job_queue(redis_client),
+        neural_client=neural_client,
+        result_cache=create_result_cache(redis_client),
+        consumer=f"{socket.gethostname()}-{os.getpid()}",
+        concurrency=settings.JOBS_WORKER_CONCURRENCY,
+        claim_idle_ms=settings.JOBS_CLAIM_IDLE_MS,
+        max_attempts=settings.JOBS_MAX_ATTEMPTS,
+        processing_logs=processing_logs,
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    if processing_logs is not None:
+        processing_logs.start()
+    try:
+        await worker.run()
+    finally:
+        if processing_logs is not None:
+            await processing_logs.stop()
+        await neural_client.close()
+        await redis_client.aclose()
+
+
+def run_worker():
+    """Запуск воркера асинхронной обработки (uv run cat-worker)"""
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run_worker()